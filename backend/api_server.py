@@ -0,0 +1,400 @@
+"""
+HTTP JSON API for the email agent, for tools that can't go through the Streamlit UI.
+
+Run from the repository root:
+
+    python -m backend.api_server --port 8765
+
+All requests share one AgentService (database engine, LLM client, worker
+pools). Request handlers run on a bounded pool: when API_WORKERS handlers are
+busy and API_QUEUE more are waiting, new requests get 503. A handler that
+takes longer than API_REQUEST_TIMEOUT seconds gets 504.
+
+Endpoints:
+    GET  /health
+    GET  /stats
+    GET  /search?q=...&category=...&sender=...&unread=true&limit=20
+    POST /process          {"email_id": "..."} or {"limit": 100} (background job)
+    GET  /jobs/<id>
+    POST /categorize       {"sender", "subject", "body"}
+    POST /actions          {"sender", "subject", "body"}
+    POST /chat             {"query", "email_id", "session_id", "stream": true}
+    GET  /drafts?page=1&page_size=10&status=pending
+    POST /drafts           {"subject", "context", "tone"}
+    POST /drafts/<id>/status {"status": "approved"}
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from backend.utils.startup import load_env
+
+# Settings are read at import, so .env is loaded before the constants below
+load_env()
+
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8765'))
+# Requests handled concurrently, and requests allowed to wait before new ones get 503
+API_WORKERS = int(os.getenv('API_WORKERS', '8'))
+API_QUEUE = int(os.getenv('API_QUEUE', '16'))
+API_REQUEST_TIMEOUT = float(os.getenv('API_REQUEST_TIMEOUT', '60'))
+API_MAX_BODY = 1024 * 1024
+
+
+class APIError(Exception):
+    """Error returned to the client as {"error": message} with an HTTP status."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AgentAPI:
+    """Routes API requests to one shared agent and runs them on a bounded worker pool."""
+    
+    def __init__(self, agent: Any, workers: int = None, queue_size: int = None, timeout: float = None):
+        """
+        Initialize the API.
+        
+        Args:
+            agent: AgentService shared by all requests
+            workers: Requests handled concurrently
+            queue_size: Requests allowed to wait for a worker before new ones get 503
+            timeout: Seconds before a request gets 504
+        """
+        self.agent = agent
+        self.workers = workers or API_WORKERS
+        self.timeout = timeout or API_REQUEST_TIMEOUT
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='api')
+        # A slot is held until the work finishes, even if its client already got a 504
+        self._slots = threading.BoundedSemaphore(self.workers + (API_QUEUE if queue_size is None else queue_size))
+        self.routes = [
+            ('GET', re.compile(r'^/health$'), self.health),
+            ('GET', re.compile(r'^/stats$'), self.stats),
+            ('GET', re.compile(r'^/search$'), self.search),
+            ('POST', re.compile(r'^/process$'), self.process),
+            ('GET', re.compile(r'^/jobs/(?P<job_id>[\w-]+)$'), self.job),
+            ('POST', re.compile(r'^/categorize$'), self.categorize),
+            ('POST', re.compile(r'^/actions$'), self.actions),
+            ('POST', re.compile(r'^/chat$'), self.chat),
+            ('GET', re.compile(r'^/drafts$'), self.drafts),
+            ('POST', re.compile(r'^/drafts$'), self.new_draft),
+            ('POST', re.compile(r'^/drafts/(?P<draft_id>\d+)/status$'), self.draft_status),
+        ]
+    
+    def route(self, method: str, path: str) -> Tuple[Callable, Dict[str, str]]:
+        """Find the handler for a request."""
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groupdict()
+                allowed = True
+        raise APIError(405 if allowed else 404, f"{'Method not allowed' if allowed else 'Not found'}: {method} {path}")
+    
+    def submit(self, handler: Callable, *args: Any) -> Any:
+        """
+        Run a handler on the worker pool.
+        
+        Returns:
+            Future of the handler's result
+        
+        Raises:
+            APIError: 503 if the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            raise APIError(503, "Server busy, retry later")
+        try:
+            future = self.pool.submit(handler, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def close(self):
+        """Stop accepting work and wait for running requests."""
+        self.pool.shutdown(wait=True)
+    
+    # Endpoints
+    def health(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        return {'status': 'ok'}
+    
+    def stats(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        summary = self.agent.get_inbox_summary()
+        summary['llm_usage'] = self.agent.llm.get_usage_stats()
+        return summary
+    
+    def search(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        limit = _int_param(params, 'limit', 20, maximum=100)
+        if params.get('q'):
+            hits = self.agent.retrieval.search(params['q'], k=limit)
+            details = self.agent.storage.get_email_details([email_id for email_id, _ in hits])
+            results = [
+                dict(_email_fields(details[email_id]), score=round(score, 4))
+                for email_id, score in hits if email_id in details
+            ]
+            return {'total': len(results), 'results': results}
+        unread = params.get('unread')
+        total, emails = self.agent.storage.search_emails(
+            category=params.get('category'),
+            sender=params.get('sender'),
+            is_read=None if unread is None else unread.lower() != 'true',
+            limit=limit
+        )
+        details = self.agent.storage.get_email_details([email.id for email in emails])
+        return {'total': total, 'results': [_email_fields(details[email.id]) for email in emails]}
+    
+    def process(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        if body.get('email_id'):
+            try:
+                return self.agent.process_email(body['email_id'])
+            except ValueError as e:
+                raise APIError(404, str(e))
+        # Whole-inbox runs go to the background job queue shared with the UI
+        job_id = self.agent.jobs.submit('process_all', {'limit': body.get('limit')})
+        return {'job_id': job_id, 'status': 'queued'}
+    
+    def job(self, params: Dict[str, Any], body: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        status = self.agent.jobs.get_status(job_id)
+        if status is None:
+            raise APIError(404, f"Job not found: {job_id}")
+        return status
+    
+    def categorize(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        sender, subject, text = _require_email(body)
+        template = self.agent.prompt_service.get_prompt_template('categorization')
+        return {'category': self.agent.llm.categorize_email(sender, subject, text, template)}
+    
+    def actions(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        sender, subject, text = _require_email(body)
+        template = self.agent.prompt_service.get_prompt_template('action_extraction')
+        return self.agent.llm.extract_action_items(sender, subject, text, template)
+    
+    def chat(self, params: Dict[str, Any], body: Dict[str, Any],
+             on_chunk: Callable[[str], None] = None) -> Dict[str, Any]:
+        if not body.get('query'):
+            raise APIError(400, "Missing 'query'")
+        response = self.agent.chat_query(
+            body['query'], email_id=body.get('email_id'), session_id=body.get('session_id'), on_chunk=on_chunk
+        )
+        return {'response': response}
+    
+    def drafts(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        return self.agent.storage.get_drafts_page(
+            draft_type=params.get('type'),
+            tone=params.get('tone'),
+            status=params.get('status'),
+            page=_int_param(params, 'page', 1),
+            page_size=_int_param(params, 'page_size', 10, maximum=100)
+        )
+    
+    def new_draft(self, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        if not body.get('subject'):
+            raise APIError(400, "Missing 'subject'")
+        draft = self.agent.generate_email_draft(body['subject'], body.get('context', ''), body.get('tone', 'professional'))
+        saved = self.agent.storage.add_draft(None, draft['subject'], draft['body'], draft['tone'], draft_type='new')
+        return dict(draft, id=saved.id)
+    
+    def draft_status(self, params: Dict[str, Any], body: Dict[str, Any], draft_id: str) -> Dict[str, Any]:
+        if body.get('status') not in ('pending', 'edited', 'approved'):
+            raise APIError(400, "'status' must be pending, edited or approved")
+        if self.agent.storage.get_draft(int(draft_id)) is None:
+            raise APIError(404, f"Draft not found: {draft_id}")
+        self.agent.storage.set_draft_status(int(draft_id), body['status'])
+        return {'id': int(draft_id), 'status': body['status']}
+
+
+def _email_fields(details: Dict[str, Any]) -> Dict[str, Any]:
+    """Public fields of an email from StorageService.get_email_details."""
+    return {key: details[key] for key in
+            ('id', 'sender', 'sender_name', 'subject', 'timestamp', 'category', 'urgency_score', 'summary', 'pending_tasks')}
+
+
+def _parse_body(raw: bytes) -> Dict[str, Any]:
+    """Parse a JSON object request body (empty means {})."""
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        raise APIError(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise APIError(400, "Request body must be a JSON object")
+    return body
+
+
+def _int_param(params: Dict[str, Any], name: str, default: int, maximum: int = None) -> int:
+    """Get a positive integer query parameter, capped at `maximum`."""
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise APIError(400, f"'{name}' must be an integer")
+    if value < 1:
+        raise APIError(400, f"'{name}' must be at least 1")
+    return min(value, maximum) if maximum else value
+
+
+def _require_email(body: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Get (sender, subject, body) of an ad-hoc email from a request body."""
+    if not body.get('subject') and not body.get('body'):
+        raise APIError(400, "Provide 'subject' and/or 'body'")
+    return body.get('sender', ''), body.get('subject', ''), body.get('body', '')
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Parses requests, runs them on the API's pool and writes JSON (or chunked NDJSON) responses."""
+    
+    api: AgentAPI = None
+    protocol_version = 'HTTP/1.1'
+    # Seconds a client may take to send its request
+    timeout = 30
+    
+    def do_GET(self):
+        self._handle('GET')
+    
+    def do_POST(self):
+        self._handle('POST')
+    
+    def _handle(self, method: str):
+        try:
+            # The body is read before anything can fail, so a keep-alive connection stays in sync
+            raw = self._read_raw_body()
+            url = urlsplit(self.path)
+            handler, kwargs = self.api.route(method, url.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            body = _parse_body(raw) if method == 'POST' else {}
+            if handler == self.api.chat and body.get('stream'):
+                self._stream_chat(params, body)
+                return
+            future = self.api.submit(handler, params, body, *kwargs.values())
+            try:
+                result = future.result(timeout=self.api.timeout)
+            except FutureTimeout:
+                raise APIError(504, f"Request timed out after {self.api.timeout:g}s")
+            self._send_json(200, result)
+        except APIError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+    
+    def _read_raw_body(self) -> bytes:
+        """Read the request body; a body that can't be read closes the connection after the error."""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True
+            raise APIError(400, "Invalid Content-Length")
+        if length > API_MAX_BODY:
+            self.close_connection = True
+            raise APIError(413, "Request body too large")
+        return self.rfile.read(length) if length > 0 else b''
+    
+    def _send_json(self, status: int, payload: Any):
+        data = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _stream_chat(self, params: Dict[str, Any], body: Dict[str, Any]):
+        """Send the chat answer as chunked NDJSON: {"delta": ...} lines, then {"done": true, ...}."""
+        chunks = queue.Queue()
+        future = self.api.submit(self.api.chat, params, body, chunks.put)
+        future.add_done_callback(lambda _: chunks.put(None))
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        deadline = time.monotonic() + self.api.timeout
+        while True:
+            try:
+                chunk = chunks.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                # Headers are already sent, so a timeout is reported in the stream
+                self._write_chunk({'error': f"Request timed out after {self.api.timeout:g}s", 'status': 504})
+                break
+            if chunk is None:
+                error = future.exception()
+                if error is None:
+                    self._write_chunk(dict(future.result(), done=True))
+                else:
+                    self._write_chunk({'error': str(error), 'status': getattr(error, 'status', 500)})
+                break
+            self._write_chunk({'delta': chunk})
+        self.wfile.write(b'0\r\n\r\n')
+    
+    def _write_chunk(self, payload: Dict[str, Any]):
+        data = (json.dumps(payload, default=str) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+    
+    def log_message(self, format: str, *args: Any):
+        if os.getenv('DEBUG_MODE', 'False').lower() == 'true':
+            super().log_message(format, *args)
+
+
+def create_server(agent: Any = None, host: str = None, port: int = None, workers: int = None,
+                  queue_size: int = None, timeout: float = None) -> ThreadingHTTPServer:
+    """
+    Create the API server (call serve_forever() to run it).
+    
+    Args:
+        agent: AgentService to share (created from the environment if omitted)
+        host: Interface to bind
+        port: Port to bind (0 for any free port)
+        workers: Requests handled concurrently
+        queue_size: Requests allowed to wait before new ones get 503
+        timeout: Seconds before a request gets 504
+    
+    Returns:
+        HTTP server whose `api` attribute is the AgentAPI
+    """
+    if agent is None:
+        from backend.services.agent_service import AgentService
+        agent = AgentService()
+    api = AgentAPI(agent, workers=workers, queue_size=queue_size, timeout=timeout)
+    handler = type('BoundAPIRequestHandler', (APIRequestHandler,), {'api': api})
+    server = ThreadingHTTPServer((host or API_HOST, API_PORT if port is None else port), handler)
+    server.daemon_threads = True
+    server.api = api
+    return server
+
+
+def main():
+    """Run the API server."""
+    parser = argparse.ArgumentParser(prog='python -m backend.api_server', description="Email Productivity Agent HTTP API")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--workers', type=int, default=API_WORKERS)
+    args = parser.parse_args()
+    
+    server = create_server(host=args.host, port=args.port, workers=args.workers)
+    print(f"Serving the email agent API on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+Command-line interface for running the email pipeline without the UI.
+
+Run from the repository root:
+
+    python -m backend.cli ingest --file data/mock_inbox.json
+    python -m backend.cli process --concurrency 4 --limit 500 --shard 0/2
+    python -m backend.cli process --queue --concurrency 4   # run in as many processes as needed
+    python -m backend.cli reprocess --prompt-type categorization --output recategorized.jsonl
+    python -m backend.cli export emails --output inbox.jsonl
+    python -m backend.cli stats --shards 2
+
+Results are written as JSON lines to stdout (or --output); progress goes to stderr.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+
+from backend.utils.helpers import parse_shard, shard_of
+from backend.utils.startup import load_env
+
+EXPORT_PAGE_SIZE = 500
+# Recent `process` runs searched for each shard's latest run
+SHARD_RUN_HISTORY = 200
+
+
+class JsonlWriter:
+    """Writes one JSON object per line and flushes it, safe to call from worker threads."""
+    
+    def __init__(self, path: str = None):
+        """
+        Initialize the writer.
+        
+        Args:
+            path: Output file, or None / '-' for stdout
+        """
+        self._file = sys.stdout if path in (None, '-') else open(path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.count = 0
+    
+    def write(self, record: Dict[str, Any]):
+        """Write one record."""
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.count += 1
+    
+    def close(self):
+        """Close the output file (stdout is left open)."""
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def _progress(args: argparse.Namespace, message: str):
+    """Print a progress line to stderr unless --quiet."""
+    if not args.quiet:
+        print(message, file=sys.stderr, flush=True)
+
+
+def _storage(args: argparse.Namespace):
+    """Storage service for --db; services are imported here, after load_env()."""
+    from backend.services.storage_service import StorageService
+    return StorageService(db_path=args.db)
+
+
+def _agent(args: argparse.Namespace):
+    """Agent service (and LLM client) for commands that call the LLM."""
+    from backend.services.agent_service import AgentService
+    return AgentService(storage_service=_storage(args))
+
+
+def _in_shard(key: str, shard: Optional[tuple]) -> bool:
+    """Whether a key belongs to the selected shard (always true without --shard)."""
+    return shard is None or shard_of(key, shard[1]) == shard[0]
+
+
+def _shard_label(shard: Optional[tuple]) -> Optional[str]:
+    """The --shard value as 'i/n', or None without --shard."""
+    return f"{shard[0]}/{shard[1]}" if shard else None
+
+
+def _with_shard(record: Dict[str, Any], shard: Optional[tuple]) -> Dict[str, Any]:
+    """Tag an output record with the --shard it covers, if any."""
+    if shard:
+        record['shard'] = _shard_label(shard)
+    return record
+
+
+def cmd_ingest(args: argparse.Namespace, out: JsonlWriter) -> int:
+    """Load emails from a JSON/JSONL file or the configured IMAP mailbox."""
+    storage = _storage(args)
+    if args.imap:
+        if args.dry_run:
+            out.write({'event': 'ingest', 'source': 'imap', 'dry_run': True})
+            return 0
+        from backend.services.imap_service import IMAPConnector
+        connector = IMAPConnector(storage, shard=args.shard)
+        try:
+            count = connector.sync()
+        finally:
+            connector.close()
+        out.write(_with_shard({'event': 'ingest', 'source': 'imap', 'inserted': count}, args.shard))
+        return 0
+    
+    from backend.services.email_service import EmailService
+    emails = [
+        email for email in EmailService(storage).read_emails_file(args.file)
+        if _in_shard(email['id'], args.shard)
+    ][:args.limit]
+    record = _with_shard({'event': 'ingest', 'source': args.file, 'emails': len(emails)}, args.shard)
+    if args.dry_run:
+        record['dry_run'] = True
+    else:
+        record['inserted'] = storage.add_emails(emails)
+    out.write(record)
+    return 0
+
+
+def _outcome_record(outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a processing outcome into one output line."""
+    record = {key: outcome[key] for key in ('unit', 'email_ids', 'status', 'elapsed_ms', 'errors')}
+    result = outcome['result'] or {}
+    for key in ('category', 'inherited_from', 'action_items', 'draft'):
+        record[key] = result.get(key)
+    return record
+
+
+def cmd_process(args: argparse.Namespace, out: JsonlWriter) -> int:
+    """Process unprocessed emails, streaming each thread's result."""
+    agent = _agent(args)
+    if args.dry_run:
+        plan = agent.plan_processing(limit=args.limit, shard=args.shard)
+        for unit_key, emails in plan:
+            out.write({
+                'unit': unit_key,
+                'email_ids': [email.id for email in emails],
+                'subject': emails[-1].subject,
+                'dry_run': True
+            })
+        out.write({'event': 'summary', 'total': sum(len(emails) for _, emails in plan),
+                   'threads': len(plan), 'dry_run': True})
+        return 0
+    
+    started = time.perf_counter()
+    label = _shard_label(args.shard)
+    prefix = f"[shard {label}] " if label else ''
+    
+    # The run is recorded as a job, so `stats --shards N` shows every shard's progress
+    with agent.jobs.track('cli_process', {'shard': label, 'queue': args.queue, 'limit': args.limit}) as progress:
+        def report(summary: Dict[str, Any]):
+            done = summary['total_processed'] + summary['failed']
+            progress(done, summary['total'], summary['failed'])
+            _progress(args, f"{prefix}[{done}/{summary['total']}] processed={summary['total_processed']} failed={summary['failed']}")
+        
+        options = dict(
+            limit=args.limit,
+            progress_callback=report,
+            workers=args.concurrency,
+            shard=args.shard,
+            result_callback=lambda outcome: out.write(_outcome_record(outcome))
+        )
+        if args.queue:
+            summary = agent.process_queue(worker_id=args.worker_id, batch_size=args.batch_size, **options)
+        else:
+            summary = agent.process_all_emails(**options)
+        # Let background reply variants finish before the process exits
+        agent.draft_worker.wait()
+    
+    elapsed = time.perf_counter() - started
+    record = {
+        'event': 'summary',
+        'total': summary['total'],
+        'processed': summary['total_processed'],
+        'successful': summary['successful'],
+        'failed': summary['failed'],
+        'errors': len(summary['errors']),
+        'elapsed_s': round(elapsed, 2),
+        'emails_per_s': round(summary['total_processed'] / elapsed, 2) if elapsed else None
+    }
+    if args.queue:
+        record.update(worker_id=summary['worker_id'], lost=summary['lost'])
+    out.write(_with_shard(record, args.shard))
+    return 1 if summary['failed'] else 0
+
+
+def cmd_reprocess(args: argparse.Namespace, out: JsonlWriter) -> int:
+    """Re-run one pipeline step on processed emails, e.g. after editing its prompt."""
+    agent = _agent(args)
+    email_ids = [
+        email_id for email_id in agent.storage.get_processed_email_ids(limit=None)
+        if _in_shard(email_id, args.shard)
+    ][:args.limit]
+    if args.dry_run:
+        for email_id in email_ids:
+            out.write({'email_id': email_id, 'prompt_type': args.prompt_type, 'dry_run': True})
+        out.write({'event': 'summary', 'total': len(email_ids), 'dry_run': True})
+        return 0
+    
+    failed = 0
+    label = _shard_label(args.shard)
+    prefix = f"[shard {label}] " if label else ''
+    params = {'shard': label, 'prompt_type': args.prompt_type, 'limit': args.limit}
+    with agent.jobs.track('cli_reprocess', params) as progress, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(agent.reprocess_email, email_id, args.prompt_type) for email_id in email_ids]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            failed += 1 if result['errors'] else 0
+            out.write(result)
+            progress(done, len(email_ids), failed)
+            _progress(args, f"{prefix}[{done}/{len(email_ids)}] failed={failed}")
+        agent.draft_worker.wait()
+    
+    if args.prompt_type in ('categorization', 'summary') and email_ids:
+        agent.summaries.refresh_rollups()
+    out.write(_with_shard({'event': 'summary', 'total': len(email_ids), 'failed': failed}, args.shard))
+    return 1 if failed else 0
+
+
+def cmd_export(args: argparse.Namespace, out: JsonlWriter) -> int:
+    """Export emails (with category, summary and open tasks) or drafts."""
+    storage = _storage(args)
+    count = 0
+    if args.what == 'drafts':
+        page = 1
+        while True:
+            items = storage.get_drafts_page(page=page, page_size=EXPORT_PAGE_SIZE)['items']
+            for item in items:
+                if args.limit is not None and count >= args.limit:
+                    return 0
+                if _in_shard(item['email_id'] or str(item['id']), args.shard):
+                    out.write(item)
+                    count += 1
+            if len(items) < EXPORT_PAGE_SIZE:
+                return 0
+            page += 1
+    
+    cursor = None
+    while args.limit is None or count < args.limit:
+        page = storage.get_email_headers_page(page_size=EXPORT_PAGE_SIZE, cursor=cursor, category=args.category)
+        headers = [header for header in page['items'] if _in_shard(header['id'], args.shard)]
+        details = storage.get_email_details([header['id'] for header in headers])
+        for header in headers:
+            if args.limit is not None and count >= args.limit:
+                break
+            detail = details.get(header['id'], {})
+            record = dict(header, summary=detail.get('summary'), pending_tasks=detail.get('pending_tasks', []))
+            if args.with_body:
+                record['body'] = detail.get('body')
+            out.write(record)
+            count += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace, out: JsonlWriter) -> int:
+    """Print inbox, draft and job statistics."""
+    from backend.services.email_service import EmailService
+    storage = _storage(args)
+    stats = EmailService(storage).get_email_statistics()
+    stats['drafts'] = storage.get_drafts_page(page_size=1)['counts']
+    jobs = storage.get_jobs(limit=1)
+    stats['last_job'] = {
+        'id': jobs[0].id,
+        'type': jobs[0].job_type,
+        'status': jobs[0].status,
+        'done': jobs[0].done,
+        'total': jobs[0].total
+    } if jobs else None
+    stats['work_queue'] = storage.get_work_counts()
+    if args.shards:
+        stats['shards'] = _shard_progress(storage, args.shards)
+    out.write(stats)
+    return 0
+
+
+def _shard_progress(storage: Any, shard_count: int) -> List[Dict[str, Any]]:
+    """Backlog of each shard with the latest `process --shard i/n` run over it."""
+    from backend.services.email_service import EmailService
+    shards = EmailService(storage).get_shard_statistics(shard_count)
+    runs = {}
+    for job in storage.get_jobs('cli_process', limit=SHARD_RUN_HISTORY):
+        runs.setdefault(json.loads(job.params or '{}').get('shard'), job)
+    for shard in shards:
+        job = runs.get(shard['shard'])
+        shard['last_run'] = {
+            'status': job.status,
+            'done': job.done,
+            'total': job.total,
+            'failed': job.failed,
+            'started_at': job.started_at,
+            'heartbeat_at': job.heartbeat_at
+        } if job else None
+    return shards
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    from backend.services.agent_service import REPROCESS_PROMPT_TYPES
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=None, help="Database path (defaults to DATABASE_PATH)")
+    common.add_argument('--output', '-o', default='-', help="JSONL output file (default: stdout)")
+    common.add_argument('--quiet', '-q', action='store_true', help="No progress on stderr")
+    
+    parser = argparse.ArgumentParser(prog='python -m backend.cli', description="Email Productivity Agent batch CLI")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    def batch_options(command: argparse.ArgumentParser, concurrency: bool = True):
+        command.add_argument('--limit', type=int, default=None, help="Maximum number of emails")
+        command.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                             help="Only handle shard I of N (by ID hash), for parallel runs")
+        command.add_argument('--dry-run', action='store_true', help="Show what would be done without doing it")
+        if concurrency:
+            command.add_argument('--concurrency', '-c', type=int, default=1, help="Emails processed in parallel")
+    
+    ingest = commands.add_parser('ingest', parents=[common], help="Load emails from a file or IMAP")
+    ingest.add_argument('--file', default='data/mock_inbox.json', help="JSON or JSONL file of emails")
+    ingest.add_argument('--imap', action='store_true', help="Sync the IMAP mailbox configured in .env instead")
+    batch_options(ingest, concurrency=False)
+    ingest.set_defaults(handler=cmd_ingest)
+    
+    process = commands.add_parser('process', parents=[common], help="Process unprocessed emails")
+    batch_options(process)
+    process.add_argument('--queue', action='store_true',
+                         help="Lease work from the shared queue, so several workers can run at once")
+    process.add_argument('--worker-id', default=None, help="Worker ID for --queue (default: host:pid)")
+    process.add_argument('--batch-size', type=int, default=None, help="Units leased per claim with --queue")
+    process.set_defaults(handler=cmd_process)
+    
+    reprocess = commands.add_parser('reprocess', parents=[common], help="Re-run one step on processed emails")
+    reprocess.add_argument('--prompt-type', required=True, choices=REPROCESS_PROMPT_TYPES)
+    batch_options(reprocess)
+    reprocess.set_defaults(handler=cmd_reprocess)
+    
+    export = commands.add_parser('export', parents=[common], help="Export emails or drafts")
+    export.add_argument('what', nargs='?', choices=['emails', 'drafts'], default='emails')
+    export.add_argument('--category', default=None, help="Only emails of this category")
+    export.add_argument('--with-body', action='store_true', help="Include email bodies")
+    export.add_argument('--limit', type=int, default=None, help="Maximum number of records")
+    export.add_argument('--shard', type=parse_shard, default=None, metavar='I/N')
+    export.set_defaults(handler=cmd_export)
+    
+    stats = commands.add_parser('stats', parents=[common], help="Print inbox statistics")
+    stats.add_argument('--shards', type=int, default=None, metavar='N',
+                       help="Also show the backlog and latest run of each of N shards")
+    stats.set_defaults(handler=cmd_stats)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the CLI and return its exit code."""
+    # Settings are read when the services are imported, so .env is loaded first
+    load_env()
+    args = build_parser().parse_args(argv)
+    out = JsonlWriter(args.output)
+    try:
+        # Services print status messages; keep them out of the JSONL stream
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.handler(args, out)
+    finally:
+        out.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
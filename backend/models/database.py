@@ -1,7 +1,9 @@
 """
 Database models for the Email Productivity Agent.
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import (
+    create_engine, Column, Integer, String, Text, Boolean, DateTime, Float, LargeBinary, ForeignKey, UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -18,16 +20,72 @@ class Email(Base):
     sender_name = Column(String)
     subject = Column(String, nullable=False)
     body = Column(Text, nullable=False)
-    timestamp = Column(DateTime, nullable=False)
+    timestamp = Column(DateTime, nullable=False, index=True)
     has_attachments = Column(Boolean, default=False)
     labels = Column(String)  # JSON string of labels
     processed = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False, index=True)
+    urgency_score = Column(Float, index=True)  # Local 1-5 estimate used for scheduling and sorting
+    message_id = Column(String, index=True)  # Message-ID header
+    in_reply_to = Column(String, index=True)  # In-Reply-To header
+    reference_ids = Column(Text)  # References header, space-separated Message-IDs
+    thread_id = Column(String, ForeignKey('email_threads.id'), index=True)
+    summary = Column(Text)  # Short summary cached at processing time
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     category = relationship("EmailCategory", back_populates="email", uselist=False)
     action_items = relationship("ActionItem", back_populates="email")
     drafts = relationship("Draft", back_populates="email")
+    thread = relationship("EmailThread", back_populates="emails")
+
+
+class EmailThread(Base):
+    """Conversation thread grouping replies to the same message."""
+    __tablename__ = 'email_threads'
+    
+    id = Column(String, primary_key=True)
+    subject_key = Column(String, index=True)  # Normalized subject for fallback matching
+    message_count = Column(Integer, default=0)
+    latest_email_id = Column(String)
+    last_timestamp = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    emails = relationship("Email", back_populates="thread")
+
+
+class EmailReference(Base):
+    """Message-ID an email replies to or references, indexed to find replies whose parent arrives later."""
+    __tablename__ = 'email_references'
+    
+    email_id = Column(String, ForeignKey('emails.id'), primary_key=True)
+    message_id = Column(String, primary_key=True, index=True)
+
+
+class EmailSignature(Base):
+    """SimHash signature of an email body, banded for near-duplicate lookup."""
+    __tablename__ = 'email_signatures'
+    
+    email_id = Column(String, ForeignKey('emails.id'), primary_key=True)
+    simhash = Column(Integer, nullable=False)
+    band_0 = Column(Integer, index=True)
+    band_1 = Column(Integer, index=True)
+    band_2 = Column(Integer, index=True)
+    band_3 = Column(Integer, index=True)
+
+
+class ImapSyncState(Base):
+    """Incremental IMAP sync position per account and mailbox."""
+    __tablename__ = 'imap_sync_state'
+    __table_args__ = (UniqueConstraint('account', 'mailbox'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account = Column(String, nullable=False)  # username@host
+    mailbox = Column(String, nullable=False)
+    uidvalidity = Column(Integer)
+    last_uid = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Prompt(Base):
@@ -51,14 +109,39 @@ class EmailCategory(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     email_id = Column(String, ForeignKey('emails.id'), unique=True, nullable=False)
-    category = Column(String, nullable=False)  # Important, Newsletter, Spam, To-Do
+    category = Column(String, nullable=False, index=True)  # Important, Newsletter, Spam, To-Do
     confidence = Column(String)
+    source = Column(String, default='llm')  # llm, thread, near_duplicate, sender_memo
+    source_email_id = Column(String)  # Email the result was inherited from
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     email = relationship("Email", back_populates="category")
 
 
+class EmailEmbedding(Base):
+    """Hashed n-gram embedding of an email for retrieval."""
+    __tablename__ = 'email_embeddings'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Never reused, drives incremental index loads
+    email_id = Column(String, ForeignKey('emails.id'), unique=True, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32 bytes
+
+
+class SenderCategoryStat(Base):
+    """Decayed category counts per sender address and per sender domain."""
+    __tablename__ = 'sender_category_stats'
+    __table_args__ = (UniqueConstraint('sender_key', 'category'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sender_key = Column(String, nullable=False, index=True)  # address, or @domain
+    category = Column(String, nullable=False)
+    weight = Column(Float, default=0.0)  # Exponentially decayed count
+    last_updated = Column(DateTime, default=datetime.utcnow)
+
+
 class ActionItem(Base):
     """Action items extracted from emails."""
     __tablename__ = 'action_items'
@@ -67,8 +150,10 @@ class ActionItem(Base):
     email_id = Column(String, ForeignKey('emails.id'), nullable=False)
     task = Column(Text, nullable=False)
     deadline = Column(String)
+    due_date = Column(DateTime, index=True)  # Deadline resolved against the email's timestamp
     priority = Column(String)  # high, medium, low
-    completed = Column(Boolean, default=False)
+    completed = Column(Boolean, default=False, index=True)
+    source_email_id = Column(String)  # Set when copied from a near-duplicate email
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -85,13 +170,61 @@ class Draft(Base):
     body = Column(Text, nullable=False)
     tone = Column(String)
     draft_type = Column(String)  # reply, new, forward
-    created_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String, default='pending', index=True)  # pending (awaiting review), edited, approved
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Draft list order
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     email = relationship("Email", back_populates="drafts")
 
 
+class SummaryRollup(Base):
+    """Cached summary of a group of conversations: one category or one day."""
+    __tablename__ = 'summary_rollups'
+    __table_args__ = (UniqueConstraint('level', 'key'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    level = Column(String, nullable=False)  # category, day
+    key = Column(String, nullable=False)  # Category name or YYYY-MM-DD
+    summary = Column(Text, nullable=False)
+    fingerprint = Column(String, nullable=False)  # Hash of the summaries it was built from
+    item_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DailyDigest(Base):
+    """Materialized digest of one day's emails, tasks and drafts awaiting review."""
+    __tablename__ = 'daily_digests'
+    
+    day = Column(String, primary_key=True)  # YYYY-MM-DD (UTC) of the emails covered
+    content = Column(Text, nullable=False)  # JSON digest
+    email_count = Column(Integer, default=0)
+    fingerprint = Column(String)  # Data versions the digest was built from
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DataVersion(Base):
+    """Change counter per data scope, bumped by database triggers."""
+    __tablename__ = 'data_versions'
+    
+    scope = Column(String, primary_key=True)  # emails, categories, actions, drafts
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ChatAnswerCache(Base):
+    """Cached chat answers, valid only for the data versions they were built from."""
+    __tablename__ = 'chat_answer_cache'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    query_key = Column(String, nullable=False, index=True)  # Normalized query text
+    email_id = Column(String)  # Set for questions about one email
+    fingerprint = Column(String, nullable=False, index=True)  # Data versions at answer time
+    answer = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used = Column(DateTime, default=datetime.utcnow)
+
+
 class ChatHistory(Base):
     """Chat history with the email agent."""
     __tablename__ = 'chat_history'
@@ -100,4 +233,69 @@ class ChatHistory(Base):
     user_message = Column(Text, nullable=False)
     agent_response = Column(Text, nullable=False)
     context = Column(Text)  # JSON string of context used
+    session_id = Column(String, index=True)  # Conversation the turn belongs to
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """Background job, e.g. a "Process All Emails" run, with its progress."""
+    __tablename__ = 'jobs'
+    
+    id = Column(String, primary_key=True)
+    job_type = Column(String, nullable=False, index=True)  # process_all, ...
+    status = Column(String, nullable=False, default='queued', index=True)  # queued, running, cancelling, cancelled, interrupted, completed, failed
+    params = Column(Text)  # JSON
+    total = Column(Integer, default=0)
+    done = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    resumed_from = Column(Integer, default=0)  # Items done before the current run, for the ETA
+    result = Column(Text)  # JSON summary of the last run
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # Updated while running; stale heartbeats mark interrupted jobs
+
+
+class WorkItem(Base):
+    """Processing unit (a thread or single email) in the shared work queue, leased to one worker at a time."""
+    __tablename__ = 'work_queue'
+    
+    unit_key = Column(String, primary_key=True)  # Thread ID or email ID
+    is_thread = Column(Boolean, default=False)
+    priority = Column(Float, default=0.0)
+    status = Column(String, nullable=False, default='pending', index=True)  # pending, leased, done, failed
+    worker_id = Column(String)
+    lease_expires = Column(Float)  # Unix time; an expired lease returns the unit to the pool
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EvalResult(Base):
+    """Output of one prompt variant on one email, cached for incremental A/B evaluations."""
+    __tablename__ = 'eval_results'
+    __table_args__ = (UniqueConstraint('variant_hash', 'email_id', name='uq_eval_variant_email'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    variant_hash = Column(String, nullable=False, index=True)  # Prompt type, template and model
+    prompt_type = Column(String, nullable=False)
+    email_id = Column(String, ForeignKey('emails.id'), nullable=False)
+    output = Column(Text)
+    parsed_ok = Column(Boolean, default=True)
+    latency_ms = Column(Float)
+    input_tokens = Column(Integer)
+    output_tokens = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ChatSession(Base):
+    """Conversation state: a rolling summary of turns older than the recent window."""
+    __tablename__ = 'chat_sessions'
+    
+    id = Column(String, primary_key=True)
+    summary = Column(Text, default='')
+    summarized_through = Column(Integer, default=0)  # Last chat_history ID folded into the summary
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
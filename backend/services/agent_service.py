@@ -1,11 +1,52 @@
 """
 Agent service - orchestrates the email processing pipeline.
 """
-from typing import List, Dict, Any
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Callable, Tuple
 from backend.services.storage_service import StorageService
 from backend.services.llm_service import LLMService
 from backend.services.email_service import EmailService
 from backend.services.prompt_service import PromptService
+from backend.services.dedup_service import DedupService
+from backend.services.sender_memo_service import SenderMemoService
+from backend.services.scheduler import PriorityScheduler
+from backend.services.retrieval_service import RetrievalService
+from backend.services.intent_router import IntentRouter
+from backend.services.answer_cache import AnswerCache
+from backend.services.chat_memory_service import ChatMemoryService
+from backend.services.summary_service import SummaryService
+from backend.services.digest_service import DigestService
+from backend.services.draft_worker import DraftWorker
+from backend.services.draft_examples import DraftExampleService
+from backend.services.job_service import JobService
+from backend.services.evaluation_service import EvaluationService
+from backend.services.work_queue import WorkQueue, WORK_BATCH_SIZE, WORK_POLL_SECONDS
+from backend.utils.helpers import shard_of, strip_quoted_text, truncate_text
+
+# Condensed thread context sent alongside the latest message
+THREAD_CONTEXT_MESSAGES = int(os.getenv('THREAD_CONTEXT_MESSAGES', '5'))
+THREAD_CONTEXT_CHARS = int(os.getenv('THREAD_CONTEXT_CHARS', '200'))
+
+# Pipeline steps that can be re-run on processed emails after their prompt changes
+REPROCESS_PROMPT_TYPES = ['categorization', 'action_extraction', 'auto_reply', 'summary', 'urgency_analysis']
+
+# Questions about the inbox as a whole, answered from cached summary rollups. Any qualifier
+# ("urgent", "from Sarah", "from today") needs the matching emails, so it goes to retrieval
+_INBOX_SUMMARY = re.compile(
+    r"^\s*(please\s+)?(summari[sz]e|recap|(give me\s+)?(an?\s+)?(overview|summary|recap)\s+of)\s+"
+    r"((all|of|my|the)\s+)*(inbox|everything|e-?mails|messages)(\s+in\s+my\s+inbox)?\s*[.!?]?\s*$"
+    r"|^\s*(please\s+)?catch me up(\s+on\s+everything)?\s*[.!?]?\s*$",
+    re.IGNORECASE
+)
+# Day-level questions answered from the materialized daily digest; "what happened with X?" goes to retrieval
+_DIGEST_QUERY = re.compile(
+    r"^\s*(what happened|what'?s new)(\s+(today|yesterday))?\s*\??\s*$|\bdaily digest\b|\bmy day\b",
+    re.IGNORECASE
+)
 
 
 class AgentService:
@@ -23,6 +64,19 @@ class AgentService:
         self.llm = llm_service or LLMService()
         self.email_service = EmailService(self.storage)
         self.prompt_service = PromptService(self.storage)
+        self.dedup_service = DedupService(self.storage)
+        self.sender_memo = SenderMemoService(self.storage)
+        self.retrieval = RetrievalService(self.storage)
+        self.intent_router = IntentRouter(self.storage)
+        self.answer_cache = AnswerCache(self.storage)
+        self.chat_memory = ChatMemoryService(self.storage, self.llm)
+        self.summaries = SummaryService(self.storage, self.llm)
+        self.digest = DigestService(self.storage)
+        self.draft_worker = DraftWorker(self.storage, self.llm)
+        self.draft_examples = DraftExampleService(self.storage)
+        self.evaluation = EvaluationService(self.storage, self.llm)
+        self.jobs = JobService(self.storage)
+        self.jobs.register('process_all', self._process_all_job)
         
         # Ensure default prompts are loaded
         self.prompt_service.ensure_default_prompts_loaded()
@@ -51,136 +105,632 @@ class AgentService:
         if not email:
             raise ValueError(f"Email not found: {email_id}")
         
+        thread_emails = self.storage.get_thread_emails(email.thread_id) if email.thread_id else [email]
+        results = self._process_message(email, thread_emails, generate_draft=True)
+        
+        # Mark email as processed
+        self.storage.update_email_processed(email_id, True)
+        self.digest.update_days([email.timestamp.date()])
+        
+        return results
+    
+    def process_thread(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Process the unprocessed messages of a conversation thread.
+        
+        The latest unprocessed message is categorized and mined for action
+        items with condensed thread context; earlier unprocessed messages
+        inherit its category. Only the newest message in the thread gets a
+        reply draft.
+        
+        Args:
+            thread_id: ID of the thread to process
+        
+        Returns:
+            Dictionary with processing results and the processed email IDs
+        """
+        emails = self.storage.get_thread_emails(thread_id)
+        if not emails:
+            raise ValueError(f"Thread not found: {thread_id}")
+        
+        pending = [email for email in emails if not email.processed]
+        if not pending:
+            return {
+                'thread_id': thread_id,
+                'email_id': None,
+                'email_ids': [],
+                'category': None,
+                'inherited_from': None,
+                'action_items': [],
+                'draft': None,
+                'errors': []
+            }
+        
+        target = pending[-1]
+        results = self._process_message(target, emails, generate_draft=(target.id == emails[-1].id))
+        results['thread_id'] = thread_id
+        results['email_ids'] = [email.id for email in pending]
+        
+        for email in pending:
+            if email.id != target.id and results['category']:
+                self.storage.add_category(
+                    email.id,
+                    results['category'],
+                    source='thread',
+                    source_email_id=target.id
+                )
+            self.storage.update_email_processed(email.id, True)
+        
+        return results
+    
+    def _build_thread_body(self, email: Any, thread_emails: List[Any]) -> str:
+        """
+        Build the body sent to the LLM: the new text of the email plus a
+        condensed digest of earlier messages instead of quoted history.
+        
+        Args:
+            email: Email being processed
+            thread_emails: All emails in its thread, oldest first
+        
+        Returns:
+            Body text for prompt templates
+        """
+        body = strip_quoted_text(email.body) or email.body
+        earlier = [
+            other for other in thread_emails
+            if other.id != email.id and other.timestamp <= email.timestamp
+        ]
+        if not earlier:
+            return body
+        
+        lines = []
+        for other in earlier[-THREAD_CONTEXT_MESSAGES:]:
+            snippet = ' '.join(strip_quoted_text(other.body).split())
+            lines.append(
+                f"- {other.sender_name or other.sender} ({other.timestamp.strftime('%Y-%m-%d %H:%M')}): "
+                f"{truncate_text(snippet, THREAD_CONTEXT_CHARS)}"
+            )
+        return f"{body}\n\nEarlier in this thread:\n" + "\n".join(lines)
+    
+    def _process_message(self, email: Any, thread_emails: List[Any],
+                         generate_draft: bool = True) -> Dict[str, Any]:
+        """
+        Run categorization, action extraction and draft generation for one email.
+        
+        Args:
+            email: Email to process
+            thread_emails: All emails in its thread, oldest first
+            generate_draft: Whether a reply draft may be generated
+        
+        Returns:
+            Dictionary with processing results
+        """
+        email_id = email.id
+        body = self._build_thread_body(email, thread_emails)
+        
         results = {
             'email_id': email_id,
             'category': None,
+            'inherited_from': None,
             'action_items': [],
             'draft': None,
             'errors': []
         }
         
+        # 0. Look for an already-processed near-duplicate to inherit from
+        duplicate = None
+        try:
+            duplicate = self.dedup_service.find_duplicate(email_id)
+        except Exception as e:
+            results['errors'].append(f"Near-duplicate lookup failed: {str(e)}")
+        
         # 1. Categorize email
         try:
-            cat_prompt = self.prompt_service.get_prompt_template('categorization')
-            category = self.llm.categorize_email(
-                email.sender,
-                email.subject,
-                email.body,
-                cat_prompt
-            )
-            self.storage.add_category(email_id, category)
-            results['category'] = category
+            if duplicate:
+                category = duplicate['category']
+                self.storage.add_category(
+                    email_id,
+                    category,
+                    confidence=f"{duplicate['similarity']:.3f}",
+                    source='near_duplicate',
+                    source_email_id=duplicate['source_email_id']
+                )
+                results['category'] = category
+                results['inherited_from'] = duplicate['source_email_id']
+            else:
+                prediction = self.sender_memo.predict(email.sender)
+                if prediction and not self.sender_memo.should_verify():
+                    self.storage.add_category(
+                        email_id,
+                        prediction['category'],
+                        confidence=f"{prediction['confidence']:.2f}",
+                        source='sender_memo'
+                    )
+                    results['category'] = prediction['category']
+                else:
+                    self._categorize(email, body, results)
         except Exception as e:
             results['errors'].append(f"Categorization failed: {str(e)}")
         
         # 2. Extract action items
         try:
-            action_prompt = self.prompt_service.get_prompt_template('action_extraction')
-            action_data = self.llm.extract_action_items(
-                email.sender,
-                email.subject,
-                email.body,
-                action_prompt
-            )
-            
-            tasks = action_data.get('tasks', [])
-            for task_item in tasks:
-                action = self.storage.add_action_item(
-                    email_id,
-                    task_item.get('task', 'No task description'),
-                    task_item.get('deadline'),
-                    task_item.get('priority', 'medium')
-                )
-                results['action_items'].append({
-                    'id': action.id,
-                    'task': action.task,
-                    'deadline': action.deadline,
-                    'priority': action.priority
-                })
+            if duplicate and self.dedup_service.inherit_actions:
+                for source_action in self.storage.get_action_items_by_email(duplicate['source_email_id']):
+                    action = self.storage.add_action_item(
+                        email_id,
+                        source_action.task,
+                        source_action.deadline,
+                        source_action.priority,
+                        source_email_id=duplicate['source_email_id']
+                    )
+                    results['action_items'].append({
+                        'id': action.id,
+                        'task': action.task,
+                        'deadline': action.deadline,
+                        'priority': action.priority
+                    })
+            else:
+                self._extract_actions(email, body, results)
         except Exception as e:
             results['errors'].append(f"Action extraction failed: {str(e)}")
         
         # 3. Generate reply draft (only for certain categories)
         try:
             category = results.get('category', '')
-            if category in ['Important', 'To-Do']:
-                reply_prompt = self.prompt_service.get_prompt_template('auto_reply')
-                draft_data = self.llm.generate_reply_draft(
+            if generate_draft and category in ['Important', 'To-Do']:
+                self._generate_draft(email, body, results)
+        except Exception as e:
+            results['errors'].append(f"Draft generation failed: {str(e)}")
+        
+        # 4. Cache a short summary for inbox-level rollups
+        try:
+            source = self.storage.get_email_by_id(duplicate['source_email_id']) if duplicate else None
+            if source is not None and source.summary:
+                summary = source.summary
+            else:
+                summary = self.summaries.summarize_email(
                     email.sender,
                     email.subject,
-                    email.body,
-                    reply_prompt
+                    body,
+                    self.prompt_service.get_prompt_template('summary')
                 )
-                
-                draft = self.storage.add_draft(
-                    email_id,
-                    draft_data.get('subject', f"Re: {email.subject}"),
-                    draft_data.get('body', ''),
-                    draft_data.get('tone', 'professional')
-                )
-                results['draft'] = {
-                    'id': draft.id,
-                    'subject': draft.subject,
-                    'body': draft.body,
-                    'tone': draft.tone
-                }
+            self.storage.update_email_summary(email_id, summary)
         except Exception as e:
-            results['errors'].append(f"Draft generation failed: {str(e)}")
-        
-        # Mark email as processed
-        self.storage.update_email_processed(email_id, True)
+            results['errors'].append(f"Summary generation failed: {str(e)}")
         
         return results
     
-    def process_all_emails(self, limit: int = None) -> Dict[str, Any]:
+    def _categorize(self, email: Any, body: str, results: Dict[str, Any], replaces: str = None):
+        """Categorize an email with the LLM and store the result, replacing the vote of an earlier LLM label."""
+        cat_prompt = self.prompt_service.get_prompt_template('categorization')
+        category = self.llm.categorize_email(
+            email.sender,
+            email.subject,
+            body,
+            cat_prompt
+        )
+        self.storage.add_category(email.id, category)
+        results['category'] = category
+        if replaces:
+            self.sender_memo.withdraw(email.sender, replaces)
+        self.sender_memo.record(email.sender, category)
+    
+    def _extract_actions(self, email: Any, body: str, results: Dict[str, Any]):
+        """Extract action items with the LLM and store them."""
+        action_prompt = self.prompt_service.get_prompt_template('action_extraction')
+        action_data = self.llm.extract_action_items(
+            email.sender,
+            email.subject,
+            body,
+            action_prompt
+        )
+        
+        tasks = action_data.get('tasks', [])
+        for task_item in tasks:
+            action = self.storage.add_action_item(
+                email.id,
+                task_item.get('task', 'No task description'),
+                task_item.get('deadline'),
+                task_item.get('priority', 'medium')
+            )
+            results['action_items'].append({
+                'id': action.id,
+                'task': action.task,
+                'deadline': action.deadline,
+                'priority': action.priority
+            })
+    
+    def _generate_draft(self, email: Any, body: str, results: Dict[str, Any]):
+        """Generate a reply draft and store it, reusing the user's reviewed replies to similar emails."""
+        reply_prompt = self.prompt_service.get_prompt_template('auto_reply')
+        examples = self.draft_examples.find(email)
+        draft_data = self.draft_examples.template_reply(examples[0], email) if examples else None
+        source = 'template' if draft_data else 'llm'
+        if draft_data is None:
+            draft_data = self.llm.generate_reply_draft(
+                email.sender,
+                email.subject,
+                body,
+                reply_prompt,
+                examples=self.draft_examples.few_shot_context(examples) or None
+            )
+        
+        draft = self.storage.add_draft(
+            email.id,
+            draft_data.get('subject', f"Re: {email.subject}"),
+            draft_data.get('body', ''),
+            draft_data.get('tone', 'professional')
+        )
+        results['draft'] = {
+            'id': draft.id,
+            'subject': draft.subject,
+            'body': draft.body,
+            'tone': draft.tone,
+            'source': source
+        }
+        
+        # Alternatives in other tones are prepared in the background for Regenerate
+        self.draft_worker.submit(email.id, email.sender, email.subject, body, reply_prompt, exclude_tone=draft.tone)
+    
+    def plan_processing(self, limit: int = None, shard: Tuple[int, int] = None) -> List[Tuple[str, List[Any]]]:
+        """
+        Group unprocessed emails into processing units (a thread or a single email),
+        most urgent first.
+        
+        Args:
+            limit: Maximum number of emails (a thread is always kept whole, so the last unit may overshoot)
+            shard: (index, count) to keep only the units whose thread or email ID hashes to this shard
+        
+        Returns:
+            List of (unit key, unprocessed emails of the unit)
+        """
+        units = {}
+        for email in self.email_service.get_unprocessed_emails():
+            units.setdefault(email.thread_id or email.id, []).append(email)
+        scheduler = PriorityScheduler()
+        for unit_key, emails in units.items():
+            if shard is None or shard_of(unit_key, shard[1]) == shard[0]:
+                scheduler.push(unit_key, emails)
+        
+        plan = []
+        planned = 0
+        for unit_key, emails in scheduler.drain():
+            if limit and planned >= limit:
+                break
+            plan.append((unit_key, emails))
+            planned += len(emails)
+        return plan
+    
+    def process_all_emails(self, limit: int = None,
+                           progress_callback: Callable[[Dict[str, Any]], None] = None,
+                           should_stop: Callable[[], bool] = None,
+                           workers: int = 1, shard: Tuple[int, int] = None,
+                           result_callback: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
         """
-        Process all unprocessed emails in the inbox.
+        Process all unprocessed emails in the inbox, one thread at a time,
+        most urgent threads first.
         
         Args:
-            limit: Maximum number of emails to process
+            limit: Maximum number of emails to process (a thread is always
+                processed as a whole, so the last one may overshoot)
+            progress_callback: Called with the running summary after each thread
+            should_stop: Checked before each thread; processing stops early when it returns True
+            workers: Threads processed concurrently
+            shard: (index, count) to process only this shard of the threads
+            result_callback: Called with each thread's outcome (unit, email_ids, status, result, errors, elapsed_ms)
             
         Returns:
             Dictionary with summary of processing results
         """
-        unprocessed = self.email_service.get_unprocessed_emails()
-        
-        if limit:
-            unprocessed = unprocessed[:limit]
+        plan = self.plan_processing(limit=limit, shard=shard)
         
         summary = {
+            'total': sum(len(emails) for _, emails in plan),
             'total_processed': 0,
+            'threads_processed': 0,
             'successful': 0,
             'failed': 0,
+            'stopped': False,
             'errors': []
         }
+        if progress_callback is not None:
+            progress_callback(summary)
         
-        for email in unprocessed:
-            try:
-                result = self.process_email(email.id)
-                summary['total_processed'] += 1
+        processed_days = set()
+        units = iter(plan)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while True:
+                # Keep at most `workers` threads in flight, in priority order
+                while len(running) < max(workers, 1) and not summary['stopped']:
+                    if should_stop is not None and should_stop():
+                        summary['stopped'] = True
+                        break
+                    unit = next(units, None)
+                    if unit is None:
+                        break
+                    processed_days.update(email.timestamp.date() for email in unit[1])
+                    running[executor.submit(self._process_unit, *unit)] = unit
+                if not running:
+                    break
                 
-                if result['errors']:
-                    summary['errors'].extend(result['errors'])
-                else:
-                    summary['successful'] += 1
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    self._tally(summary, future.result(), progress_callback, result_callback)
+        
+        self._refresh_after_processing(summary, processed_days)
+        return summary
+    
+    def process_queue(self, limit: int = None,
+                      progress_callback: Callable[[Dict[str, Any]], None] = None,
+                      should_stop: Callable[[], bool] = None,
+                      workers: int = 1, shard: Tuple[int, int] = None,
+                      result_callback: Callable[[Dict[str, Any]], None] = None,
+                      batch_size: int = None, worker_id: str = None,
+                      lease_seconds: float = None) -> Dict[str, Any]:
+        """
+        Process the backlog as one of several workers sharing the database.
+        
+        The unprocessed backlog is added to the work queue (idempotently), then
+        units are leased from it in batches, so concurrent workers in other
+        processes or on other machines never process the same thread. When the
+        queue is empty but other workers still hold leases, this worker waits
+        and takes over the units whose leases expire (their worker crashed).
+        
+        Args:
+            limit: Maximum number of emails this worker processes
+            progress_callback: Called with the running summary after each thread
+            should_stop: Checked before each claim; processing stops early when it returns True
+            workers: Threads processed concurrently by this worker
+            shard: (index, count) to enqueue only this shard of the backlog
+            result_callback: Called with each thread's outcome
+            batch_size: Units leased per claim (defaults to WORK_BATCH_SIZE, or `workers`)
+            worker_id: Unique worker ID (defaults to host:pid:random)
+            lease_seconds: Lease duration (defaults to WORK_LEASE_SECONDS)
+        
+        Returns:
+            Dictionary with summary of processing results, plus the worker ID
+            and the number of units whose lease was lost to another worker
+        """
+        workers = max(workers, 1)
+        queue = WorkQueue(self.storage, worker_id=worker_id, lease_seconds=lease_seconds)
+        queued = queue.enqueue(self.plan_processing(shard=shard))
+        batch_size = batch_size or WORK_BATCH_SIZE or workers
+        
+        summary = {
+            'worker_id': queue.worker_id,
+            'queued': queued,
+            'total': 0,
+            'total_processed': 0,
+            'threads_processed': 0,
+            'successful': 0,
+            'failed': 0,
+            'lost': 0,
+            'stopped': False,
+            'errors': []
+        }
+        processed_days = set()
+        claimed = []
+        running = {}
+        queue.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while True:
+                    while len(running) < workers and not summary['stopped']:
+                        if should_stop is not None and should_stop():
+                            summary['stopped'] = True
+                            break
+                        if limit and summary['total'] >= limit:
+                            break
+                        if not claimed:
+                            claimed = queue.claim(batch_size)
+                            if not claimed:
+                                break
+                        unit = claimed.pop(0)
+                        emails = self._pending_unit_emails(unit)
+                        if not emails:
+                            # Processed meanwhile, e.g. by a crashed worker just before it died
+                            queue.finish(unit)
+                            continue
+                        summary['total'] += len(emails)
+                        processed_days.update(email.timestamp.date() for email in emails)
+                        running[executor.submit(self._process_unit, unit['unit_key'], emails)] = unit
                     
-            except Exception as e:
-                summary['failed'] += 1
-                summary['errors'].append(f"Failed to process {email.id}: {str(e)}")
+                    if not running:
+                        if summary['stopped'] or (limit and summary['total'] >= limit):
+                            break
+                        # Wait for leases held by other workers to finish or expire
+                        if not queue.counts()['leased']:
+                            break
+                        if should_stop is not None and should_stop():
+                            summary['stopped'] = True
+                            break
+                        time.sleep(WORK_POLL_SECONDS)
+                        continue
+                    
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        unit = running.pop(future)
+                        outcome = future.result()
+                        failed = outcome['status'] == 'failed'
+                        if not queue.finish(unit, failed=failed, error='; '.join(outcome['errors']) or None):
+                            summary['lost'] += 1
+                        self._tally(summary, outcome, progress_callback, result_callback)
+        finally:
+            queue.stop()
+            # Units claimed but not started go straight back to the pool
+            for unit in claimed:
+                queue.storage.finish_work(queue.worker_id, unit['unit_key'], 'pending')
         
+        self._refresh_after_processing(summary, processed_days)
         return summary
     
-    def chat_query(self, user_query: str, email_id: str = None) -> str:
+    def _pending_unit_emails(self, unit: Dict[str, Any]) -> List[Any]:
+        """Unprocessed emails of a queued unit (thread or single email)."""
+        if unit['is_thread']:
+            emails = self.storage.get_thread_emails(unit['unit_key'])
+        else:
+            email = self.storage.get_email_by_id(unit['unit_key'])
+            emails = [email] if email else []
+        return [email for email in emails if not email.processed]
+    
+    @staticmethod
+    def _tally(summary: Dict[str, Any], outcome: Dict[str, Any],
+               progress_callback: Callable[[Dict[str, Any]], None] = None,
+               result_callback: Callable[[Dict[str, Any]], None] = None):
+        """Add a thread's outcome to a processing summary and report it."""
+        if outcome['status'] == 'failed':
+            summary['failed'] += len(outcome['email_ids'])
+        else:
+            summary['total_processed'] += len(outcome['email_ids'])
+            summary['threads_processed'] += 1
+            if outcome['status'] == 'ok':
+                summary['successful'] += len(outcome['email_ids'])
+        summary['errors'].extend(outcome['errors'])
+        
+        if result_callback is not None:
+            result_callback(outcome)
+        if progress_callback is not None:
+            progress_callback(summary)
+    
+    def _refresh_after_processing(self, summary: Dict[str, Any], processed_days: set):
+        """
+        Update the category and day rollups so whole-inbox questions read cached summaries,
+        and the digests of the days that received processed emails.
+        """
+        if summary['total_processed']:
+            try:
+                self.summaries.refresh_rollups()
+            except Exception as e:
+                summary['errors'].append(f"Summary rollup failed: {str(e)}")
+            self.digest.update_days(processed_days)
+    
+    def _process_unit(self, unit_key: str, emails: List[Any]) -> Dict[str, Any]:
+        """Process one thread or single email, catching failures into the outcome."""
+        started = time.perf_counter()
+        outcome = {'unit': unit_key, 'email_ids': [email.id for email in emails], 'result': None}
+        try:
+            if emails[0].thread_id:
+                result = self.process_thread(unit_key)
+                outcome['email_ids'] = result['email_ids']
+            else:
+                result = self.process_email(unit_key)
+            outcome['result'] = result
+            outcome['errors'] = result['errors']
+            outcome['status'] = 'partial' if result['errors'] else 'ok'
+        except Exception as e:
+            outcome['errors'] = [f"Failed to process {unit_key}: {str(e)}"]
+            outcome['status'] = 'failed'
+        outcome['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return outcome
+    
+    def reprocess_email(self, email_id: str, prompt_type: str) -> Dict[str, Any]:
+        """
+        Re-run one pipeline step on an already-processed email, e.g. after editing its prompt.
+        
+        Args:
+            email_id: ID of the email
+            prompt_type: Step to re-run (categorization, action_extraction, auto_reply, summary, urgency_analysis)
+        
+        Returns:
+            Dictionary with the step's new results and any errors
+        """
+        if prompt_type not in REPROCESS_PROMPT_TYPES:
+            raise ValueError(f"Unsupported prompt type: {prompt_type}")
+        email = self.storage.get_email_by_id(email_id)
+        if not email:
+            raise ValueError(f"Email not found: {email_id}")
+        
+        thread_emails = self.storage.get_thread_emails(email.thread_id) if email.thread_id else [email]
+        body = self._build_thread_body(email, thread_emails)
+        results = {
+            'email_id': email_id,
+            'prompt_type': prompt_type,
+            'category': None,
+            'action_items': [],
+            'draft': None,
+            'errors': []
+        }
+        try:
+            if prompt_type == 'categorization':
+                # Only LLM labels were counted in the sender memo; labels inherited or memoized were not
+                previous = self.storage.get_category_by_email(email_id)
+                replaces = previous.category if previous is not None and previous.source == 'llm' else None
+                self._categorize(email, body, results, replaces=replaces)
+            elif prompt_type == 'action_extraction':
+                # Completed tasks are kept; open ones are replaced by the new extraction
+                self.storage.delete_open_action_items(email_id)
+                self._extract_actions(email, body, results)
+            elif prompt_type == 'auto_reply':
+                # Drafts the user edited or approved are kept; the one awaiting review is replaced
+                self.storage.delete_pending_drafts(email_id)
+                self._generate_draft(email, body, results)
+            elif prompt_type == 'summary':
+                results['summary'] = self.summaries.summarize_email(
+                    email.sender, email.subject, body, self.prompt_service.get_prompt_template('summary')
+                )
+                self.storage.update_email_summary(email_id, results['summary'])
+            else:
+                analysis = self.llm.analyze_urgency(
+                    email.sender, email.subject, body, self.prompt_service.get_prompt_template('urgency_analysis')
+                )
+                results['urgency_score'] = min(max(float(analysis['urgency_score']), 1.0), 5.0)
+                self.storage.update_email_urgency(email_id, results['urgency_score'])
+        except Exception as e:
+            results['errors'].append(f"Reprocessing ({prompt_type}) failed: {str(e)}")
+        return results
+    
+    def _process_all_job(self, params: Dict[str, Any], progress: Callable[[int, int, int], None],
+                         should_stop: Callable[[], bool]) -> Dict[str, Any]:
+        """Job handler for "Process All Emails"; resuming simply continues with the unprocessed emails."""
+        return self.process_all_emails(
+            limit=params.get('limit'),
+            progress_callback=lambda summary: progress(summary['total_processed'], summary['total'], summary['failed']),
+            should_stop=should_stop
+        )
+    
+    def chat_query(self, user_query: str, email_id: str = None, session_id: str = None,
+                   on_chunk: Callable[[str], None] = None) -> str:
         """
         Handle a chat query from the user.
         
         Args:
             user_query: User's question or request
             email_id: Optional specific email ID for context
+            session_id: Optional conversation ID; earlier turns of the
+                conversation are included so follow-up questions work
+            on_chunk: Stream the response to this callback as it is generated
+                (answers that need no LLM call arrive as one chunk)
             
         Returns:
             Agent's response
         """
+        memory = self.chat_memory.load(session_id) if session_id else {'summary': '', 'turns': []}
+        has_history = bool(memory['summary'] or memory['turns'])
+        
+        if not email_id and _DIGEST_QUERY.search(user_query):
+            # "What happened today?" is served from the materialized digest
+            answer = self._digest_answer(user_query)
+            if answer is not None:
+                self._record_chat(user_query, answer, "daily_digest", session_id)
+                return self._deliver(answer, on_chunk)
+        
+        if not email_id:
+            # Counts and lists are answered from the database without an LLM call
+            answer = self.intent_router.answer(user_query)
+            if answer is not None:
+                self._record_chat(user_query, answer, "intent_router", session_id)
+                return self._deliver(answer, on_chunk)
+        
+        # Repeated questions reuse the answer while the underlying data is unchanged;
+        # follow-ups depend on the conversation, so they are never served from the cache
+        fingerprint = self.answer_cache.fingerprint()
+        cached = None if has_history else self.answer_cache.get(user_query, email_id)
+        if cached is not None:
+            self._record_chat(user_query, cached, "answer_cache", session_id)
+            return self._deliver(cached, on_chunk)
+        
         context = ""
         
         # Build context based on query
@@ -198,50 +748,99 @@ Category: {formatted_email['category']}
 Action Items: {len(formatted_email['action_items'])}
 """
         else:
-            # General inbox context
-            query_lower = user_query.lower()
-            
-            if 'urgent' in query_lower or 'important' in query_lower:
-                context = self.email_service.get_emails_summary(category='Important')
-            elif 'task' in query_lower or 'to-do' in query_lower or 'action' in query_lower:
-                context = self.email_service.get_emails_summary(category='To-Do')
-                # Add action items
-                actions = self.storage.get_all_action_items(completed=False)
-                if actions:
-                    context += "\n\nPending Action Items:\n"
-                    for action in actions[:10]:
-                        context += f"- {action.task}"
-                        if action.deadline:
-                            context += f" (Due: {action.deadline})"
-                        context += f" [Priority: {action.priority}]\n"
-            elif 'meeting' in query_lower:
-                # Search for meeting-related emails
-                meetings = self.email_service.search_emails('meeting', limit=10)
-                context = "Meeting-related emails:\n"
-                for email in meetings:
-                    context += f"- {email.subject} (From: {email.sender_name})\n"
+            # General inbox context: headline statistics plus either the summary rollups
+            # (whole-inbox questions) or the emails most relevant to the query
+            stats = self.email_service.get_email_statistics()
+            overview = self.summaries.inbox_context() if _INBOX_SUMMARY.search(user_query) else ""
+            if overview:
+                section = f"Inbox summary (built from {stats['processed_emails']} processed emails):\n{overview}"
             else:
-                # General inbox summary
-                stats = self.email_service.get_email_statistics()
-                context = f"""
+                retrieval_query = user_query
+                if memory['turns']:
+                    # Follow-ups like "what about the second one?" need the previous question's topic
+                    retrieval_query = f"{memory['turns'][-1][0]} {user_query}"
+                relevant = self.retrieval.build_context(retrieval_query)
+                section = f"Relevant emails:\n{relevant or 'No matching emails found.'}"
+            context = f"""
 Inbox Statistics:
 - Total emails: {stats['total_emails']}
 - Processed: {stats['processed_emails']}
 - Categories: {stats['categories']}
 - Pending action items: {stats['pending_action_items']}
 
-Recent emails:
-{self.email_service.get_emails_summary()[:1000]}
+{section}
 """
         
         # Generate response
-        response = self.llm.chat_query(user_query, context)
+        response = self.llm.chat_query(user_query, context, history=memory['turns'], summary=memory['summary'],
+                                       on_chunk=on_chunk)
+        if not has_history:
+            self.answer_cache.put(user_query, response, fingerprint, email_id)
         
         # Store in chat history
-        self.storage.add_chat_message(user_query, response, context[:500])
+        self._record_chat(user_query, response, context[:500], session_id)
         
         return response
     
+    @staticmethod
+    def _deliver(answer: str, on_chunk: Callable[[str], None] = None) -> str:
+        """Pass a ready answer to a streaming callback as a single chunk."""
+        if on_chunk is not None:
+            on_chunk(answer)
+        return answer
+    
+    def regenerate_draft(self, draft_id: int) -> Any:
+        """
+        Replace a draft with another version, preferring a pre-generated variant.
+        
+        Args:
+            draft_id: Draft ID
+        
+        Returns:
+            The updated draft, or None if the draft or its email is missing
+        """
+        draft = self.draft_worker.next_variant(draft_id)
+        if draft is not None:
+            return draft
+        
+        draft = self.storage.get_draft(draft_id)
+        email = self.storage.get_email_by_id(draft.email_id) if draft else None
+        if email is None:
+            return None
+        reply_prompt = self.prompt_service.get_prompt_template('auto_reply')
+        draft_data = self.llm.generate_reply_draft(email.sender, email.subject, email.body, reply_prompt)
+        self.storage.update_draft(draft_id, draft_data.get('subject'), draft_data.get('body'), status='pending')
+        self.draft_worker.submit(email.id, email.sender, email.subject, email.body, reply_prompt,
+                                 exclude_tone=draft_data.get('tone'))
+        return self.storage.get_draft(draft_id)
+    
+    def _digest_answer(self, user_query: str) -> str:
+        """Format the digest of the day a question refers to (today, yesterday or the latest day)."""
+        today = datetime.utcnow().date()
+        if re.search(r'\byesterday\b', user_query, re.IGNORECASE):
+            requested = today - timedelta(days=1)
+        elif re.search(r'\btoday\b', user_query, re.IGNORECASE):
+            requested = today
+        else:
+            requested = None
+        
+        digest = self.digest.get(requested) if requested else None
+        if digest is not None and digest['email_count']:
+            return self.digest.format(digest)
+        
+        latest = self.digest.get()
+        if latest is None:
+            return None
+        note = f"No emails were received on {requested.isoformat()}. " if requested else ""
+        return note + self.digest.format(latest)
+    
+    def _record_chat(self, user_query: str, response: str, context: str, session_id: str = None):
+        """Store a chat turn, updating the conversation summary when it belongs to a session."""
+        if session_id:
+            self.chat_memory.record(session_id, user_query, response, context)
+        else:
+            self.storage.add_chat_message(user_query, response, context)
+    
     def generate_email_draft(self, subject: str, context: str, tone: str = "professional") -> Dict[str, str]:
         """
         Generate a new email draft (not a reply).
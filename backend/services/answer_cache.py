@@ -0,0 +1,94 @@
+"""
+Answer cache for repeated chat questions.
+"""
+import os
+import re
+from typing import Optional
+
+from backend.services.storage_service import StorageService
+
+CHAT_CACHE_ENABLED = os.getenv('CHAT_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Data scopes chat context is built from
+CACHE_SCOPES = ['actions', 'categories', 'emails']
+
+# Filler words that do not change what a chat question asks for
+_FILLER_WORDS = {
+    'a', 'an', 'the', 'all', 'please', 'my', 'me', 'i', 'of', 'for', 'to', 'do', 'have',
+    'any', 'can', 'you', 'show', 'give', 'what', 'are', 'is'
+}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduce a query to its meaningful words, in order.
+    
+    Punctuation, case and filler words are ignored, so "Please summarize all
+    the urgent emails!" and "summarize urgent emails" share a key. Word order
+    is kept: "Did Alice forward the contract to Bob?" asks something else
+    than "Did Bob forward the contract to Alice?", and any other differing
+    word ("approve" vs "reject", "this week" vs "last week") gives a
+    different key too.
+    """
+    words = re.sub(r"[^\w\s@'-]", ' ', query.lower()).split()
+    return ' '.join(word for word in words if word not in _FILLER_WORDS)
+
+
+class AnswerCache:
+    """Caches chat answers keyed by normalized query and the data versions the context was built from."""
+    
+    def __init__(self, storage_service: StorageService, enabled: bool = None):
+        """
+        Initialize answer cache.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            enabled: Whether lookups and stores are active
+        """
+        self.storage = storage_service
+        self.enabled = enabled if enabled is not None else CHAT_CACHE_ENABLED
+    
+    def get(self, query: str, email_id: str = None) -> Optional[str]:
+        """
+        Look up a cached answer.
+        
+        Answers are only returned while the emails, categories and action
+        items they were built from are unchanged; a write to any of them
+        changes the fingerprint and retires the entry.
+        
+        Args:
+            query: User question
+            email_id: Email the question is about, if any
+        
+        Returns:
+            Cached answer, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        key = normalize_query(query)
+        entries = self.storage.get_cached_answers(self.fingerprint(), email_id)
+        best = next((entry for entry in entries if entry.query_key == key), None)
+        if best is None:
+            return None
+        
+        self.storage.record_cache_hit(best.id)
+        return best.answer
+    
+    def fingerprint(self) -> str:
+        """Current versions of the data chat context is built from."""
+        return self.storage.get_data_fingerprint(CACHE_SCOPES)
+    
+    def put(self, query: str, answer: str, fingerprint: str, email_id: str = None):
+        """
+        Store an answer.
+        
+        Args:
+            query: User question
+            answer: Generated answer
+            fingerprint: Data fingerprint taken before the context was built
+            email_id: Email the question is about, if any
+        """
+        if not self.enabled:
+            return
+        key = normalize_query(query)
+        self.storage.add_cached_answer(key, fingerprint, answer, email_id=email_id)
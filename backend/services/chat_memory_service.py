@@ -0,0 +1,101 @@
+"""
+Chat memory service keeping multi-turn conversations within a fixed prompt size.
+"""
+import os
+from typing import Dict, Any, List, Tuple
+from backend.services.storage_service import StorageService
+from backend.services.llm_service import LLMService
+from backend.utils.helpers import truncate_text
+
+# Turns always sent verbatim
+CHAT_MEMORY_RECENT_TURNS = int(os.getenv('CHAT_MEMORY_RECENT_TURNS', '4'))
+# Older turns are folded into the summary this many at a time, so it is updated every few turns
+CHAT_MEMORY_FOLD_TURNS = int(os.getenv('CHAT_MEMORY_FOLD_TURNS', '4'))
+CHAT_MEMORY_SUMMARY_CHARS = int(os.getenv('CHAT_MEMORY_SUMMARY_CHARS', '1200'))
+CHAT_MEMORY_TURN_CHARS = int(os.getenv('CHAT_MEMORY_TURN_CHARS', '800'))
+
+
+class ChatMemoryService:
+    """Stores conversation turns and maintains a rolling summary of the ones outside the recent window."""
+    
+    def __init__(self, storage_service: StorageService, llm_service: LLMService):
+        """
+        Initialize chat memory.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            llm_service: LLM service used to update summaries
+        """
+        self.storage = storage_service
+        self.llm = llm_service
+    
+    def load(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get the conversation state to include in the next prompt.
+        
+        At most CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_FOLD_TURNS turns are
+        unsummarized at any time, each truncated, so the prompt stays bounded.
+        
+        Args:
+            session_id: Conversation ID
+        
+        Returns:
+            Dictionary with 'summary' and 'turns' ((user, assistant) pairs, oldest first)
+        """
+        chat_session = self.storage.get_chat_session(session_id)
+        summary = chat_session.summary if chat_session else ''
+        after_id = chat_session.summarized_through if chat_session else 0
+        messages = self.storage.get_session_messages(session_id, after_id)
+        return {
+            'summary': summary or '',
+            'turns': [self._turn(message) for message in messages]
+        }
+    
+    def record(self, session_id: str, user_message: str, response: str, context: str = None):
+        """
+        Store a turn and fold the oldest turns into the summary once enough have accumulated.
+        
+        Args:
+            session_id: Conversation ID
+            user_message: User's message
+            response: Assistant's response
+            context: Context used for the response (stored for reference)
+        """
+        self.storage.add_chat_message(user_message, response, context, session_id=session_id)
+        
+        chat_session = self.storage.get_chat_session(session_id)
+        summary = chat_session.summary if chat_session else ''
+        after_id = chat_session.summarized_through if chat_session else 0
+        messages = self.storage.get_session_messages(session_id, after_id)
+        if len(messages) < CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_FOLD_TURNS:
+            return
+        
+        folded = messages[:len(messages) - CHAT_MEMORY_RECENT_TURNS]
+        turns = [self._turn(message) for message in folded]
+        try:
+            summary = self.llm.summarize_conversation(summary, turns)
+        except Exception:
+            # Keep the prompt bounded even when the LLM is unavailable
+            summary = self._fallback_summary(summary, turns)
+        self.storage.save_chat_session(session_id, self._bound(summary), folded[-1].id)
+    
+    @staticmethod
+    def _turn(message: Any) -> Tuple[str, str]:
+        return (
+            truncate_text(message.user_message, CHAT_MEMORY_TURN_CHARS),
+            truncate_text(message.agent_response, CHAT_MEMORY_TURN_CHARS)
+        )
+    
+    @staticmethod
+    def _fallback_summary(summary: str, turns: List[Tuple[str, str]]) -> str:
+        """Extractive summary: the user's questions with the start of each answer."""
+        lines = [f"User asked: {truncate_text(user, 150)} -> {truncate_text(assistant, 150)}" for user, assistant in turns]
+        return "\n".join(([summary] if summary else []) + lines)
+    
+    @staticmethod
+    def _bound(summary: str) -> str:
+        """Keep the most recent part of an over-long summary."""
+        summary = summary.strip()
+        if len(summary) <= CHAT_MEMORY_SUMMARY_CHARS:
+            return summary
+        return "..." + summary[-(CHAT_MEMORY_SUMMARY_CHARS - 3):]
@@ -0,0 +1,100 @@
+"""
+Dedup service for reusing LLM results across near-duplicate emails.
+"""
+import os
+from typing import Dict, Any, Optional, List
+from backend.services.storage_service import StorageService
+from backend.utils.similarity import simhash_similarity
+
+
+class DedupService:
+    """Finds already-processed near-duplicates so their results can be inherited."""
+    
+    def __init__(self, storage_service: StorageService, threshold: float = None,
+                 inherit_actions: bool = None):
+        """
+        Initialize dedup service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            threshold: Minimum SimHash similarity (0-1) to treat emails as duplicates.
+                Values above ~0.95 are guaranteed to be found by the band index.
+            inherit_actions: Whether action items are copied along with the category
+        """
+        self.storage = storage_service
+        if threshold is None:
+            threshold = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.95'))
+        if inherit_actions is None:
+            inherit_actions = os.getenv('NEAR_DUPLICATE_INHERIT_ACTIONS', 'false').lower() == 'true'
+        self.threshold = threshold
+        self.inherit_actions = inherit_actions
+    
+    def find_duplicate(self, email_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar already-processed email above the threshold.
+        
+        Inherited results are traced back to the email that was actually
+        sent to the LLM, so provenance always points at an original.
+        
+        Args:
+            email_id: ID of the email being processed
+        
+        Returns:
+            Dictionary with source_email_id, similarity and category, or None
+        """
+        signature = self.storage.get_signature(email_id)
+        if signature is None:
+            return None
+        
+        best = None
+        for candidate in self.storage.find_signature_candidates(signature):
+            similarity = simhash_similarity(signature.simhash, candidate.simhash)
+            if similarity < self.threshold:
+                continue
+            if best is None or similarity > best['similarity']:
+                best = {'source_email_id': candidate.email_id, 'similarity': similarity}
+        
+        if best is None:
+            return None
+        
+        category = self.storage.get_category_by_email(best['source_email_id'])
+        if category.source_email_id and category.source != 'llm':
+            best['source_email_id'] = category.source_email_id
+        best['category'] = category.category
+        return best
+    
+    def get_inherited_emails(self) -> List[Dict[str, Any]]:
+        """
+        List emails whose category was inherited from a near-duplicate.
+        
+        Returns:
+            List of dictionaries with email_id, category and source_email_id
+        """
+        return [
+            {
+                'email_id': category.email_id,
+                'category': category.category,
+                'source_email_id': category.source_email_id,
+                'similarity': category.confidence
+            }
+            for category in self.storage.get_categories_by_source('near_duplicate')
+        ]
+    
+    def revert(self, email_id: str) -> bool:
+        """
+        Undo an inherited result so the email is processed by the LLM again.
+        
+        Args:
+            email_id: ID of the email to revert
+        
+        Returns:
+            True if inherited results were removed, False otherwise
+        """
+        category = self.storage.get_category_by_email(email_id)
+        if not category or category.source != 'near_duplicate':
+            return False
+        
+        self.storage.delete_category(email_id)
+        self.storage.delete_inherited_action_items(email_id)
+        self.storage.update_email_processed(email_id, False)
+        return True
@@ -0,0 +1,95 @@
+"""
+Digest service materializing per-day inbox digests.
+"""
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Iterable, Optional
+from backend.services.storage_service import StorageService
+
+DIGEST_SCOPES = ['actions', 'categories', 'drafts', 'emails']
+
+
+class DigestService:
+    """Builds and serves per-day digests: top important emails, new tasks and drafts awaiting review."""
+    
+    def __init__(self, storage_service: StorageService):
+        """
+        Initialize digest service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+        """
+        self.storage = storage_service
+    
+    def update_days(self, days: Iterable[date]) -> int:
+        """
+        Rebuild the digests of the given days.
+        
+        Args:
+            days: Days (UTC) whose emails changed
+        
+        Returns:
+            Number of digests written
+        """
+        fingerprint = self.storage.get_data_fingerprint(DIGEST_SCOPES)
+        count = 0
+        for day in sorted(set(days)):
+            start = datetime(day.year, day.month, day.day)
+            content = self.storage.build_day_digest(start, start + timedelta(days=1))
+            self.storage.save_digest(day.isoformat(), content, fingerprint)
+            count += 1
+        return count
+    
+    def get(self, day: date = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a day's digest, rebuilding it only if data changed since it was materialized.
+        
+        Args:
+            day: Day to get (defaults to the day of the newest email)
+        
+        Returns:
+            Digest dictionary with a 'day' key, or None if there are no emails
+        """
+        if day is None:
+            latest = self.storage.get_latest_email_time()
+            if latest is None:
+                return None
+            day = latest.date()
+        
+        row = self.storage.get_digest(day.isoformat())
+        if row is None or row.fingerprint != self.storage.get_data_fingerprint(DIGEST_SCOPES):
+            self.update_days([day])
+            row = self.storage.get_digest(day.isoformat())
+        digest = json.loads(row.content)
+        digest['day'] = row.day
+        return digest
+    
+    @staticmethod
+    def format(digest: Dict[str, Any]) -> str:
+        """
+        Render a digest as markdown for the chat.
+        
+        Args:
+            digest: Digest dictionary
+        
+        Returns:
+            Markdown text
+        """
+        lines = [f"**Digest for {digest['day']}**: {digest['email_count']} emails, {digest['unread_count']} unread."]
+        if digest['categories']:
+            lines.append(', '.join(f"{name}: {count}" for name, count in sorted(digest['categories'].items())))
+        
+        if digest['important']:
+            lines.append("\n**Top important emails**")
+            for email in digest['important']:
+                lines.append(f"- {email['subject']} — {email['sender']}")
+        if digest['tasks']:
+            lines.append("\n**New tasks**")
+            for task in digest['tasks']:
+                due = f" (due {task['due_date'] or task['deadline']})" if task['due_date'] or task['deadline'] else ""
+                lines.append(f"- {task['task']}{due}")
+        if digest['drafts']:
+            lines.append("\n**Drafts awaiting review**")
+            for draft in digest['drafts']:
+                lines.append(f"- {draft['subject']}")
+        return "\n".join(lines)
@@ -0,0 +1,111 @@
+"""
+Draft example service reusing the user's reviewed replies to similar emails.
+"""
+import os
+import re
+from typing import Dict, Any, List, Optional
+import numpy as np
+from backend.services.storage_service import StorageService
+from backend.utils.embeddings import EMBEDDING_DIM, estimate_tokens
+from backend.utils.helpers import truncate_text
+
+# Replies to emails at least this similar are used as few-shot examples
+DRAFT_EXAMPLE_SIMILARITY = float(os.getenv('DRAFT_EXAMPLE_SIMILARITY', '0.5'))
+# Above this similarity the reviewed reply is reused as a template without an LLM call
+DRAFT_TEMPLATE_SIMILARITY = float(os.getenv('DRAFT_TEMPLATE_SIMILARITY', '0.92'))
+DRAFT_EXAMPLE_TOKENS = int(os.getenv('DRAFT_EXAMPLE_TOKENS', '600'))
+DRAFT_EXAMPLE_MAX = int(os.getenv('DRAFT_EXAMPLE_MAX', '3'))
+
+
+class DraftExampleService:
+    """Finds approved or edited drafts written for emails similar to a new one."""
+    
+    def __init__(self, storage_service: StorageService):
+        """
+        Initialize draft example service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+        """
+        self.storage = storage_service
+    
+    def find(self, email: Any) -> List[Dict[str, Any]]:
+        """
+        Get the reviewed drafts whose original email is closest to an email.
+        
+        Args:
+            email: Email ORM object needing a reply
+        
+        Returns:
+            Example dictionaries with a 'similarity' key, most similar first
+        """
+        candidates = self.storage.get_reviewed_drafts(EMBEDDING_DIM, exclude_email_id=email.id)
+        if not candidates:
+            return []
+        
+        query = self.storage.get_email_vector(email.id)
+        if query is None or len(query) != EMBEDDING_DIM:
+            return []
+        similarities = np.vstack([candidate['vector'] for candidate in candidates]) @ query
+        
+        examples = []
+        for index in np.argsort(-similarities):
+            if similarities[index] < DRAFT_EXAMPLE_SIMILARITY or len(examples) >= DRAFT_EXAMPLE_MAX:
+                break
+            example = dict(candidates[index], similarity=float(similarities[index]))
+            del example['vector']
+            examples.append(example)
+        return examples
+    
+    @staticmethod
+    def few_shot_context(examples: List[Dict[str, Any]], max_tokens: int = None) -> str:
+        """
+        Format examples for the reply prompt, keeping within a token budget.
+        
+        Args:
+            examples: Examples from find(), most similar first
+            max_tokens: Token budget (defaults to DRAFT_EXAMPLE_TOKENS)
+        
+        Returns:
+            Example text, or an empty string if none fit
+        """
+        budget = max_tokens or DRAFT_EXAMPLE_TOKENS
+        blocks = []
+        for example in examples:
+            block = (
+                f"Email: {example['email_subject']}\n{truncate_text(example['email_body'], 600)}\n"
+                f"Reply ({example['tone'] or 'professional'}): {example['subject']}\n{truncate_text(example['body'], 800)}"
+            )
+            if estimate_tokens('\n\n'.join(blocks + [block])) > budget:
+                break
+            blocks.append(block)
+        return '\n\n'.join(blocks)
+    
+    @staticmethod
+    def template_reply(example: Dict[str, Any], email: Any) -> Optional[Dict[str, Any]]:
+        """
+        Adapt a reviewed reply to a near-identical email.
+        
+        The subject is rebuilt from the new email and the original recipient's
+        first name is replaced with the new sender's.
+        
+        Args:
+            example: Example from find()
+            email: Email ORM object needing a reply
+        
+        Returns:
+            Draft dictionary with subject, body and tone, or None if the example is not similar enough
+        """
+        if example['similarity'] < DRAFT_TEMPLATE_SIMILARITY:
+            return None
+        
+        body = example['body']
+        old_name = example['sender_name'].split()[0] if example['sender_name'].split() else ''
+        new_name = (email.sender_name or '').split()[0] if (email.sender_name or '').split() else ''
+        if old_name and new_name:
+            body = re.sub(rf'\b{re.escape(old_name)}\b', new_name, body)
+        return {
+            'subject': email.subject if email.subject.lower().startswith('re:') else f"Re: {email.subject}",
+            'body': body,
+            'tone': example['tone'] or 'professional'
+        }
@@ -0,0 +1,134 @@
+"""
+Draft worker pre-generating alternative reply drafts in the background.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, List, Optional
+from backend.models.database import Draft
+from backend.services.storage_service import StorageService, DRAFT_VARIANT
+from backend.services.llm_service import LLMService
+
+DRAFT_VARIANTS_ENABLED = os.getenv('DRAFT_VARIANTS_ENABLED', 'true').lower() == 'true'
+# Tones of the alternatives generated next to each reply draft
+DRAFT_VARIANT_TONES = [tone.strip() for tone in os.getenv('DRAFT_VARIANT_TONES', 'friendly,concise').split(',') if tone.strip()]
+DRAFT_WORKERS = int(os.getenv('DRAFT_WORKERS', '2'))
+
+
+class DraftWorker:
+    """
+    Generates reply variants in other tones off the request path.
+    
+    Variants are stored as drafts with draft_type 'variant'; they are hidden
+    from draft lists and swapped into the shown draft on Regenerate, so the
+    user never waits for an LLM call there once they are ready.
+    """
+    
+    def __init__(self, storage_service: StorageService, llm_service: LLMService,
+                 tones: List[str] = None, workers: int = None):
+        """
+        Initialize draft worker.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            llm_service: LLM service instance
+            tones: Variant tones (defaults to DRAFT_VARIANT_TONES)
+            workers: Concurrent background LLM calls
+        """
+        self.storage = storage_service
+        self.llm = llm_service
+        self.tones = DRAFT_VARIANT_TONES if tones is None else tones
+        self.executor = ThreadPoolExecutor(max_workers=workers or DRAFT_WORKERS, thread_name_prefix='draft-worker')
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, email_id: str, sender: str, subject: str, body: str,
+               reply_prompt: str, exclude_tone: str = None) -> Optional[Future]:
+        """
+        Queue variant generation for an email that needs a reply.
+        
+        Args:
+            email_id: Email ID
+            sender: Email sender
+            subject: Email subject
+            body: Body as sent to the LLM (may include thread context)
+            reply_prompt: The 'auto_reply' prompt template
+            exclude_tone: Tone of the draft already shown
+        
+        Returns:
+            Future of the generation job, or None if nothing was queued
+        """
+        if not DRAFT_VARIANTS_ENABLED or not self.tones:
+            return None
+        with self._lock:
+            if email_id in self._pending and not self._pending[email_id].done():
+                return self._pending[email_id]
+            future = self.executor.submit(
+                self._generate, email_id, sender, subject, body, reply_prompt, exclude_tone
+            )
+            self._pending[email_id] = future
+            future.add_done_callback(lambda _: self._forget(email_id, future))
+            return future
+    
+    def _forget(self, email_id: str, future: Future):
+        with self._lock:
+            if self._pending.get(email_id) is future:
+                del self._pending[email_id]
+    
+    def _generate(self, email_id: str, sender: str, subject: str, body: str,
+                  reply_prompt: str, exclude_tone: str = None) -> int:
+        """Generate the missing tone variants of one email; returns how many were stored."""
+        existing = {draft.tone for draft in self.storage.get_draft_variants(email_id)}
+        existing.add(exclude_tone)
+        count = 0
+        for tone in self.tones:
+            if tone in existing:
+                continue
+            draft_data = self.llm.generate_reply_draft(sender, subject, body, reply_prompt, tone=tone)
+            self.storage.add_draft(
+                email_id,
+                draft_data.get('subject', f"Re: {subject}"),
+                draft_data.get('body', ''),
+                draft_data.get('tone', tone),
+                draft_type=DRAFT_VARIANT
+            )
+            count += 1
+        return count
+    
+    def next_variant(self, draft_id: int) -> Optional[Draft]:
+        """
+        Swap the next ready variant into a draft.
+        
+        Args:
+            draft_id: Shown draft ID
+        
+        Returns:
+            The updated draft, or None if no variant is ready yet
+        """
+        draft = self.storage.get_draft(draft_id)
+        if draft is None:
+            return None
+        variants = self.storage.get_draft_variants(draft.email_id)
+        if not variants:
+            return None
+        return self.storage.swap_draft_variant(draft_id, variants[0].id)
+    
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for queued generations to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if nothing is pending anymore
+        """
+        with self._lock:
+            futures = list(self._pending.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+    
+    def pending_count(self) -> int:
+        """Number of emails with variants still being generated."""
+        with self._lock:
+            return sum(1 for future in self._pending.values() if not future.done())
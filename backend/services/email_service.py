@@ -5,6 +5,7 @@ import json
 import os
 from typing import List, Dict, Any
 from backend.services.storage_service import StorageService
+from backend.utils.helpers import shard_of
 
 
 class EmailService:
@@ -51,17 +52,34 @@ class EmailService:
         except Exception as e:
             raise Exception(f"Failed to load mock inbox: {str(e)}")
     
-    def get_emails_by_category(self, category: str) -> List[Any]:
+    def read_emails_file(self, path: str) -> List[Dict[str, Any]]:
+        """
+        Read emails from a JSON file ({"emails": [...]} like the mock inbox, or a list) or a JSONL file.
+        
+        Args:
+            path: Path to the file
+        
+        Returns:
+            List of email dictionaries
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.jsonl'):
+                return [json.loads(line) for line in f if line.strip()]
+            data = json.load(f)
+        return data.get('emails', []) if isinstance(data, dict) else data
+    
+    def get_emails_by_category(self, category: str, order_by: str = 'timestamp') -> List[Any]:
         """
         Get emails filtered by category.
         
         Args:
             category: Category name (Important, Newsletter, Spam, To-Do)
+            order_by: 'timestamp' for newest first, 'urgency' for most urgent first
             
         Returns:
             List of emails in the specified category
         """
-        return self.storage.get_all_emails(category=category)
+        return self.storage.get_all_emails(category=category, order_by=order_by)
     
     def get_unprocessed_emails(self) -> List[Any]:
         """
@@ -146,6 +164,33 @@ class EmailService:
         finally:
             session.close()
     
+    def get_shard_statistics(self, shard_count: int) -> List[Dict[str, Any]]:
+        """
+        Count processed and remaining emails of each processing shard.
+        
+        Emails are placed like AgentService.plan_processing does: by the hash
+        of their thread ID (or their own ID outside a thread).
+        
+        Args:
+            shard_count: Number of shards
+        
+        Returns:
+            One dictionary per shard (shard, total, processed, remaining)
+        """
+        shards = [{'shard': f"{index}/{shard_count}", 'total': 0, 'processed': 0, 'remaining': 0}
+                  for index in range(shard_count)]
+        session = self.storage.get_session()
+        try:
+            from backend.models.database import Email
+            
+            for email_id, thread_id, processed in session.query(Email.id, Email.thread_id, Email.processed):
+                shard = shards[shard_of(thread_id or email_id, shard_count)]
+                shard['total'] += 1
+                shard['processed' if processed else 'remaining'] += 1
+            return shards
+        finally:
+            session.close()
+    
     def format_email_for_display(self, email: Any) -> Dict[str, Any]:
         """
         Format an email object for display in UI.
@@ -170,6 +215,7 @@ class EmailService:
             'has_attachments': email.has_attachments,
             'labels': json.loads(email.labels) if email.labels else [],
             'processed': email.processed,
+            'urgency_score': email.urgency_score,
             'category': category.category if category else None,
             'action_items': [
                 {
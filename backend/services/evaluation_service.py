@@ -0,0 +1,165 @@
+"""
+Evaluation service comparing prompt template variants across stored emails.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import numpy as np
+from backend.services.storage_service import StorageService
+from backend.services.llm_service import LLMService, LLMCallError, split_prompt
+from backend.utils.embeddings import estimate_tokens
+
+EVAL_WORKERS = int(os.getenv('EVAL_WORKERS', '4'))
+EVAL_SAMPLE_SIZE = int(os.getenv('EVAL_SAMPLE_SIZE', '20'))
+
+VALID_CATEGORIES = ['Important', 'Newsletter', 'Spam', 'To-Do']
+JSON_PROMPT_TYPES = ['action_extraction', 'auto_reply', 'urgency_analysis']
+
+
+class EvaluationService:
+    """
+    Runs prompt variants over a sample of processed emails and compares them.
+    
+    Every (variant, email) output is stored in eval_results keyed by a hash of
+    the prompt type, template and model, so re-running an evaluation only
+    calls the LLM for new variants or newly sampled emails. Calls that fail
+    (rate limits, timeouts) are not stored and are retried on the next run.
+    """
+    
+    def __init__(self, storage_service: StorageService, llm_service: LLMService, workers: int = None):
+        """
+        Initialize evaluation service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            llm_service: LLM service instance
+            workers: Concurrent LLM calls
+        """
+        self.storage = storage_service
+        self.llm = llm_service
+        self.workers = workers or EVAL_WORKERS
+    
+    def evaluate(self, prompt_type: str, variants: Dict[str, str],
+                 sample_size: int = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Evaluate prompt variants on the most recent processed emails.
+        
+        Args:
+            prompt_type: Prompt type the templates are for (categorization, action_extraction, ...)
+            variants: Variant name -> template
+            sample_size: Number of emails to evaluate on
+        
+        Returns:
+            Variant name -> metrics: latency percentiles, token usage, JSON parse
+            failure rate, agreement with the stored labels and failed LLM calls
+        """
+        email_ids = self.storage.get_processed_email_ids(sample_size or EVAL_SAMPLE_SIZE)
+        emails = self.storage.get_email_details(email_ids)
+        
+        cached = {}
+        pending = []
+        for name, template in variants.items():
+            variant_hash = self.variant_hash(prompt_type, template)
+            cached[name] = self.storage.get_eval_results(variant_hash, email_ids)
+            pending += [
+                (name, variant_hash, template, emails[email_id])
+                for email_id in email_ids if email_id not in cached[name]
+            ]
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            fresh = list(executor.map(lambda job: self._run_one(prompt_type, *job[1:]), pending))
+        self.storage.add_eval_results([result for result in fresh if result is not None])
+        
+        call_errors = {name: 0 for name in variants}
+        for job, result in zip(pending, fresh):
+            if result is None:
+                call_errors[job[0]] += 1
+        
+        results = {}
+        for name, template in variants.items():
+            variant_hash = self.variant_hash(prompt_type, template)
+            rows = self.storage.get_eval_results(variant_hash, email_ids)
+            results[name] = self._metrics(prompt_type, list(rows.values()), emails, len(cached[name]))
+            results[name]['call_errors'] = call_errors[name]
+        return results
+    
+    def variant_hash(self, prompt_type: str, template: str) -> str:
+        """Cache key of a variant: the same template on another model is a different variant."""
+        key = f"{prompt_type}\n{self.llm.provider}:{getattr(self.llm, 'model', '')}\n{template}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def _run_one(self, prompt_type: str, variant_hash: str, template: str,
+                 email: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run one variant on one email and time it; None if the LLM call itself failed."""
+        prompt, prefix = split_prompt(template, sender=email['sender'], subject=email['subject'], body=email['body'])
+        parsed_ok = True
+        started = time.perf_counter()
+        try:
+            if prompt_type in JSON_PROMPT_TYPES:
+                output = json.dumps(self.llm.generate_json_completion(prompt, cache_prefix=prefix))
+            else:
+                output = self.llm.generate_completion(prompt, temperature=0.3, max_tokens=200, cache_prefix=prefix)
+                if prompt_type == 'categorization':
+                    output = output.strip().title()
+                    parsed_ok = output in VALID_CATEGORIES
+        except LLMCallError as e:
+            print(f"Evaluation call failed for {email['id']}: {str(e)}")
+            return None
+        except Exception as e:
+            output = str(e)
+            parsed_ok = False
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        usage = self.llm.get_last_call_usage() or {}
+        return {
+            'variant_hash': variant_hash,
+            'prompt_type': prompt_type,
+            'email_id': email['id'],
+            'output': output,
+            'parsed_ok': parsed_ok,
+            'latency_ms': latency_ms,
+            'input_tokens': usage.get('input_tokens') or estimate_tokens(prompt),
+            'output_tokens': usage.get('output_tokens') or estimate_tokens(output)
+        }
+    
+    @staticmethod
+    def _agrees(prompt_type: str, row: Any, email: Dict[str, Any]) -> Optional[bool]:
+        """Whether an output matches the email's stored label; None if there is nothing to compare."""
+        if not row.parsed_ok:
+            return False if prompt_type == 'categorization' and email['category'] else None
+        if prompt_type == 'categorization' and email['category']:
+            return row.output == email['category']
+        try:
+            if prompt_type == 'action_extraction':
+                return len(json.loads(row.output).get('tasks', [])) == len(email['pending_tasks'])
+            if prompt_type == 'urgency_analysis' and email['urgency_score'] is not None:
+                return abs(float(json.loads(row.output)['urgency_score']) - email['urgency_score']) <= 1
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+        return None
+    
+    def _metrics(self, prompt_type: str, rows: List[Any], emails: Dict[str, Dict[str, Any]],
+                 cached_count: int) -> Dict[str, Any]:
+        """Aggregate one variant's results."""
+        if not rows:
+            return {'emails': 0, 'cached': 0}
+        latencies = np.array([row.latency_ms for row in rows])
+        agreements = [
+            agrees for agrees in (self._agrees(prompt_type, row, emails[row.email_id]) for row in rows)
+            if agrees is not None
+        ]
+        return {
+            'emails': len(rows),
+            'cached': cached_count,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p90_ms': float(np.percentile(latencies, 90)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'avg_input_tokens': float(np.mean([row.input_tokens or 0 for row in rows])),
+            'avg_output_tokens': float(np.mean([row.output_tokens or 0 for row in rows])),
+            'parse_failure_rate': sum(1 for row in rows if not row.parsed_ok) / len(rows),
+            'agreement': sum(agreements) / len(agreements) if agreements else None,
+            'labeled': len(agreements)
+        }
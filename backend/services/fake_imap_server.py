@@ -0,0 +1,298 @@
+"""
+In-process fake IMAP server for offline testing and benchmarking of the IMAP connector.
+
+Implements the subset of IMAP4rev1 the connector uses: LOGIN, CAPABILITY,
+SELECT/EXAMINE, UID SEARCH, UID FETCH, NOOP, IDLE and LOGOUT.
+"""
+import re
+import select
+import socketserver
+import threading
+import time
+from typing import List, Tuple
+
+
+class _Message:
+    """A stored message."""
+    
+    def __init__(self, uid: int, raw: bytes, flags: Tuple[str, ...]):
+        self.uid = uid
+        self.raw = raw
+        self.flags = flags
+
+
+def _parse_uid_set(uid_set: str, max_uid: int) -> List[Tuple[int, int]]:
+    """Parse an IMAP sequence set such as '1,4:6,9:*' into inclusive ranges."""
+    ranges = []
+    for part in uid_set.split(','):
+        if ':' in part:
+            start, end = part.split(':', 1)
+            start = max_uid if start == '*' else int(start)
+            end = max_uid if end == '*' else int(end)
+            ranges.append((min(start, end), max(start, end)))
+        else:
+            value = max_uid if part == '*' else int(part)
+            ranges.append((value, value))
+    return ranges
+
+
+def _tokenize(args: str) -> List[str]:
+    """Split command arguments into atoms and quoted strings."""
+    return [quoted if quoted else atom for quoted, atom in re.findall(r'"((?:[^"\\]|\\.)*)"|(\S+)', args)]
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection."""
+    
+    def send(self, line: str):
+        self.wfile.write(line.encode('utf-8') + b'\r\n')
+        self.wfile.flush()
+    
+    def handle(self):
+        server = self.server.fake
+        self.authenticated = False
+        self.selected = False
+        self.send('* OK [CAPABILITY IMAP4rev1 IDLE] Fake IMAP server ready')
+        
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if not line:
+                continue
+            parts = line.split(' ', 2)
+            tag = parts[0]
+            command = parts[1].upper() if len(parts) > 1 else ''
+            args = parts[2] if len(parts) > 2 else ''
+            server.command_count += 1
+            
+            if command == 'CAPABILITY':
+                self.send('* CAPABILITY IMAP4rev1 IDLE')
+                self.send(f'{tag} OK CAPABILITY completed')
+            elif command == 'LOGIN':
+                tokens = _tokenize(args)
+                if len(tokens) == 2 and (tokens[0], tokens[1]) == (server.username, server.password):
+                    self.authenticated = True
+                    self.send(f'{tag} OK LOGIN completed')
+                else:
+                    self.send(f'{tag} NO LOGIN failed')
+            elif command == 'LOGOUT':
+                self.send('* BYE Fake IMAP server logging out')
+                self.send(f'{tag} OK LOGOUT completed')
+                return
+            elif command == 'NOOP':
+                self.send(f'{tag} OK NOOP completed')
+            elif not self.authenticated:
+                self.send(f'{tag} NO Not authenticated')
+            elif command in ('SELECT', 'EXAMINE'):
+                with server.lock:
+                    count = len(server.messages)
+                    uidnext = server.next_uid
+                self.selected = True
+                self.send(f'* {count} EXISTS')
+                self.send('* 0 RECENT')
+                self.send(f'* OK [UIDVALIDITY {server.uidvalidity}] UIDs valid')
+                self.send(f'* OK [UIDNEXT {uidnext}] Predicted next UID')
+                self.send(r'* FLAGS (\Seen \Answered \Flagged \Deleted \Draft)')
+                mode = 'READ-ONLY' if command == 'EXAMINE' else 'READ-WRITE'
+                self.send(f'{tag} OK [{mode}] {command} completed')
+            elif not self.selected:
+                self.send(f'{tag} BAD No mailbox selected')
+            elif command == 'UID':
+                self.handle_uid(tag, args)
+            elif command == 'IDLE':
+                self.handle_idle(tag)
+            else:
+                self.send(f'{tag} BAD Unsupported command {command}')
+    
+    def handle_uid(self, tag: str, args: str):
+        server = self.server.fake
+        subcommand, _, rest = args.partition(' ')
+        subcommand = subcommand.upper()
+        with server.lock:
+            messages = list(server.messages)
+        max_uid = messages[-1].uid if messages else 0
+        
+        if subcommand == 'SEARCH':
+            tokens = rest.split()
+            if len(tokens) >= 2 and tokens[0].upper() == 'UID':
+                ranges = _parse_uid_set(tokens[1], max_uid)
+                uids = [m.uid for m in messages if any(lo <= m.uid <= hi for lo, hi in ranges)]
+            else:
+                uids = [m.uid for m in messages]
+            self.send('* SEARCH' + ''.join(f' {uid}' for uid in uids))
+            self.send(f'{tag} OK SEARCH completed')
+        elif subcommand == 'FETCH':
+            uid_set, _, items = rest.partition(' ')
+            items = items.upper()
+            ranges = _parse_uid_set(uid_set, max_uid)
+            server.fetch_count += 1
+            for sequence, message in enumerate(messages, 1):
+                if not any(lo <= message.uid <= hi for lo, hi in ranges):
+                    continue
+                fields = [f'UID {message.uid}']
+                if 'FLAGS' in items:
+                    fields.append(f"FLAGS ({' '.join(message.flags)})")
+                if 'RFC822.SIZE' in items:
+                    fields.append(f'RFC822.SIZE {len(message.raw)}')
+                head = f"* {sequence} FETCH ({' '.join(fields)}"
+                if 'BODY[]' in items or 'BODY.PEEK[]' in items or 'RFC822 ' in items + ' ':
+                    self.wfile.write(f'{head} BODY[] {{{len(message.raw)}}}\r\n'.encode('utf-8'))
+                    self.wfile.write(message.raw)
+                    self.wfile.write(b')\r\n')
+                else:
+                    self.wfile.write(f'{head})\r\n'.encode('utf-8'))
+            self.send(f'{tag} OK FETCH completed')
+        else:
+            self.send(f'{tag} BAD Unsupported UID command')
+    
+    def handle_idle(self, tag: str):
+        server = self.server.fake
+        with server.lock:
+            known = len(server.messages)
+        self.send('+ idling')
+        while True:
+            with server.lock:
+                count = len(server.messages)
+            if count != known:
+                known = count
+                self.send(f'* {count} EXISTS')
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable:
+                line = self.rfile.readline()
+                if not line or line.strip().upper() == b'DONE':
+                    break
+        self.send(f'{tag} OK IDLE terminated')
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeIMAPServer:
+    """Threaded fake IMAP server listening on localhost."""
+    
+    def __init__(self, username: str = 'user', password: str = 'password',
+                 uidvalidity: int = 1, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the fake server.
+        
+        Args:
+            username: Accepted login username
+            password: Accepted login password
+            uidvalidity: UIDVALIDITY reported for the mailbox
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.username = username
+        self.password = password
+        self.uidvalidity = uidvalidity
+        self.messages: List[_Message] = []
+        self.next_uid = 1
+        self.lock = threading.Lock()
+        self.command_count = 0
+        self.fetch_count = 0
+        self._server = _ThreadingServer((host, port), _IMAPHandler)
+        self._server.fake = self
+        self._thread = None
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the server listens on."""
+        return self._server.server_address
+    
+    def add_message(self, raw: bytes, flags: Tuple[str, ...] = ()) -> int:
+        """
+        Append a raw RFC 822 message to the mailbox.
+        
+        Args:
+            raw: Message bytes
+            flags: IMAP flags such as '\\Seen'
+        
+        Returns:
+            UID assigned to the message
+        """
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append(_Message(uid, raw, tuple(flags)))
+            return uid
+    
+    def reset_uidvalidity(self, uidvalidity: int):
+        """Change UIDVALIDITY, as a server does after rebuilding a mailbox."""
+        with self.lock:
+            self.uidvalidity = uidvalidity
+    
+    def start(self) -> 'FakeIMAPServer':
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self) -> 'FakeIMAPServer':
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def build_message(index: int, sender: str = 'alerts@example.com', subject: str = None,
+                  body: str = None, in_reply_to: str = None) -> bytes:
+    """
+    Build a simple RFC 822 message for tests and benchmarks.
+    
+    Args:
+        index: Sequence number used for Message-ID, subject and date
+        sender: From address
+        subject: Subject (defaults to a numbered subject)
+        body: Plain text body
+        in_reply_to: Optional parent Message-ID
+    
+    Returns:
+        Message bytes
+    """
+    headers = [
+        f'From: Sender {index} <{sender}>',
+        'To: me@example.com',
+        f'Subject: {subject or f"Message {index}"}',
+        f'Date: Thu, 20 Nov 2025 09:{index % 60:02d}:00 +0000',
+        f'Message-ID: <msg{index}@example.com>',
+    ]
+    if in_reply_to:
+        headers.append(f'In-Reply-To: {in_reply_to}')
+    text = body or f'This is message number {index}.\nPlease review the attached report.'
+    return ('\r\n'.join(headers) + '\r\n\r\n' + text.replace('\n', '\r\n') + '\r\n').encode('utf-8')
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import tempfile
+    from backend.services.storage_service import StorageService
+    from backend.services.imap_service import IMAPConnector
+    
+    parser = argparse.ArgumentParser(description='Benchmark IMAP sync against the fake server')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    options = parser.parse_args()
+    
+    with FakeIMAPServer() as fake, tempfile.TemporaryDirectory() as tmp:
+        for i in range(options.messages):
+            fake.add_message(build_message(i, body=f'Benchmark body {i} ' * 20))
+        storage = StorageService(db_path=os.path.join(tmp, 'bench.db'))
+        host, port = fake.address
+        connector = IMAPConnector(storage, host=host, port=port, username='user', password='password',
+                                  use_ssl=False, batch_size=options.batch_size)
+        started = time.perf_counter()
+        count = connector.sync()
+        elapsed = time.perf_counter() - started
+        connector.close()
+        print(f"Synced {count} messages in {elapsed:.2f}s "
+              f"({count / elapsed:.0f} msg/s, {fake.fetch_count} FETCH round trips)")
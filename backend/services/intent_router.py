@@ -0,0 +1,247 @@
+"""
+Intent router answering structured chat questions directly from the database.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from backend.services.storage_service import StorageService
+from backend.utils.helpers import format_timestamp
+
+LIST_LIMIT = 10
+
+_COUNT = re.compile(r'\b(how many|count|number of)\b')
+_LIST = re.compile(r'^\s*(list|show|which|what are|give me|display|find|get)\b|\b(list|show me|do i have|are there)\b')
+_OPEN_ENDED = re.compile(
+    r'\b(why|how (do|can|should)|summar\w*|explain|should|draft|write|reply|respond|compare|about|mean)\b'
+)
+_EMAIL_TARGET = re.compile(r'\b(e-?mails?|messages?|mails?)\b')
+_TASK_TARGET = re.compile(r'\b(tasks?|action items?|to-?dos|deadlines?)\b')
+_CATEGORIES = [
+    (re.compile(r'\bimportant\b'), 'Important'),
+    (re.compile(r'\bnewsletters?\b'), 'Newsletter'),
+    (re.compile(r'\bspam\b'), 'Spam'),
+    (re.compile(r'\bto-?do\b'), 'To-Do'),
+]
+_PRIORITY = re.compile(r'\b(high|medium|low)[- ]priority\b')
+_URGENT = re.compile(r'\burgent\b')
+_UNREAD = re.compile(r"\b(unread|haven'?t (yet )?read|not (yet )?read)\b")
+_READ = re.compile(r'\b(already read|read)\b')
+_COMPLETED = re.compile(r'\b(completed|done|finished|closed)\b')
+_ALL_TASKS = re.compile(r'\ball (my |the )?(tasks|action items|to-?dos)\b')
+_SENDER = re.compile(r'\bfrom ([\w.+-]+@[\w.-]+|@?[\w.-]+)')
+_LAST_DAYS = re.compile(r'\b(last|past) (\d+) days\b')
+_NOT_SENDERS = {
+    'last', 'this', 'next', 'the', 'today', 'yesterday', 'my', 'a', 'an',
+    'important', 'newsletter', 'newsletters', 'spam', 'to-do', 'todo'
+}
+
+
+class IntentRouter:
+    """Matches count, list and filter questions and answers them with indexed SQL instead of the LLM."""
+    
+    def __init__(self, storage_service: StorageService):
+        """
+        Initialize intent router.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+        """
+        self.storage = storage_service
+        self._backfilled = False
+    
+    def parse(self, query: str, now: datetime = None) -> Optional[Dict[str, Any]]:
+        """
+        Recognize a structured intent in a chat question.
+        
+        Args:
+            query: User question
+            now: Current time for relative date phrases (defaults to UTC now)
+        
+        Returns:
+            Intent dictionary with action, target and filters, or None for
+            open-ended questions that need the LLM
+        """
+        text = query.lower().strip().rstrip('?.! ')
+        if not text or _OPEN_ENDED.search(text) or len(text.split()) > 20:
+            return None
+        
+        if _COUNT.search(text):
+            action = 'count'
+        elif _LIST.search(text):
+            action = 'list'
+        else:
+            return None
+        
+        email_match = _EMAIL_TARGET.search(text)
+        task_match = _TASK_TARGET.search(text)
+        if task_match and (not email_match or task_match.start() < email_match.start()):
+            target = 'tasks'
+        elif email_match:
+            target = 'emails'
+        else:
+            return None
+        
+        filters: Dict[str, Any] = {}
+        for pattern, category in _CATEGORIES:
+            if pattern.search(text) and not (category == 'To-Do' and target == 'tasks' and 'emails' not in text):
+                filters['category'] = category
+                break
+        
+        sender = _SENDER.search(text)
+        if sender and sender.group(1) not in _NOT_SENDERS:
+            filters['sender'] = sender.group(1)
+        
+        priority = _PRIORITY.search(text)
+        if target == 'tasks':
+            if priority:
+                filters['priority'] = priority.group(1)
+            elif _URGENT.search(text):
+                filters['priority'] = 'high'
+            if _ALL_TASKS.search(text):
+                filters['completed'] = None
+            else:
+                filters['completed'] = bool(_COMPLETED.search(text))
+        else:
+            if _UNREAD.search(text):
+                filters['is_read'] = False
+            elif _READ.search(text):
+                filters['is_read'] = True
+            if (priority and priority.group(1) == 'high') or _URGENT.search(text):
+                filters['min_urgency'] = 4.0
+        
+        window = self._time_window(text, now or datetime.utcnow(), target)
+        if window:
+            filters['window'] = window
+        
+        return {'action': action, 'target': target, 'filters': filters}
+    
+    @staticmethod
+    def _time_window(text: str, now: datetime, target: str) -> Optional[Tuple[Optional[datetime], Optional[datetime], str]]:
+        """Resolve a relative time phrase into (start, end, label)."""
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        monday = day - timedelta(days=day.weekday())
+        
+        if target == 'tasks' and 'overdue' in text:
+            return None, day, 'overdue'
+        last_days = _LAST_DAYS.search(text)
+        if last_days:
+            days = int(last_days.group(2))
+            return now - timedelta(days=days), None, f'in the last {days} days'
+        phrases = [
+            ('today', day, day + timedelta(days=1)),
+            ('tomorrow', day + timedelta(days=1), day + timedelta(days=2)),
+            ('yesterday', day - timedelta(days=1), day),
+            ('this week', monday, monday + timedelta(days=7)),
+            ('next week', monday + timedelta(days=7), monday + timedelta(days=14)),
+            ('last week', monday - timedelta(days=7), monday),
+        ]
+        for phrase, start, end in phrases:
+            if phrase in text:
+                return start, end, phrase
+        return None
+    
+    def answer(self, query: str, now: datetime = None) -> Optional[str]:
+        """
+        Answer a structured question from the database.
+        
+        Args:
+            query: User question
+            now: Current time for relative date phrases (defaults to UTC now)
+        
+        Returns:
+            Formatted answer, or None if the question should go to the LLM
+        """
+        intent = self.parse(query, now)
+        if intent is None:
+            return None
+        
+        filters = intent['filters']
+        limit = LIST_LIMIT if intent['action'] == 'list' else 0
+        start, end, _ = filters.get('window') or (None, None, None)
+        if intent['target'] == 'tasks':
+            if not self._backfilled:
+                self.storage.backfill_due_dates()
+                self._backfilled = True
+            total, items = self.storage.search_action_items(
+                completed=filters.get('completed'),
+                priority=filters.get('priority'),
+                due_after=start,
+                due_before=end,
+                category=filters.get('category'),
+                sender=filters.get('sender'),
+                limit=limit
+            )
+            lines = [self._format_task(item) for item in items]
+        else:
+            total, emails = self.storage.search_emails(
+                category=filters.get('category'),
+                is_read=filters.get('is_read'),
+                sender=filters.get('sender'),
+                since=start,
+                until=end,
+                min_urgency=filters.get('min_urgency'),
+                limit=limit
+            )
+            lines = [self._format_email(email) for email in emails]
+        
+        description = self._describe(intent, total)
+        if intent['action'] == 'count' or total == 0:
+            return f"You have {description}."
+        
+        answer = f"You have {description}:\n" + "\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+        if total > len(lines):
+            answer += f"\n...and {total - len(lines)} more."
+        return answer
+    
+    @staticmethod
+    def _describe(intent: Dict[str, Any], total: int) -> str:
+        """Build a phrase such as '3 unread To-Do emails from alice received this week'."""
+        filters = intent['filters']
+        words = [str(total)]
+        if intent['target'] == 'tasks':
+            if filters.get('completed') is True:
+                words.append('completed')
+            elif filters.get('completed') is False:
+                words.append('pending')
+            if filters.get('priority'):
+                words.append(f"{filters['priority']}-priority")
+            words.append('task' if total == 1 else 'tasks')
+            if filters.get('category'):
+                words.append(f"from {filters['category']} emails")
+        else:
+            if filters.get('is_read') is False:
+                words.append('unread')
+            elif filters.get('is_read') is True:
+                words.append('read')
+            if filters.get('min_urgency'):
+                words.append('urgent')
+            if filters.get('category'):
+                words.append(filters['category'])
+            words.append('email' if total == 1 else 'emails')
+        
+        if filters.get('sender'):
+            words.append(f"from {filters['sender']}")
+        window = filters.get('window')
+        if window:
+            label = window[2]
+            if intent['target'] == 'tasks':
+                words.append(label if label == 'overdue' else f'due {label}')
+            else:
+                words.append(label if label.startswith('in the') else f'received {label}')
+        return ' '.join(words)
+    
+    @staticmethod
+    def _format_email(email: Any) -> str:
+        """One-line summary of an email."""
+        sender = email.sender_name or email.sender
+        return f"{email.subject} — {sender} ({format_timestamp(email.timestamp)})"
+    
+    @staticmethod
+    def _format_task(item: Dict[str, Any]) -> str:
+        """One-line summary of an action item."""
+        details = [item['priority'] or 'medium']
+        if item['due_date']:
+            details.append(f"due {item['due_date'].strftime('%a %b %d')}")
+        elif item['deadline']:
+            details.append(f"due {item['deadline']}")
+        return f"{item['task']} ({', '.join(details)}) — from \"{item['email_subject']}\""
@@ -0,0 +1,252 @@
+"""
+Job service running long operations in background workers with persistent progress.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Iterator, Optional
+from backend.services.storage_service import StorageService
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))
+# A job without a heartbeat for this long is considered interrupted (e.g. the app restarted)
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '300'))
+
+ACTIVE_STATUSES = ['queued', 'running', 'cancelling']
+RESUMABLE_STATUSES = ['cancelled', 'interrupted', 'failed']
+
+# handler(params, progress(done, total, failed), should_stop()) -> result dictionary
+JobHandler = Callable[[Dict[str, Any], Callable[[int, int, int], None], Callable[[], bool]], Dict[str, Any]]
+
+
+class JobService:
+    """
+    Runs registered job types in a worker pool and records their progress in the jobs table.
+    
+    Job state lives in the database, so progress survives Streamlit reruns and
+    is visible to every session. Cancellation is cooperative: the handler
+    checks should_stop() between items. Cancelled, failed and interrupted jobs
+    can be resumed; handlers are expected to skip work that is already done.
+    """
+    
+    def __init__(self, storage_service: StorageService, workers: int = None):
+        """
+        Initialize job service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            workers: Jobs run concurrently
+        """
+        self.storage = storage_service
+        self.executor = ThreadPoolExecutor(max_workers=workers or JOB_WORKERS, thread_name_prefix='job-worker')
+        self.handlers: Dict[str, JobHandler] = {}
+        self._lock = threading.Lock()
+        self.recover()
+    
+    def register(self, job_type: str, handler: JobHandler):
+        """
+        Register the function that runs a job type.
+        
+        Args:
+            job_type: Job type name
+            handler: Called with the job parameters, a progress callback and a stop check
+        """
+        self.handlers[job_type] = handler
+    
+    def submit(self, job_type: str, params: Dict[str, Any] = None) -> str:
+        """
+        Queue a job, or return the active job of the same type.
+        
+        Args:
+            job_type: Registered job type
+            params: JSON-serializable job parameters
+        
+        Returns:
+            Job ID
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        with self._lock:
+            active = self.storage.get_jobs(job_type, ACTIVE_STATUSES, limit=1)
+            if active:
+                return active[0].id
+            job_id = uuid.uuid4().hex
+            self.storage.add_job(job_id, job_type, params)
+        self.executor.submit(self._run, job_id)
+        return job_id
+    
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job; a running job stops after its current item.
+        
+        Args:
+            job_id: Job ID
+        
+        Returns:
+            True if the job was cancelled or asked to stop
+        """
+        if self.storage.update_job(job_id, ['queued'], status='cancelled', finished_at=datetime.utcnow()):
+            return True
+        return self.storage.update_job(job_id, ['running'], status='cancelling')
+    
+    def resume(self, job_id: str) -> bool:
+        """
+        Run a cancelled, failed or interrupted job again, continuing its progress counts.
+        
+        Args:
+            job_id: Job ID
+        
+        Returns:
+            True if the job was queued
+        """
+        with self._lock:
+            job = self.storage.get_job(job_id)
+            if job is None or self.storage.get_jobs(job.job_type, ACTIVE_STATUSES, limit=1):
+                return False
+            if not self.storage.update_job(job_id, RESUMABLE_STATUSES, status='queued', error=None, finished_at=None):
+                return False
+        self.executor.submit(self._run, job_id)
+        return True
+    
+    def recover(self) -> int:
+        """
+        Mark active jobs whose worker stopped sending heartbeats as interrupted.
+        
+        Returns:
+            Number of jobs marked interrupted
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        count = 0
+        for job in self.storage.get_jobs(statuses=ACTIVE_STATUSES, limit=100):
+            last_seen = job.heartbeat_at or job.created_at
+            if last_seen < cutoff and self.storage.update_job(job.id, ACTIVE_STATUSES, status='interrupted'):
+                count += 1
+        return count
+    
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's progress with an ETA.
+        
+        Args:
+            job_id: Job ID
+        
+        Returns:
+            Status dictionary, or None if the job does not exist
+        """
+        job = self.storage.get_job(job_id)
+        return self._status(job) if job else None
+    
+    def latest(self, job_type: str) -> Optional[Dict[str, Any]]:
+        """Get the status of the most recent job of a type."""
+        jobs = self.storage.get_jobs(job_type, limit=1)
+        return self._status(jobs[0]) if jobs else None
+    
+    @staticmethod
+    def _status(job: Any) -> Dict[str, Any]:
+        eta = None
+        done_this_run = (job.done or 0) - (job.resumed_from or 0)
+        if job.status == 'running' and job.started_at and done_this_run > 0 and job.total:
+            elapsed = (datetime.utcnow() - job.started_at).total_seconds()
+            eta = elapsed / done_this_run * max(job.total - job.done, 0)
+        return {
+            'id': job.id,
+            'job_type': job.job_type,
+            'status': job.status,
+            'total': job.total or 0,
+            'done': job.done or 0,
+            'failed': job.failed or 0,
+            'progress': min((job.done or 0) / job.total, 1.0) if job.total else 0.0,
+            'eta_seconds': eta,
+            'active': job.status in ACTIVE_STATUSES,
+            'resumable': job.status in RESUMABLE_STATUSES,
+            'result': json.loads(job.result) if job.result else None,
+            'error': job.error,
+            'created_at': job.created_at.isoformat() if job.created_at else None
+        }
+    
+    def _run(self, job_id: str):
+        """Run one job in a worker thread."""
+        job = self.storage.get_job(job_id)
+        now = datetime.utcnow()
+        base = (job.done or 0) if job else 0
+        if job is None or not self.storage.update_job(
+            job_id, ['queued'], status='running', started_at=now, heartbeat_at=now, resumed_from=base
+        ):
+            return  # Cancelled before it started
+        
+        def progress(done: int, total: int, failed: int = 0):
+            self.storage.update_job(
+                job_id, ['running', 'cancelling'],
+                done=base + done, total=base + total, failed=failed, heartbeat_at=datetime.utcnow()
+            )
+        
+        def should_stop() -> bool:
+            current = self.storage.get_job(job_id)
+            return current is None or current.status != 'running'
+        
+        try:
+            result = self.handlers[job.job_type](json.loads(job.params or '{}'), progress, should_stop)
+            current = self.storage.get_job(job_id)
+            status = 'cancelled' if current is not None and current.status == 'cancelling' else 'completed'
+            self.storage.update_job(
+                job_id, ['running', 'cancelling'],
+                status=status, result=json.dumps(result, default=str), finished_at=datetime.utcnow()
+            )
+        except Exception as e:
+            self.storage.update_job(
+                job_id, ['running', 'cancelling'],
+                status='failed', error=str(e), finished_at=datetime.utcnow()
+            )
+    
+    @contextmanager
+    def track(self, job_type: str, params: Dict[str, Any] = None) -> Iterator[Callable[[int, int, int], None]]:
+        """
+        Record work running outside the worker pool, e.g. a CLI shard, as a job with progress.
+        
+        The job is running while the block runs, then completed, or failed if
+        it raises. Progress updates double as heartbeats, so a process that
+        dies is later marked interrupted like any other job.
+        
+        Args:
+            job_type: Job type name (need not be registered)
+            params: JSON-serializable job parameters
+        
+        Yields:
+            progress(done, total, failed) callback
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        self.storage.add_job(job_id, job_type, params)
+        self.storage.update_job(job_id, status='running', started_at=now, heartbeat_at=now)
+        
+        def progress(done: int, total: int, failed: int = 0):
+            self.storage.update_job(job_id, done=done, total=total, failed=failed, heartbeat_at=datetime.utcnow())
+        
+        try:
+            yield progress
+        except BaseException as e:
+            self.storage.update_job(job_id, status='failed', error=str(e) or type(e).__name__, finished_at=datetime.utcnow())
+            raise
+        self.storage.update_job(job_id, status='completed', finished_at=datetime.utcnow())
+    
+    def wait(self, job_id: str, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job is no longer active (for scripts and tests).
+        
+        Args:
+            job_id: Job ID
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Final status dictionary
+        """
+        deadline = datetime.utcnow() + timedelta(seconds=timeout)
+        status = self.get_status(job_id)
+        while status and status['active'] and datetime.utcnow() < deadline:
+            time.sleep(0.05)
+            status = self.get_status(job_id)
+        return status
@@ -2,53 +2,143 @@
 LLM Service for interacting with various LLM providers.
 """
 import os
+import re
 import json
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from backend.utils.embeddings import estimate_tokens
+from backend.utils.startup import load_env
 
-load_dotenv()
+load_env()
+
+# Mark the static start of template prompts for provider-side prompt caching
+PROMPT_CACHE_ENABLED = os.getenv('PROMPT_CACHE_ENABLED', 'true').lower() == 'true'
+# Gemini rejects cached content below a model-specific minimum size; shorter prefixes are sent inline
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv('GEMINI_CACHE_MIN_TOKENS', '32768'))
+GEMINI_CACHE_TTL_MINUTES = int(os.getenv('GEMINI_CACHE_TTL_MINUTES', '60'))
+# The Ollama server is checked on the first request rather than at startup
+OLLAMA_PROBE_TIMEOUT = float(os.getenv('OLLAMA_PROBE_TIMEOUT', '5'))
+
+SYSTEM_PROMPT = "You are a helpful email assistant that processes emails and helps users manage their inbox efficiently."
+
+_TEMPLATE_FIELD = re.compile(r'\{\{|\}\}|\{[^{}]*\}')
+
+
+def split_prompt(template: str, **fields: Any) -> Tuple[str, str]:
+    """
+    Format a prompt template and find its static prefix.
+    
+    The prefix is the template text before the first placeholder (for example
+    the categorization rules), which is identical for every email and can be
+    cached by the provider.
+    
+    Args:
+        template: Prompt template with {placeholders}
+        **fields: Placeholder values
+    
+    Returns:
+        Tuple of (formatted prompt, static prefix of the prompt)
+    """
+    prompt = template.format(**fields)
+    for match in _TEMPLATE_FIELD.finditer(template):
+        if match.group() not in ('{{', '}}'):
+            prefix = template[:match.start()].replace('{{', '{').replace('}}', '}')
+            return prompt, (prefix if prompt.startswith(prefix) else '')
+    return prompt, prompt
+
+
+class LLMCallError(Exception):
+    """The provider call itself failed (network, rate limit, timeout), so retrying may succeed."""
 
 
 class LLMService:
-    """Handles interactions with LLM providers (OpenAI, Anthropic, Ollama)."""
+    """Handles interactions with LLM providers (OpenAI, Anthropic, Gemini, Ollama, and a local fake)."""
     
     def __init__(self, provider: str = None):
         """
         Initialize LLM service.
         
         Args:
-            provider: LLM provider to use (openai, anthropic, ollama)
+            provider: LLM provider to use (openai, anthropic, gemini, ollama, fake)
         """
         self.provider = provider or os.getenv('LLM_PROVIDER', 'openai')
-        self.client = None
+        self._client = None
+        self._client_ready = False
+        self._client_lock = threading.Lock()
+        self.usage = {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0, 'cache_write_tokens': 0, 'output_tokens': 0}
+        self._usage_lock = threading.Lock()
+        self._local = threading.local()
+        self._prompt_caches = {}
         self._initialize_client()
     
     def _initialize_client(self):
-        """Initialize the appropriate LLM client based on provider."""
+        """
+        Check the provider's configuration.
+        
+        The provider SDK is imported and its client (or, for Ollama, the
+        connection check) created on first use by the client property, so
+        constructing the service stays fast.
+        """
+        if self.provider == 'openai':
+            self.api_key = os.getenv('OPENAI_API_KEY')
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+        
+        elif self.provider == 'anthropic':
+            self.api_key = os.getenv('ANTHROPIC_API_KEY')
+            if not self.api_key:
+                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
+            self.model = os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20241022')
+        
+        elif self.provider == 'gemini':
+            self.api_key = os.getenv('GEMINI_API_KEY')
+            if not self.api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            self.model = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+        
+        elif self.provider == 'ollama':
+            self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+            self.model = os.getenv('OLLAMA_MODEL', 'llama3')
+        
+        elif self.provider == 'fake':
+            # Offline provider that simulates prefix caching, for tests and cost estimates
+            self.model = 'fake'
+        
+        else:
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+    
+    @property
+    def client(self) -> Any:
+        """Provider client, created on first use."""
+        if not self._client_ready:
+            with self._client_lock:
+                if not self._client_ready:
+                    self._client = self._create_client()
+                    self._client_ready = True
+        return self._client
+    
+    @client.setter
+    def client(self, value: Any):
+        self._client = value
+        self._client_ready = True
+    
+    def _create_client(self) -> Any:
+        """Import the provider SDK and create its client."""
         try:
             if self.provider == 'openai':
                 import openai
-                self.api_key = os.getenv('OPENAI_API_KEY')
-                if not self.api_key:
-                    raise ValueError("OPENAI_API_KEY not found in environment variables")
-                self.client = openai.OpenAI(api_key=self.api_key)
-                self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+                return openai.OpenAI(api_key=self.api_key)
             
             elif self.provider == 'anthropic':
                 import anthropic
-                self.api_key = os.getenv('ANTHROPIC_API_KEY')
-                if not self.api_key:
-                    raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-                self.client = anthropic.Anthropic(api_key=self.api_key)
-                self.model = os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20241022')
+                return anthropic.Anthropic(api_key=self.api_key)
             
             elif self.provider == 'gemini':
                 import google.generativeai as genai
-                self.api_key = os.getenv('GEMINI_API_KEY')
-                if not self.api_key:
-                    raise ValueError("GEMINI_API_KEY not found in environment variables")
                 genai.configure(api_key=self.api_key)
-                self.model = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
                 
                 # Configure safety settings to be less restrictive for email processing
                 from google.generativeai.types import HarmCategory, HarmBlockThreshold
@@ -59,31 +149,31 @@ class LLMService:
                     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
                 }
                 
-                self.client = genai.GenerativeModel(
+                self.safety_settings = safety_settings
+                return genai.GenerativeModel(
                     self.model,
                     safety_settings=safety_settings
                 )
             
             elif self.provider == 'ollama':
                 import requests
-                self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-                self.model = os.getenv('OLLAMA_MODEL', 'llama3')
+                session = requests.Session()
                 # Test connection
                 try:
-                    response = requests.get(f"{self.base_url}/api/tags")
+                    response = session.get(f"{self.base_url}/api/tags", timeout=OLLAMA_PROBE_TIMEOUT)
                     if response.status_code != 200:
                         raise ValueError("Cannot connect to Ollama server")
                 except Exception as e:
                     raise ValueError(f"Ollama connection failed: {str(e)}")
+                return session
             
-            else:
-                raise ValueError(f"Unsupported LLM provider: {self.provider}")
+            return None
         
         except ImportError as e:
             raise ImportError(f"Required library for {self.provider} not installed: {str(e)}")
     
     def generate_completion(self, prompt: str, temperature: float = 0.7, 
-                          max_tokens: int = 1000) -> str:
+                          max_tokens: int = 1000, cache_prefix: str = None) -> str:
         """
         Generate a completion from the LLM.
         
@@ -91,32 +181,52 @@ class LLMService:
             prompt: The prompt to send to the LLM
             temperature: Sampling temperature (0-1)
             max_tokens: Maximum tokens to generate
+            cache_prefix: Static start of the prompt to cache on the provider side
             
         Returns:
             The generated text response
         """
+        prefix = cache_prefix if PROMPT_CACHE_ENABLED and cache_prefix and prompt.startswith(cache_prefix) else ''
+        # A failed call must not report the usage of this thread's previous call
+        self._local.last_usage = None
         try:
             if self.provider == 'openai':
+                # OpenAI caches repeated prompt prefixes automatically; the static
+                # system message and template prefix come first so they match
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=[
-                        {"role": "system", "content": "You are a helpful email assistant that processes emails and helps users manage their inbox efficiently."},
+                        {"role": "system", "content": SYSTEM_PROMPT},
                         {"role": "user", "content": prompt}
                     ],
                     temperature=temperature,
                     max_tokens=max_tokens
                 )
+                usage = response.usage
+                details = getattr(usage, 'prompt_tokens_details', None)
+                self._record_usage(usage.prompt_tokens, getattr(details, 'cached_tokens', 0) or 0,
+                                   output_tokens=usage.completion_tokens)
                 return response.choices[0].message.content.strip()
             
             elif self.provider == 'anthropic':
+                if prefix:
+                    content = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+                    if len(prompt) > len(prefix):
+                        content.append({"type": "text", "text": prompt[len(prefix):]})
+                else:
+                    content = prompt
                 response = self.client.messages.create(
                     model=self.model,
                     max_tokens=max_tokens,
                     temperature=temperature,
                     messages=[
-                        {"role": "user", "content": prompt}
+                        {"role": "user", "content": content}
                     ]
                 )
+                usage = response.usage
+                cached = getattr(usage, 'cache_read_input_tokens', 0) or 0
+                written = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+                self._record_usage(usage.input_tokens + cached + written, cached, written, usage.output_tokens)
                 return response.content[0].text.strip()
             
             elif self.provider == 'gemini':
@@ -126,10 +236,23 @@ class LLMService:
                     'max_output_tokens': max_tokens,
                 }
                 
-                response = self.client.generate_content(
-                    prompt,
-                    generation_config=generation_config
-                )
+                client = self.client
+                cached_model = self._gemini_cached_model(prefix) if prefix else None
+                if cached_model is not None:
+                    response = cached_model.generate_content(
+                        prompt[len(prefix):] or ' ',
+                        generation_config=generation_config
+                    )
+                else:
+                    response = client.generate_content(
+                        prompt,
+                        generation_config=generation_config
+                    )
+                usage = getattr(response, 'usage_metadata', None)
+                if usage is not None:
+                    self._record_usage(usage.prompt_token_count,
+                                       getattr(usage, 'cached_content_token_count', 0) or 0,
+                                       output_tokens=usage.candidates_token_count)
                 
                 # Check if response was blocked or has no text
                 if not response.parts:
@@ -145,8 +268,7 @@ class LLMService:
                 return response.text.strip()
             
             elif self.provider == 'ollama':
-                import requests
-                response = requests.post(
+                response = self.client.post(
                     f"{self.base_url}/api/generate",
                     json={
                         "model": self.model,
@@ -156,18 +278,185 @@ class LLMService:
                     }
                 )
                 response.raise_for_status()
-                return response.json()['response'].strip()
+                data = response.json()
+                self._record_usage(data.get('prompt_eval_count', 0), output_tokens=data.get('eval_count', 0))
+                return data['response'].strip()
+            
+            elif self.provider == 'fake':
+                cached = written = 0
+                if prefix:
+                    key = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+                    with self._usage_lock:
+                        seen = key in self._prompt_caches
+                        self._prompt_caches[key] = True
+                    if seen:
+                        cached = estimate_tokens(prefix)
+                    else:
+                        written = estimate_tokens(prefix)
+                response = '{}' if 'JSON' in prompt else 'OK'
+                self._record_usage(estimate_tokens(prompt), cached, written, estimate_tokens(response))
+                return response
+            
+        except Exception as e:
+            raise LLMCallError(f"LLM generation failed: {str(e)}") from e
+    
+    def stream_completion(self, prompt: str, on_chunk: Callable[[str], None], temperature: float = 0.7,
+                          max_tokens: int = 1000) -> str:
+        """
+        Generate a completion, passing text to a callback as the provider produces it.
+        
+        Providers without streaming support (and the fake provider) deliver
+        the whole response as a single chunk.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            on_chunk: Called with each piece of generated text, in order
+            temperature: Sampling temperature (0-1)
+            max_tokens: Maximum tokens to generate
+        
+        Returns:
+            The full generated text
+        """
+        if self.provider not in ('openai', 'anthropic', 'gemini', 'ollama'):
+            response = self.generate_completion(prompt, temperature=temperature, max_tokens=max_tokens)
+            on_chunk(response)
+            return response
+        
+        self._local.last_usage = None
+        parts = []
+        
+        def emit(text: str):
+            if text:
+                parts.append(text)
+                on_chunk(text)
+        
+        try:
+            if self.provider == 'openai':
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+                for chunk in stream:
+                    if chunk.choices:
+                        emit(chunk.choices[0].delta.content)
+                # The pinned SDK predates stream_options, so streamed calls report no usage; estimate it
+                self._record_usage(estimate_tokens(SYSTEM_PROMPT + prompt), output_tokens=estimate_tokens(''.join(parts)))
+            
+            elif self.provider == 'anthropic':
+                with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
+                    for text in stream.text_stream:
+                        emit(text)
+                    usage = stream.get_final_message().usage
+                self._record_usage(usage.input_tokens, output_tokens=usage.output_tokens)
+            
+            elif self.provider == 'gemini':
+                response = self.client.generate_content(
+                    prompt,
+                    generation_config={'temperature': temperature, 'max_output_tokens': max_tokens},
+                    stream=True
+                )
+                for chunk in response:
+                    if chunk.parts:
+                        emit(chunk.text)
+                usage = getattr(response, 'usage_metadata', None)
+                if usage is not None:
+                    self._record_usage(usage.prompt_token_count, output_tokens=usage.candidates_token_count)
             
+            else:
+                response = self.client.post(
+                    f"{self.base_url}/api/generate",
+                    json={"model": self.model, "prompt": prompt, "temperature": temperature, "stream": True},
+                    stream=True
+                )
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    emit(data.get('response'))
+                    if data.get('done'):
+                        self._record_usage(data.get('prompt_eval_count', 0), output_tokens=data.get('eval_count', 0))
+        
         except Exception as e:
-            raise Exception(f"LLM generation failed: {str(e)}")
+            raise LLMCallError(f"LLM generation failed: {str(e)}") from e
+        
+        return ''.join(parts).strip()
+    
+    def _gemini_cached_model(self, prefix: str) -> Any:
+        """Get a Gemini model bound to cached content holding the prefix, or None if it cannot be cached."""
+        if estimate_tokens(prefix) < GEMINI_CACHE_MIN_TOKENS:
+            return None
+        key = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+        entry = self._prompt_caches.get(key)
+        if entry is not None and entry[1] > datetime.utcnow():
+            return entry[0]
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+            ttl = timedelta(minutes=GEMINI_CACHE_TTL_MINUTES)
+            cached_content = caching.CachedContent.create(model=self.model, contents=[prefix], ttl=ttl)
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content,
+                safety_settings=self.safety_settings
+            )
+        except Exception:
+            # Models without caching support fall back to inline prompts
+            return None
+        self._prompt_caches[key] = (model, datetime.utcnow() + ttl - timedelta(minutes=1))
+        return model
+    
+    def _record_usage(self, input_tokens: int, cached_tokens: int = 0, cache_write_tokens: int = 0,
+                      output_tokens: int = 0):
+        """Add one call's token counts to the usage totals."""
+        self._local.last_usage = {
+            'input_tokens': input_tokens or 0,
+            'cached_tokens': cached_tokens or 0,
+            'output_tokens': output_tokens or 0
+        }
+        with self._usage_lock:
+            self.usage['calls'] += 1
+            self.usage['input_tokens'] += input_tokens or 0
+            self.usage['cached_tokens'] += cached_tokens or 0
+            self.usage['cache_write_tokens'] += cache_write_tokens or 0
+            self.usage['output_tokens'] += output_tokens or 0
+    
+    def get_last_call_usage(self) -> Optional[Dict[str, int]]:
+        """Token counts of the calling thread's most recent LLM call, if the provider reported them."""
+        local = getattr(self, '_local', None)
+        return getattr(local, 'last_usage', None)
+    
+    def get_usage_stats(self) -> Dict[str, Any]:
+        """
+        Get token usage since the service was created.
+        
+        Returns:
+            Dictionary with call and token counts and the share of input tokens served from the prompt cache
+        """
+        with self._usage_lock:
+            stats = dict(self.usage)
+        stats['cached_ratio'] = stats['cached_tokens'] / stats['input_tokens'] if stats['input_tokens'] else 0.0
+        return stats
     
-    def generate_json_completion(self, prompt: str, temperature: float = 0.3) -> Dict[str, Any]:
+    def generate_json_completion(self, prompt: str, temperature: float = 0.3,
+                                 cache_prefix: str = None) -> Dict[str, Any]:
         """
         Generate a JSON response from the LLM.
         
         Args:
             prompt: The prompt to send to the LLM
             temperature: Sampling temperature (lower for more deterministic JSON)
+            cache_prefix: Static start of the prompt to cache on the provider side
             
         Returns:
             Parsed JSON response as dictionary
@@ -181,7 +470,8 @@ class LLMService:
             else:
                 json_prompt = f"{prompt}\n\nCRITICAL: Your response must be ONLY valid JSON. Do not include any markdown formatting, code blocks, or explanatory text. Output raw JSON only."
             
-            response = self.generate_completion(json_prompt, temperature=temperature, max_tokens=1500)
+            response = self.generate_completion(json_prompt, temperature=temperature, max_tokens=1500,
+                                                cache_prefix=cache_prefix)
             original_response = response  # Save for error reporting
             
             # Check if response is a safety warning
@@ -243,6 +533,8 @@ class LLMService:
                 clean_preview = clean_preview[:500] + "..."
             
             raise Exception(f"JSON parsing failed. Gemini returned: {clean_preview}")
+        except LLMCallError:
+            raise
         except Exception as ex:
             raise Exception(f"Unexpected error in generate_json_completion: {str(ex)}")
     
@@ -260,13 +552,14 @@ class LLMService:
         Returns:
             Category name (Important, Newsletter, Spam, To-Do)
         """
-        prompt = categorization_prompt.format(
+        prompt, prefix = split_prompt(
+            categorization_prompt,
             sender=sender,
             subject=subject,
             body=body
         )
         
-        response = self.generate_completion(prompt, temperature=0.3, max_tokens=50)
+        response = self.generate_completion(prompt, temperature=0.3, max_tokens=50, cache_prefix=prefix)
         
         # Normalize response
         category = response.strip().title()
@@ -296,13 +589,14 @@ class LLMService:
         Returns:
             Dictionary with tasks list
         """
-        prompt = action_prompt.format(
+        prompt, prefix = split_prompt(
+            action_prompt,
             sender=sender,
             subject=subject,
             body=body
         )
         
-        result = self.generate_json_completion(prompt)
+        result = self.generate_json_completion(prompt, cache_prefix=prefix)
         
         # Ensure tasks key exists
         if 'tasks' not in result:
@@ -311,7 +605,7 @@ class LLMService:
         return result
     
     def generate_reply_draft(self, sender: str, subject: str, body: str,
-                            reply_prompt: str) -> Dict[str, Any]:
+                            reply_prompt: str, tone: str = None, examples: str = None) -> Dict[str, Any]:
         """
         Generate a reply draft for an email.
         
@@ -320,25 +614,32 @@ class LLMService:
             subject: Email subject
             body: Email body
             reply_prompt: The prompt template for reply generation
+            tone: Tone to write the reply in (defaults to the template's choice)
+            examples: The user's reviewed replies to similar emails, used as few-shot examples
             
         Returns:
             Dictionary with subject, body, and tone
         """
-        prompt = reply_prompt.format(
+        prompt, prefix = split_prompt(
+            reply_prompt,
             sender=sender,
             subject=subject,
             body=body
         )
+        if examples:
+            prompt += f"\n\nReplies the user approved for similar emails (match their content and style where relevant):\n{examples}"
+        if tone:
+            prompt += f"\n\nWrite the reply in a {tone} tone and set \"tone\" to \"{tone}\"."
         
-        response = self.generate_json_completion(prompt, temperature=0.7)
+        response = self.generate_json_completion(prompt, temperature=0.7, cache_prefix=prefix)
         
         # Ensure all required fields are present
         if 'subject' not in response:
             response['subject'] = f"Re: {subject}"
         if 'body' not in response:
             response['body'] = "Thank you for your email. I will review and respond shortly."
-        if 'tone' not in response:
-            response['tone'] = "professional"
+        if 'tone' not in response or tone:
+            response['tone'] = tone or "professional"
         
         return response
     
@@ -356,13 +657,14 @@ class LLMService:
         Returns:
             Dictionary with urgency_score, reason, and suggested_response_time
         """
-        prompt = urgency_prompt.format(
+        prompt, prefix = split_prompt(
+            urgency_prompt,
             sender=sender,
             subject=subject,
             body=body
         )
         
-        result = self.generate_json_completion(prompt)
+        result = self.generate_json_completion(prompt, cache_prefix=prefix)
         
         # Ensure required fields exist with defaults
         if 'urgency_score' not in result:
@@ -374,28 +676,109 @@ class LLMService:
         
         return result
     
-    def chat_query(self, query: str, context: str = "") -> str:
+    def summarize_email(self, sender: str, subject: str, body: str, summary_prompt: str) -> str:
+        """
+        Summarize an email in a few sentences.
+        
+        Args:
+            sender: Email sender
+            subject: Email subject
+            body: Email body
+            summary_prompt: The prompt template for summaries
+        
+        Returns:
+            Summary text
+        """
+        prompt, prefix = split_prompt(
+            summary_prompt,
+            sender=sender,
+            subject=subject,
+            body=body
+        )
+        return self.generate_completion(prompt, temperature=0.3, max_tokens=200, cache_prefix=prefix)
+    
+    def summarize_summaries(self, label: str, summaries: List[str], max_words: int = 120) -> str:
+        """
+        Combine several summaries into one (the reduce step of hierarchical summarization).
+        
+        Args:
+            label: What the summaries cover, e.g. "category Important"
+            summaries: Summaries to combine
+            max_words: Target length of the combined summary
+        
+        Returns:
+            Combined summary
+        """
+        items = "\n".join(f"- {summary}" for summary in summaries)
+        prompt = f"""Combine these summaries of emails ({label}) into one overview of at most {max_words} words.
+Group related items, keep names, dates and required actions, and drop repetition.
+
+Summaries:
+{items}
+
+Overview:"""
+        return self.generate_completion(prompt, temperature=0.3, max_tokens=max_words * 2)
+    
+    def chat_query(self, query: str, context: str = "", history: List[Tuple[str, str]] = None,
+                   summary: str = "", on_chunk: Callable[[str], None] = None) -> str:
         """
         Handle a chat query about emails.
         
         Args:
             query: User's question or request
             context: Additional context (email content, summaries, etc.)
+            history: Recent (user message, assistant response) turns, oldest first
+            summary: Summary of the conversation before the recent turns
+            on_chunk: Stream the response to this callback as it is generated
             
         Returns:
             Agent's response
         """
+        conversation = ""
+        if summary:
+            conversation += f"\nEarlier in this conversation:\n{summary}\n"
+        if history:
+            turns = "\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in history)
+            conversation += f"\nRecent messages:\n{turns}\n"
+        
         prompt = f"""You are an intelligent email assistant. Help the user with their email-related query.
 
 Context:
 {context}
-
+{conversation}
 User Query: {query}
 
 Provide a helpful, concise response. If the query involves summarizing emails, extracting information, or drafting responses, do so clearly and professionally."""
 
+        if on_chunk is not None:
+            return self.stream_completion(prompt, on_chunk, temperature=0.7, max_tokens=1500)
         return self.generate_completion(prompt, temperature=0.7, max_tokens=1500)
     
+    def summarize_conversation(self, summary: str, turns: List[Tuple[str, str]], max_words: int = 150) -> str:
+        """
+        Fold conversation turns into a running summary.
+        
+        Args:
+            summary: Current summary (may be empty)
+            turns: (user message, assistant response) turns to add, oldest first
+            max_words: Target length of the updated summary
+        
+        Returns:
+            Updated summary
+        """
+        transcript = "\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in turns)
+        prompt = f"""Update the summary of a conversation between a user and their email assistant.
+
+Current summary:
+{summary or '(none)'}
+
+New messages:
+{transcript}
+
+Write the updated summary in at most {max_words} words. Keep the facts, emails, names, dates and open questions the user may refer back to. Respond with ONLY the summary."""
+
+        return self.generate_completion(prompt, temperature=0.3, max_tokens=max_words * 2)
+    
     def test_connection(self) -> bool:
         """
         Test if the LLM connection is working.
@@ -0,0 +1,143 @@
+"""
+Retrieval service for selecting the emails most relevant to a chat query.
+"""
+import os
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+from backend.services.storage_service import StorageService
+from backend.services.vector_index import VectorIndex
+from backend.utils.embeddings import embed_texts, estimate_tokens, EMBEDDING_DIM
+from backend.utils.helpers import strip_quoted_text, truncate_text
+
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '8'))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv('RETRIEVAL_TOKEN_BUDGET', '1500'))
+RETRIEVAL_SNIPPET_CHARS = int(os.getenv('RETRIEVAL_SNIPPET_CHARS', '400'))
+# IVF partitioning of the vector index (0 = exact search over all rows)
+VECTOR_INDEX_NLIST = int(os.getenv('VECTOR_INDEX_NLIST', '0'))
+VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', '8'))
+# Rows per IVF list required before the partitioning is trained
+IVF_MIN_ROWS_PER_LIST = 40
+
+
+class RetrievalService:
+    """Embedding search over stored emails, backed by a memory-mapped index kept in sync with the database."""
+    
+    def __init__(self, storage_service: StorageService, index_prefix: str = None):
+        """
+        Initialize retrieval service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            index_prefix: Path prefix for the vector index files (defaults to
+                the database path without its extension)
+        """
+        self.storage = storage_service
+        if index_prefix is None:
+            index_prefix = os.path.splitext(storage_service.db_path)[0] + '.vectors'
+        self.index = VectorIndex(index_prefix, EMBEDDING_DIM)
+        self._lock = threading.Lock()
+        self._backfilled = False
+    
+    def refresh(self) -> int:
+        """
+        Append embeddings added since the last refresh to the index.
+        
+        Rebuilds the index when emails were deleted (the stored row count no
+        longer matches the index).
+        
+        Returns:
+            Number of vectors added to the index
+        """
+        with self._lock:
+            if not self._backfilled:
+                # Emails stored before embeddings existed
+                self.storage.backfill_embeddings()
+                self._backfilled = True
+            self.index.reload_if_changed()
+            expected = self.storage.count_embeddings(dim=EMBEDDING_DIM)
+            rows = self.storage.get_embeddings_since(self.index.watermark, limit=expected + 1, dim=EMBEDDING_DIM)
+            if self.index.live_count + len(rows) != expected:
+                self.index.reset()
+                rows = self.storage.get_embeddings_since(0, limit=expected + 1, dim=EMBEDDING_DIM)
+            
+            if rows:
+                self.index.append(
+                    [row.email_id for row in rows],
+                    np.vstack([np.frombuffer(row.vector, dtype=np.float32) for row in rows]),
+                    watermark=rows[-1].id
+                )
+            
+            if (VECTOR_INDEX_NLIST and not self.index.meta.get('nlist')
+                    and self.index.live_count >= VECTOR_INDEX_NLIST * IVF_MIN_ROWS_PER_LIST):
+                self.index.train_ivf(VECTOR_INDEX_NLIST)
+            return len(rows)
+    
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[str, float]]:
+        """
+        Find the emails most similar to a query.
+        
+        Args:
+            query: Query text
+            k: Number of results
+        
+        Returns:
+            List of (email_id, cosine similarity), best first
+        """
+        return self.search_many([query], k)[0]
+    
+    def search_many(self, queries: List[str], k: int = RETRIEVAL_TOP_K) -> List[List[Tuple[str, float]]]:
+        """
+        Find the emails most similar to each of several queries in one pass.
+        
+        Args:
+            queries: Query texts
+            k: Number of results per query
+        
+        Returns:
+            For each query, a list of (email_id, cosine similarity), best first
+        """
+        self.refresh()
+        results = self.index.search(embed_texts(queries), k, nprobe=VECTOR_INDEX_NPROBE)
+        return [[(email_id, score) for email_id, score in hits if score > 0] for hits in results]
+    
+    def build_context(self, query: str, k: int = RETRIEVAL_TOP_K,
+                      token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> str:
+        """
+        Format the most relevant emails as chat context within a token budget.
+        
+        Args:
+            query: User query
+            k: Maximum number of emails
+            token_budget: Approximate token limit for the returned text
+        
+        Returns:
+            Context text, empty if nothing relevant was found
+        """
+        hits = self.search(query, k)
+        if not hits:
+            return ""
+        
+        details = self.storage.get_email_details([email_id for email_id, _ in hits])
+        blocks = []
+        used = 0
+        for email_id, _ in hits:
+            email = details.get(email_id)
+            if not email:
+                continue
+            snippet = ' '.join((strip_quoted_text(email['body']) or email['body']).split())
+            block = (
+                f"[{email['category'] or 'Uncategorized'}] From: {email['sender_name'] or email['sender']} | "
+                f"Subject: {email['subject']} | Date: {email['timestamp'].strftime('%Y-%m-%d %H:%M')}\n"
+                f"{truncate_text(snippet, RETRIEVAL_SNIPPET_CHARS)}"
+            )
+            for task in email['pending_tasks']:
+                block += f"\n  Task: {task}"
+            cost = estimate_tokens(block)
+            if blocks and used + cost > token_budget:
+                break
+            blocks.append(block)
+            used += cost
+        return "\n\n".join(blocks)
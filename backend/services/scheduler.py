@@ -0,0 +1,79 @@
+"""
+Priority scheduler for ordering the processing backlog by urgency.
+"""
+import heapq
+import itertools
+import os
+from datetime import datetime
+from typing import Any, Iterator, List, Tuple
+from backend.utils.urgency import estimate_urgency
+
+# Urgency bonus per day an email has waited in the backlog, and its cap
+AGE_BONUS_PER_DAY = float(os.getenv('SCHEDULER_AGE_BONUS_PER_DAY', '0.25'))
+AGE_BONUS_MAX = float(os.getenv('SCHEDULER_AGE_BONUS_MAX', '1.0'))
+
+
+class PriorityScheduler:
+    """Max-priority queue of work units (threads or single emails)."""
+    
+    def __init__(self, now: datetime = None):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            now: Reference time for age bonuses (defaults to current UTC time)
+        """
+        self.now = now or datetime.utcnow()
+        self._heap = []
+        self._counter = itertools.count()
+    
+    def priority(self, emails: List[Any]) -> float:
+        """
+        Compute the priority of a work unit.
+        
+        The most urgent email of the unit sets the priority. Time spent waiting
+        in the backlog adds a capped bonus so low-urgency mail is not starved.
+        
+        Args:
+            emails: Emails in the unit
+        
+        Returns:
+            Priority score (higher runs first)
+        """
+        best = 0.0
+        for email in emails:
+            score = email.urgency_score
+            if score is None:
+                score = estimate_urgency(email.sender, email.subject, email.body)
+            waited_days = max((self.now - (email.created_at or self.now)).total_seconds(), 0) / 86400
+            best = max(best, score + min(waited_days * AGE_BONUS_PER_DAY, AGE_BONUS_MAX))
+        return best
+    
+    def push(self, key: str, emails: List[Any]):
+        """
+        Add a work unit to the queue.
+        
+        Args:
+            key: Thread ID or email ID identifying the unit
+            emails: Emails in the unit
+        """
+        # heapq is a min-heap; the counter keeps insertion order among equal priorities
+        heapq.heappush(self._heap, (-self.priority(emails), next(self._counter), key, emails))
+    
+    def pop(self) -> Tuple[str, List[Any]]:
+        """
+        Remove and return the highest-priority work unit.
+        
+        Returns:
+            Tuple of (key, emails)
+        """
+        _, _, key, emails = heapq.heappop(self._heap)
+        return key, emails
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def drain(self) -> Iterator[Tuple[str, List[Any]]]:
+        """Yield work units from highest to lowest priority."""
+        while self._heap:
+            yield self.pop()
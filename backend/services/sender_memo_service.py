@@ -0,0 +1,102 @@
+"""
+Sender memo service for short-circuiting categorization of predictable senders.
+"""
+import os
+import random
+from datetime import datetime
+from typing import Dict, Any, Optional
+from backend.services.storage_service import StorageService
+from backend.utils.helpers import decayed_weight, sender_keys
+
+
+class SenderMemoService:
+    """Tracks per-sender and per-domain category history and predicts categories from it."""
+    
+    def __init__(self, storage_service: StorageService, half_life_days: float = None,
+                 min_weight: float = None, min_share: float = None,
+                 verify_rate: float = None, rng: random.Random = None):
+        """
+        Initialize sender memo service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            half_life_days: Days after which a past categorization counts half
+            min_weight: Minimum decayed history weight before predicting
+            min_share: Minimum share of the dominant category before predicting
+            verify_rate: Fraction of predictions re-verified with the LLM
+            rng: Random generator used for verification sampling
+        """
+        self.storage = storage_service
+        self.half_life_days = half_life_days if half_life_days is not None else float(
+            os.getenv('SENDER_MEMO_HALF_LIFE_DAYS', '30'))
+        self.min_weight = min_weight if min_weight is not None else float(
+            os.getenv('SENDER_MEMO_MIN_WEIGHT', '3'))
+        self.min_share = min_share if min_share is not None else float(
+            os.getenv('SENDER_MEMO_MIN_SHARE', '0.9'))
+        self.verify_rate = verify_rate if verify_rate is not None else float(
+            os.getenv('SENDER_MEMO_VERIFY_RATE', '0.1'))
+        self.rng = rng or random.Random()
+    
+    def record(self, sender: str, category: str):
+        """
+        Record an LLM categorization for the sender and its domain.
+        
+        Only LLM decisions are recorded; inherited or memoized categories
+        would otherwise reinforce themselves.
+        
+        Args:
+            sender: Sender email address
+            category: Category assigned by the LLM
+        """
+        for key in sender_keys(sender):
+            self.storage.record_sender_category(key, category, self.half_life_days)
+    
+    def withdraw(self, sender: str, category: str):
+        """
+        Withdraw a categorization recorded earlier, e.g. when the email is re-categorized.
+        
+        Args:
+            sender: Sender email address
+            category: Category the earlier LLM call assigned
+        """
+        for key in sender_keys(sender):
+            self.storage.record_sender_category(key, category, self.half_life_days, delta=-1.0)
+    
+    def predict(self, sender: str) -> Optional[Dict[str, Any]]:
+        """
+        Predict a category from the sender's history, most specific key first.
+        
+        Args:
+            sender: Sender email address
+        
+        Returns:
+            Dictionary with category, confidence and sender_key, or None when
+            the history is too thin or inconsistent
+        """
+        now = datetime.utcnow()
+        for key in sender_keys(sender):
+            weights = {
+                stat.category: decayed_weight(stat.weight, stat.last_updated, now, self.half_life_days)
+                for stat in self.storage.get_sender_stats(key)
+            }
+            total = sum(weights.values())
+            # Compare at one decimal so a few hours of decay don't hide fresh history
+            if round(total, 1) < self.min_weight:
+                continue
+            
+            category, weight = max(weights.items(), key=lambda item: item[1])
+            share = weight / total
+            if share >= self.min_share:
+                return {'category': category, 'confidence': share, 'sender_key': key}
+            # The address history is decisive even when inconsistent
+            return None
+        return None
+    
+    def should_verify(self) -> bool:
+        """
+        Decide whether a prediction should be re-verified with the LLM.
+        
+        Returns:
+            True for a random verify_rate fraction of predictions
+        """
+        return self.rng.random() < self.verify_rate
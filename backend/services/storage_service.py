@@ -3,11 +3,45 @@ Storage service for database operations.
 """
 import os
 import json
-from datetime import datetime
-from typing import List, Dict, Optional, Any
-from sqlalchemy import create_engine, desc
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
+from sqlalchemy import create_engine, desc, func, or_, and_, inspect, text, tuple_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, Session
-from backend.models.database import Base, Email, Prompt, EmailCategory, ActionItem, Draft, ChatHistory
+from backend.models.database import (
+    Base, Email, EmailThread, EmailReference, EmailSignature, Prompt, EmailCategory, SenderCategoryStat,
+    ActionItem, Draft, ChatHistory, ChatSession, ImapSyncState, EmailEmbedding, DataVersion, ChatAnswerCache,
+    SummaryRollup, DailyDigest, Job, EvalResult, WorkItem
+)
+from backend.utils.helpers import (
+    normalize_subject, is_reply_subject, parse_message_ids, parse_timestamp, parse_deadline,
+    strip_quoted_text, decayed_weight
+)
+from backend.utils.similarity import simhash, simhash_bands
+from backend.utils.urgency import estimate_urgency
+from backend.utils.embeddings import embed_text
+
+# Replies matched only by subject must arrive within this window of the thread's last message
+THREAD_SUBJECT_WINDOW_DAYS = int(os.getenv('THREAD_SUBJECT_WINDOW_DAYS', '30'))
+
+# Data scopes whose changes invalidate cached answers and digests: scope -> (table, trigger events)
+VERSIONED_SCOPES = {
+    'emails': ('emails', ['INSERT', 'DELETE', 'UPDATE OF subject, body, processed']),
+    'categories': ('email_categories', ['INSERT', 'DELETE', 'UPDATE']),
+    'actions': ('action_items', ['INSERT', 'DELETE', 'UPDATE']),
+    'drafts': ('drafts', ['INSERT', 'DELETE', 'UPDATE']),
+}
+
+# draft_type of pre-generated alternatives, which stay hidden until swapped in
+DRAFT_VARIANT = 'variant'
+
+
+def _shown_draft():
+    """Filter excluding pre-generated draft variants."""
+    return or_(Draft.draft_type.is_(None), Draft.draft_type != DRAFT_VARIANT)
 
 
 class StorageService:
@@ -19,11 +53,78 @@ class StorageService:
             db_path = os.getenv('DATABASE_PATH', 'data/email_agent.db')
         
         # Ensure data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
+        self.db_path = db_path
         self.engine = create_engine(f'sqlite:///{db_path}')
         Base.metadata.create_all(self.engine)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        self._migrate_schema()
+        self._backfill_references()
+        self._install_version_triggers()
+    
+    def get_change_token(self) -> Tuple[int, ...]:
+        """
+        Get a token that changes whenever the database is written, without running a query.
+        
+        Built from the size and modification time of the database file (and its
+        WAL file, if any), so writes by other processes are seen too.
+        
+        Returns:
+            Tuple usable as a cache key
+        """
+        token = ()
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                stat = os.stat(path)
+                token += (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                token += (0, 0)
+        return token
+    
+    def _migrate_schema(self):
+        """Add columns and indexes introduced after an existing database was created."""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = {col['name'] for col in inspector.get_columns(table.name)}
+                missing = [col for col in table.columns if col.name not in existing]
+                for column in missing:
+                    col_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+    
+    def _backfill_references(self):
+        """Fill the reply reference index for emails stored before it existed."""
+        session = self.get_session()
+        try:
+            if session.query(EmailReference.email_id).first() is not None:
+                return
+            rows = session.query(Email.id, Email.in_reply_to, Email.reference_ids).filter(
+                or_(Email.in_reply_to.isnot(None), Email.reference_ids.isnot(None))
+            ).all()
+            for email_id, in_reply_to, reference_ids in rows:
+                session.add_all(self._build_references(email_id, in_reply_to, reference_ids))
+            session.commit()
+        finally:
+            session.close()
+    
+    def _install_version_triggers(self):
+        """Create triggers that bump a scope's data version on every change, including bulk deletes."""
+        with self.engine.begin() as conn:
+            for scope, (table, events) in VERSIONED_SCOPES.items():
+                conn.execute(
+                    text('INSERT OR IGNORE INTO data_versions (scope, version) VALUES (:scope, 0)'),
+                    {'scope': scope}
+                )
+                for event in events:
+                    name = f"bump_{scope}_{event.split()[0].lower()}"
+                    conn.execute(text(
+                        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} "
+                        f"BEGIN UPDATE data_versions SET version = version + 1 WHERE scope = '{scope}'; END"
+                    ))
     
     def get_session(self) -> Session:
         """Get a new database session."""
@@ -31,31 +132,158 @@ class StorageService:
     
     # Email Operations
     def add_email(self, email_data: Dict[str, Any]) -> Email:
-        """Add a new email to the database."""
-        session = self.get_session()
-        try:
-            email = Email(
-                id=email_data['id'],
-                sender=email_data['sender'],
-                sender_name=email_data.get('sender_name'),
-                subject=email_data['subject'],
-                body=email_data['body'],
-                timestamp=datetime.fromisoformat(email_data['timestamp'].replace('Z', '+00:00')),
-                has_attachments=email_data.get('has_attachments', False),
-                labels=json.dumps(email_data.get('labels', []))
-            )
-            session.add(email)
+        """Add a new email to the database and attach it to its conversation thread."""
+        session = self.get_session()
+        try:
+            email = self._ingest_email(session, email_data)
             session.commit()
             session.refresh(email)
             return email
         finally:
             session.close()
     
-    def get_all_emails(self, limit: int = None, category: str = None) -> List[Email]:
-        """Get all emails, optionally filtered by category."""
+    def add_emails(self, emails_data: List[Dict[str, Any]]) -> int:
+        """
+        Bulk-add emails in a single transaction, skipping IDs already stored.
+        
+        Returns:
+            Number of emails inserted
+        """
+        if not emails_data:
+            return 0
+        session = self.get_session()
+        try:
+            ids = [email_data['id'] for email_data in emails_data]
+            seen = {row.id for row in session.query(Email.id).filter(Email.id.in_(ids))}
+            count = 0
+            for email_data in emails_data:
+                if email_data['id'] in seen:
+                    continue
+                seen.add(email_data['id'])
+                self._ingest_email(session, email_data)
+                count += 1
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
+    def _ingest_email(self, session: Session, email_data: Dict[str, Any]) -> Email:
+        """Build an email with its thread and signature inside an open session."""
+        references = parse_message_ids(email_data.get('references'))
+        email = Email(
+            id=email_data['id'],
+            sender=email_data['sender'],
+            sender_name=email_data.get('sender_name'),
+            subject=email_data['subject'],
+            body=email_data['body'],
+            timestamp=parse_timestamp(email_data['timestamp']),
+            has_attachments=email_data.get('has_attachments', False),
+            labels=json.dumps(email_data.get('labels', [])),
+            is_read=email_data.get('is_read', False),
+            message_id=email_data.get('message_id'),
+            in_reply_to=(parse_message_ids(email_data.get('in_reply_to')) or [None])[0],
+            reference_ids=' '.join(references) if references else None
+        )
+        email.urgency_score = estimate_urgency(
+            email.sender, email.subject, email.body, email_data.get('labels')
+        )
+        session.add(email)
+        self._assign_thread(session, email)
+        session.add_all(self._build_references(email.id, email.in_reply_to, email.reference_ids))
+        session.add(self._build_signature(email))
+        session.add(self._build_embedding(email))
+        return email
+    
+    def _assign_thread(self, session: Session, email: Email):
+        """
+        Resolve the thread for a new email.
+        
+        Reply headers (In-Reply-To, References) are matched first, then replies
+        whose parent arrived later, and finally the normalized subject for
+        messages with a reply/forward prefix. A late parent that links replies
+        in different threads merges those threads into one.
+        """
+        subject_key = normalize_subject(email.subject)
+        thread_ids = []
+        
+        parent_ids = parse_message_ids(email.reference_ids)
+        if email.in_reply_to:
+            parent_ids.append(email.in_reply_to)
+        if parent_ids:
+            thread_ids += [row.thread_id for row in session.query(Email.thread_id).filter(
+                Email.message_id.in_(parent_ids),
+                Email.thread_id.isnot(None)
+            ).distinct()]
+        
+        if email.message_id:
+            thread_ids += [row.thread_id for row in session.query(Email.thread_id).join(
+                EmailReference, EmailReference.email_id == Email.id
+            ).filter(
+                EmailReference.message_id == email.message_id,
+                Email.thread_id.isnot(None)
+            ).distinct()]
+        thread_ids = list(dict.fromkeys(thread_ids))
+        
+        if not thread_ids and subject_key and is_reply_subject(email.subject):
+            window_start = email.timestamp - timedelta(days=THREAD_SUBJECT_WINDOW_DAYS)
+            match = session.query(EmailThread).filter(
+                EmailThread.subject_key == subject_key,
+                EmailThread.last_timestamp >= window_start
+            ).order_by(desc(EmailThread.last_timestamp)).first()
+            if match:
+                thread_ids.append(match.id)
+        
+        thread = session.get(EmailThread, thread_ids[0]) if thread_ids else None
+        if thread is None:
+            thread = EmailThread(
+                id=f"thread_{email.id}",
+                subject_key=subject_key,
+                message_count=0
+            )
+            session.add(thread)
+        elif len(thread_ids) > 1:
+            self._merge_threads(session, thread, thread_ids[1:])
+        
+        thread.message_count = (thread.message_count or 0) + 1
+        if thread.last_timestamp is None or email.timestamp >= thread.last_timestamp:
+            thread.last_timestamp = email.timestamp
+            thread.latest_email_id = email.id
+        email.thread_id = thread.id
+    
+    @staticmethod
+    def _merge_threads(session: Session, thread: EmailThread, other_ids: List[str]):
+        """Move the emails of other threads into `thread` and drop the emptied threads."""
+        for other in session.query(EmailThread).filter(EmailThread.id.in_(other_ids)):
+            thread.message_count = (thread.message_count or 0) + (other.message_count or 0)
+            if other.last_timestamp and (thread.last_timestamp is None or other.last_timestamp > thread.last_timestamp):
+                thread.last_timestamp = other.last_timestamp
+                thread.latest_email_id = other.latest_email_id
+        session.query(Email).filter(Email.thread_id.in_(other_ids)).update(
+            {Email.thread_id: thread.id}, synchronize_session='evaluate'
+        )
+        session.query(EmailThread).filter(EmailThread.id.in_(other_ids)).delete(synchronize_session='evaluate')
+    
+    @staticmethod
+    def _build_references(email_id: str, in_reply_to: Optional[str],
+                          reference_ids: Optional[str]) -> List[EmailReference]:
+        """Index rows for the Message-IDs an email replies to or references."""
+        message_ids = parse_message_ids(reference_ids)
+        if in_reply_to:
+            message_ids.append(in_reply_to)
+        return [EmailReference(email_id=email_id, message_id=message_id)
+                for message_id in dict.fromkeys(message_ids)]
+    
+    def get_all_emails(self, limit: int = None, category: str = None,
+                       order_by: str = 'timestamp') -> List[Email]:
+        """Get all emails, optionally filtered by category, newest or most urgent first."""
         session = self.get_session()
         try:
-            query = session.query(Email).order_by(desc(Email.timestamp))
+            if order_by == 'urgency':
+                query = session.query(Email).order_by(
+                    Email.urgency_score.is_(None), desc(Email.urgency_score), desc(Email.timestamp)
+                )
+            else:
+                query = session.query(Email).order_by(desc(Email.timestamp))
             
             if category:
                 query = query.join(EmailCategory).filter(EmailCategory.category == category)
@@ -67,6 +295,103 @@ class StorageService:
         finally:
             session.close()
     
+    def get_email_headers_page(self, page_size: int = 20, cursor: str = None, category: str = None,
+                               order_by: str = 'timestamp') -> Dict[str, Any]:
+        """
+        Get one page of the inbox list with header fields only, using keyset pagination.
+        
+        The cursor holds the sort key of the previous page's last row, so every
+        page is one index seek plus page_size rows, however deep it is.
+        
+        Args:
+            page_size: Rows per page
+            cursor: next_cursor of the previous page (None for the first page)
+            category: Only emails of this category
+            order_by: 'timestamp' for newest first, 'urgency' for most urgent first
+        
+        Returns:
+            Dictionary with 'items' (header dictionaries) and 'next_cursor' (None on the last page)
+        """
+        if order_by == 'urgency':
+            sort_keys = [func.coalesce(Email.urgency_score, -1.0), Email.timestamp, Email.id]
+        else:
+            sort_keys = [Email.timestamp, Email.id]
+        
+        session = self.get_session()
+        try:
+            query = session.query(
+                Email.id, Email.sender, Email.sender_name, Email.subject, Email.timestamp,
+                Email.processed, Email.is_read, Email.urgency_score, EmailCategory.category
+            ).outerjoin(EmailCategory, EmailCategory.email_id == Email.id)
+            if category:
+                query = query.filter(EmailCategory.category == category)
+            if cursor:
+                values = json.loads(cursor)
+                values[-2] = datetime.fromisoformat(values[-2])
+                query = query.filter(tuple_(*sort_keys) < tuple_(*values))
+            rows = query.order_by(*[desc(key) for key in sort_keys]).limit(page_size + 1).all()
+            
+            items = [
+                {
+                    'id': row.id,
+                    'sender': row.sender,
+                    'sender_name': row.sender_name,
+                    'subject': row.subject,
+                    'timestamp': row.timestamp.isoformat(),
+                    'processed': row.processed,
+                    'is_read': row.is_read,
+                    'urgency_score': row.urgency_score,
+                    'category': row.category
+                }
+                for row in rows[:page_size]
+            ]
+            next_cursor = None
+            if len(rows) > page_size:
+                last = rows[page_size - 1]
+                key = [last.timestamp.isoformat(), last.id]
+                if order_by == 'urgency':
+                    key.insert(0, last.urgency_score if last.urgency_score is not None else -1.0)
+                next_cursor = json.dumps(key)
+            return {'items': items, 'next_cursor': next_cursor}
+        finally:
+            session.close()
+    
+    def get_email_details(self, email_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get emails with their category and pending tasks in two queries, keyed by ID."""
+        if not email_ids:
+            return {}
+        session = self.get_session()
+        try:
+            rows = session.query(Email, EmailCategory.category).outerjoin(
+                EmailCategory, EmailCategory.email_id == Email.id
+            ).filter(Email.id.in_(email_ids)).all()
+            details = {
+                email.id: {
+                    'id': email.id,
+                    'sender': email.sender,
+                    'sender_name': email.sender_name,
+                    'subject': email.subject,
+                    'body': email.body,
+                    'timestamp': email.timestamp,
+                    'urgency_score': email.urgency_score,
+                    'summary': email.summary,
+                    'category': category,
+                    'pending_tasks': []
+                }
+                for email, category in rows
+            }
+            actions = session.query(ActionItem).filter(
+                ActionItem.email_id.in_(email_ids),
+                ActionItem.completed == False
+            ).all()
+            for action in actions:
+                if action.email_id in details:
+                    task = action.task + (f" (Due: {action.deadline})" if action.deadline else "")
+                    details[action.email_id]['pending_tasks'].append(task)
+            return details
+        finally:
+            session.close()
+    
     def get_email_by_id(self, email_id: str) -> Optional[Email]:
         """Get a specific email by ID."""
         session = self.get_session()
@@ -75,6 +400,133 @@ class StorageService:
         finally:
             session.close()
     
+    @staticmethod
+    def _build_signature(email: Email) -> EmailSignature:
+        """Compute the near-duplicate signature for an email."""
+        signature = simhash(f"{email.subject}\n{strip_quoted_text(email.body) or email.body}")
+        bands = simhash_bands(signature)
+        return EmailSignature(
+            email_id=email.id,
+            simhash=signature,
+            band_0=bands[0],
+            band_1=bands[1],
+            band_2=bands[2],
+            band_3=bands[3]
+        )
+    
+    @staticmethod
+    def _build_embedding(email: Email) -> EmailEmbedding:
+        """Compute the retrieval embedding for an email."""
+        body = strip_quoted_text(email.body) or email.body
+        vector = embed_text(f"{email.subject}\n{email.sender_name or ''} {email.sender}\n{body[:2000]}")
+        return EmailEmbedding(email_id=email.id, dim=len(vector), vector=vector.tobytes())
+    
+    def get_embeddings_since(self, last_id: int = 0, limit: int = 10000, dim: int = None) -> List[EmailEmbedding]:
+        """Get embeddings added after a row ID, oldest first, for incremental index loads."""
+        session = self.get_session()
+        try:
+            query = session.query(EmailEmbedding).filter(EmailEmbedding.id > last_id)
+            if dim is not None:
+                query = query.filter(EmailEmbedding.dim == dim)
+            return query.order_by(EmailEmbedding.id).limit(limit).all()
+        finally:
+            session.close()
+    
+    def count_embeddings(self, dim: int = None) -> int:
+        """Count stored embeddings, optionally only those of one dimension."""
+        session = self.get_session()
+        try:
+            query = session.query(EmailEmbedding)
+            if dim is not None:
+                query = query.filter(EmailEmbedding.dim == dim)
+            return query.count()
+        finally:
+            session.close()
+    
+    def backfill_embeddings(self) -> int:
+        """Embed emails stored before embeddings existed."""
+        session = self.get_session()
+        try:
+            emails = session.query(Email).outerjoin(
+                EmailEmbedding, EmailEmbedding.email_id == Email.id
+            ).filter(EmailEmbedding.id.is_(None)).all()
+            for email in emails:
+                session.add(self._build_embedding(email))
+            session.commit()
+            return len(emails)
+        finally:
+            session.close()
+    
+    def get_email_vector(self, email_id: str) -> Optional[np.ndarray]:
+        """Get an email's retrieval embedding as a float32 vector, computing it if missing."""
+        session = self.get_session()
+        try:
+            row = session.query(EmailEmbedding).filter(EmailEmbedding.email_id == email_id).first()
+            if row is None:
+                email = session.query(Email).filter(Email.id == email_id).first()
+                if email is None:
+                    return None
+                row = self._build_embedding(email)
+            return np.frombuffer(row.vector, dtype=np.float32)
+        finally:
+            session.close()
+    
+    def get_signature(self, email_id: str) -> Optional[EmailSignature]:
+        """Get the near-duplicate signature for an email, computing it if missing."""
+        session = self.get_session()
+        try:
+            signature = session.query(EmailSignature).filter(EmailSignature.email_id == email_id).first()
+            if signature is None:
+                email = session.query(Email).filter(Email.id == email_id).first()
+                if email is None:
+                    return None
+                signature = self._build_signature(email)
+                session.add(signature)
+                session.commit()
+                session.refresh(signature)
+            return signature
+        finally:
+            session.close()
+    
+    def find_signature_candidates(self, signature: EmailSignature, limit: int = 50) -> List[EmailSignature]:
+        """Get signatures of processed, categorized emails sharing at least one band."""
+        session = self.get_session()
+        try:
+            return session.query(EmailSignature).join(
+                Email, Email.id == EmailSignature.email_id
+            ).join(
+                EmailCategory, EmailCategory.email_id == EmailSignature.email_id
+            ).filter(
+                EmailSignature.email_id != signature.email_id,
+                Email.processed == True,
+                or_(
+                    EmailSignature.band_0 == signature.band_0,
+                    EmailSignature.band_1 == signature.band_1,
+                    EmailSignature.band_2 == signature.band_2,
+                    EmailSignature.band_3 == signature.band_3
+                )
+            ).limit(limit).all()
+        finally:
+            session.close()
+    
+    def get_thread_emails(self, thread_id: str) -> List[Email]:
+        """Get all emails in a thread, oldest first."""
+        session = self.get_session()
+        try:
+            return session.query(Email).filter(
+                Email.thread_id == thread_id
+            ).order_by(Email.timestamp).all()
+        finally:
+            session.close()
+    
+    def get_thread(self, thread_id: str) -> Optional[EmailThread]:
+        """Get a thread by ID."""
+        session = self.get_session()
+        try:
+            return session.query(EmailThread).filter(EmailThread.id == thread_id).first()
+        finally:
+            session.close()
+    
     def update_email_processed(self, email_id: str, processed: bool = True):
         """Mark an email as processed."""
         session = self.get_session()
@@ -86,11 +538,201 @@ class StorageService:
         finally:
             session.close()
     
+    def mark_email_read(self, email_id: str, is_read: bool = True):
+        """Set an email's read state."""
+        session = self.get_session()
+        try:
+            session.query(Email).filter(Email.id == email_id).update({Email.is_read: is_read})
+            session.commit()
+        finally:
+            session.close()
+    
+    def update_email_summary(self, email_id: str, summary: str):
+        """Store an email's cached summary."""
+        session = self.get_session()
+        try:
+            email = session.get(Email, email_id)
+            if email:
+                email.summary = summary
+                session.commit()
+        finally:
+            session.close()
+    
+    def update_email_urgency(self, email_id: str, urgency_score: float):
+        """Store an email's urgency score (1-5)."""
+        session = self.get_session()
+        try:
+            session.query(Email).filter(Email.id == email_id).update({Email.urgency_score: urgency_score})
+            session.commit()
+        finally:
+            session.close()
+    
+    def get_emails_missing_summary(self, limit: int = 100) -> List[Email]:
+        """Get processed emails that have no cached summary yet."""
+        session = self.get_session()
+        try:
+            return session.query(Email).filter(
+                Email.processed == True,
+                Email.summary.is_(None)
+            ).order_by(desc(Email.timestamp)).limit(limit).all()
+        finally:
+            session.close()
+    
+    def get_thread_summaries(self) -> List[Dict[str, Any]]:
+        """
+        Get one summary per conversation: that of its latest summarized email,
+        which was written with the earlier messages as context.
+        
+        Returns:
+            List of dicts with key, subject, summary, category, timestamp and email_count
+        """
+        session = self.get_session()
+        try:
+            rows = session.query(
+                Email.id, Email.thread_id, Email.subject, Email.summary, Email.timestamp, EmailCategory.category
+            ).outerjoin(EmailCategory, EmailCategory.email_id == Email.id).filter(
+                Email.summary.isnot(None)
+            ).order_by(Email.timestamp).all()
+            threads = {}
+            for email_id, thread_id, subject, summary, timestamp, category in rows:
+                key = thread_id or email_id
+                count = threads[key]['email_count'] + 1 if key in threads else 1
+                threads[key] = {
+                    'key': key,
+                    'subject': subject,
+                    'summary': summary,
+                    'category': category or 'Uncategorized',
+                    'timestamp': timestamp,
+                    'email_count': count
+                }
+            return list(threads.values())
+        finally:
+            session.close()
+    
+    def get_rollups(self, level: str) -> Dict[str, SummaryRollup]:
+        """Get cached rollups of one level, keyed by group key."""
+        session = self.get_session()
+        try:
+            return {row.key: row for row in session.query(SummaryRollup).filter(SummaryRollup.level == level).all()}
+        finally:
+            session.close()
+    
+    def save_rollups(self, level: str, rollups: Dict[str, Dict[str, Any]]):
+        """
+        Replace the rollups of one level.
+        
+        Args:
+            level: category or day
+            rollups: Group key -> dict with summary, fingerprint and item_count
+        """
+        for attempt in range(3):
+            session = self.get_session()
+            try:
+                existing = {row.key: row for row in session.query(SummaryRollup).filter(SummaryRollup.level == level).all()}
+                for key, row in existing.items():
+                    if key not in rollups:
+                        session.delete(row)
+                for key, data in rollups.items():
+                    row = existing.get(key)
+                    if row is None:
+                        row = SummaryRollup(level=level, key=key)
+                        session.add(row)
+                    if row.fingerprint != data['fingerprint']:
+                        row.summary = data['summary']
+                        row.fingerprint = data['fingerprint']
+                        row.item_count = data['item_count']
+                session.commit()
+                return
+            except IntegrityError:
+                # Another worker process refreshed the same rollups first; retry as an update
+                session.rollback()
+                if attempt == 2:
+                    raise
+            finally:
+                session.close()
+    
     def clear_all_emails(self):
         """Clear all emails from the database."""
         session = self.get_session()
         try:
+            session.query(EmailSignature).delete()
+            session.query(EmailReference).delete()
+            session.query(EmailEmbedding).delete()
             session.query(Email).delete()
+            session.query(EmailThread).delete()
+            session.query(SummaryRollup).delete()
+            session.query(DailyDigest).delete()
+            session.query(EvalResult).delete()
+            session.commit()
+        finally:
+            session.close()
+    
+    def search_emails(self, category: str = None, is_read: bool = None, sender: str = None,
+                      since: datetime = None, until: datetime = None, min_urgency: float = None,
+                      limit: int = 20) -> Tuple[int, List[Email]]:
+        """
+        Count emails matching structured filters and fetch the newest of them.
+        
+        Args:
+            category: Category name
+            is_read: Read state
+            sender: Substring of the sender address or name
+            since: Received at or after
+            until: Received before
+            min_urgency: Minimum urgency score
+            limit: Maximum emails to return (0 to only count)
+        
+        Returns:
+            Tuple of (total matches, newest matching emails)
+        """
+        session = self.get_session()
+        try:
+            query = session.query(Email)
+            if category:
+                query = query.join(EmailCategory).filter(EmailCategory.category == category)
+            if is_read is not None:
+                query = query.filter(Email.is_read == is_read)
+            if sender:
+                query = query.filter(or_(Email.sender.ilike(f'%{sender}%'), Email.sender_name.ilike(f'%{sender}%')))
+            if since:
+                query = query.filter(Email.timestamp >= since)
+            if until:
+                query = query.filter(Email.timestamp < until)
+            if min_urgency is not None:
+                query = query.filter(Email.urgency_score >= min_urgency)
+            
+            total = query.count()
+            emails = query.order_by(desc(Email.timestamp)).limit(limit).all() if limit else []
+            return total, emails
+        finally:
+            session.close()
+    
+    # IMAP Sync State Operations
+    def get_imap_state(self, account: str, mailbox: str) -> Optional[ImapSyncState]:
+        """Get the incremental sync position for an IMAP mailbox."""
+        session = self.get_session()
+        try:
+            return session.query(ImapSyncState).filter(
+                ImapSyncState.account == account,
+                ImapSyncState.mailbox == mailbox
+            ).first()
+        finally:
+            session.close()
+    
+    def save_imap_state(self, account: str, mailbox: str, uidvalidity: int, last_uid: int):
+        """Store the incremental sync position for an IMAP mailbox."""
+        session = self.get_session()
+        try:
+            state = session.query(ImapSyncState).filter(
+                ImapSyncState.account == account,
+                ImapSyncState.mailbox == mailbox
+            ).first()
+            if state is None:
+                state = ImapSyncState(account=account, mailbox=mailbox)
+                session.add(state)
+            state.uidvalidity = uidvalidity
+            state.last_uid = last_uid
+            state.updated_at = datetime.utcnow()
             session.commit()
         finally:
             session.close()
@@ -163,8 +805,9 @@ class StorageService:
             session.close()
     
     # Category Operations
-    def add_category(self, email_id: str, category: str, confidence: str = None) -> EmailCategory:
-        """Add email categorization result."""
+    def add_category(self, email_id: str, category: str, confidence: str = None,
+                     source: str = 'llm', source_email_id: str = None) -> EmailCategory:
+        """Add email categorization result, recording where it came from."""
         session = self.get_session()
         try:
             # Check if category exists
@@ -172,13 +815,17 @@ class StorageService:
             if existing:
                 existing.category = category
                 existing.confidence = confidence
+                existing.source = source
+                existing.source_email_id = source_email_id
                 session.commit()
                 return existing
             else:
                 email_category = EmailCategory(
                     email_id=email_id,
                     category=category,
-                    confidence=confidence
+                    confidence=confidence,
+                    source=source,
+                    source_email_id=source_email_id
                 )
                 session.add(email_category)
                 session.commit()
@@ -195,17 +842,81 @@ class StorageService:
         finally:
             session.close()
     
+    def get_categories_by_source(self, source: str) -> List[EmailCategory]:
+        """Get categorization results produced by a given source (e.g. near_duplicate)."""
+        session = self.get_session()
+        try:
+            return session.query(EmailCategory).filter(
+                EmailCategory.source == source
+            ).order_by(desc(EmailCategory.created_at)).all()
+        finally:
+            session.close()
+    
+    def delete_category(self, email_id: str):
+        """Delete the categorization result for an email."""
+        session = self.get_session()
+        try:
+            session.query(EmailCategory).filter(EmailCategory.email_id == email_id).delete()
+            session.commit()
+        finally:
+            session.close()
+    
+    # Sender Statistics Operations
+    def record_sender_category(self, sender_key: str, category: str, half_life_days: float,
+                               now: datetime = None, delta: float = 1.0):
+        """Decay a sender's category weights to now and count one more categorization (or withdraw one)."""
+        now = now or datetime.utcnow()
+        for attempt in range(3):
+            session = self.get_session()
+            try:
+                rows = session.query(SenderCategoryStat).filter(
+                    SenderCategoryStat.sender_key == sender_key
+                ).all()
+                target = None
+                for row in rows:
+                    row.weight = decayed_weight(row.weight, row.last_updated, now, half_life_days)
+                    row.last_updated = now
+                    if row.category == category:
+                        target = row
+                if target is None and delta > 0:
+                    target = SenderCategoryStat(sender_key=sender_key, category=category, weight=0.0, last_updated=now)
+                    session.add(target)
+                if target is not None:
+                    target.weight = max(target.weight + delta, 0.0)
+                session.commit()
+                return
+            except IntegrityError:
+                # A concurrent worker created the row first; retry as an update
+                session.rollback()
+                if attempt == 2:
+                    raise
+            finally:
+                session.close()
+    
+    def get_sender_stats(self, sender_key: str) -> List[SenderCategoryStat]:
+        """Get category statistics for a sender address or @domain."""
+        session = self.get_session()
+        try:
+            return session.query(SenderCategoryStat).filter(
+                SenderCategoryStat.sender_key == sender_key
+            ).all()
+        finally:
+            session.close()
+    
     # Action Item Operations
     def add_action_item(self, email_id: str, task: str, deadline: str = None, 
-                        priority: str = "medium") -> ActionItem:
+                        priority: str = "medium", source_email_id: str = None) -> ActionItem:
         """Add an action item extracted from an email."""
         session = self.get_session()
         try:
+            email = session.get(Email, email_id)
             action_item = ActionItem(
                 email_id=email_id,
                 task=task,
                 deadline=deadline,
-                priority=priority
+                due_date=parse_deadline(deadline, email.timestamp if email else datetime.utcnow()),
+                priority=priority,
+                source_email_id=source_email_id
             )
             session.add(action_item)
             session.commit()
@@ -233,6 +944,47 @@ class StorageService:
         finally:
             session.close()
     
+    def delete_inherited_action_items(self, email_id: str) -> int:
+        """Delete action items an email inherited from a near-duplicate."""
+        session = self.get_session()
+        try:
+            count = session.query(ActionItem).filter(
+                ActionItem.email_id == email_id,
+                ActionItem.source_email_id.isnot(None)
+            ).delete()
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
+    def delete_pending_drafts(self, email_id: str) -> int:
+        """Delete an email's reply drafts still awaiting review, with their pre-generated variants."""
+        session = self.get_session()
+        try:
+            count = session.query(Draft).filter(
+                Draft.email_id == email_id,
+                or_(Draft.status == 'pending', Draft.status.is_(None)),
+                func.coalesce(Draft.draft_type, 'reply').in_(['reply', DRAFT_VARIANT])
+            ).delete(synchronize_session=False)
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
+    def delete_open_action_items(self, email_id: str) -> int:
+        """Delete an email's extracted action items that are not completed yet."""
+        session = self.get_session()
+        try:
+            count = session.query(ActionItem).filter(
+                ActionItem.email_id == email_id,
+                ActionItem.completed == False,
+                ActionItem.source_email_id.is_(None)
+            ).delete()
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
     def mark_action_completed(self, action_id: int, completed: bool = True):
         """Mark an action item as completed."""
         session = self.get_session()
@@ -244,6 +996,81 @@ class StorageService:
         finally:
             session.close()
     
+    def search_action_items(self, completed: bool = False, priority: str = None,
+                            due_after: datetime = None, due_before: datetime = None,
+                            category: str = None, sender: str = None,
+                            limit: int = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Count action items matching structured filters and fetch the most pressing.
+        
+        Args:
+            completed: Completion state (None for both)
+            priority: high, medium or low
+            due_after: Due at or after
+            due_before: Due before
+            category: Category of the source email
+            sender: Substring of the source email's sender address or name
+            limit: Maximum items to return (0 to only count)
+        
+        Returns:
+            Tuple of (total matches, items ordered by due date then creation)
+        """
+        session = self.get_session()
+        try:
+            query = session.query(ActionItem, Email.subject, Email.sender).join(
+                Email, Email.id == ActionItem.email_id
+            )
+            if completed is not None:
+                query = query.filter(ActionItem.completed == completed)
+            if priority:
+                query = query.filter(ActionItem.priority == priority)
+            if due_after:
+                query = query.filter(ActionItem.due_date >= due_after)
+            if due_before:
+                query = query.filter(ActionItem.due_date < due_before)
+            if category:
+                query = query.join(EmailCategory, EmailCategory.email_id == Email.id).filter(
+                    EmailCategory.category == category
+                )
+            if sender:
+                query = query.filter(or_(Email.sender.ilike(f'%{sender}%'), Email.sender_name.ilike(f'%{sender}%')))
+            
+            total = query.count()
+            rows = query.order_by(
+                ActionItem.due_date.is_(None), ActionItem.due_date, desc(ActionItem.created_at)
+            ).limit(limit).all() if limit else []
+            return total, [
+                {
+                    'id': action.id,
+                    'task': action.task,
+                    'deadline': action.deadline,
+                    'due_date': action.due_date,
+                    'priority': action.priority,
+                    'completed': action.completed,
+                    'email_subject': subject,
+                    'sender': sender
+                }
+                for action, subject, sender in rows
+            ]
+        finally:
+            session.close()
+    
+    def backfill_due_dates(self) -> int:
+        """Resolve due dates for action items stored before due dates existed."""
+        session = self.get_session()
+        try:
+            rows = session.query(ActionItem, Email.timestamp).join(
+                Email, Email.id == ActionItem.email_id
+            ).filter(ActionItem.deadline.isnot(None), ActionItem.due_date.is_(None)).all()
+            count = 0
+            for action, timestamp in rows:
+                action.due_date = parse_deadline(action.deadline, timestamp)
+                count += action.due_date is not None
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
     # Draft Operations
     def add_draft(self, email_id: str, subject: str, body: str, 
                   tone: str = None, draft_type: str = "reply") -> Draft:
@@ -265,23 +1092,186 @@ class StorageService:
             session.close()
     
     def get_drafts_by_email(self, email_id: str) -> List[Draft]:
-        """Get all drafts for a specific email."""
+        """Get all drafts for a specific email (pre-generated variants excluded)."""
         session = self.get_session()
         try:
-            return session.query(Draft).filter(Draft.email_id == email_id).order_by(desc(Draft.created_at)).all()
+            return session.query(Draft).filter(
+                Draft.email_id == email_id, _shown_draft()
+            ).order_by(desc(Draft.created_at)).all()
         finally:
             session.close()
     
     def get_all_drafts(self) -> List[Draft]:
-        """Get all drafts."""
+        """Get all drafts (pre-generated variants excluded)."""
+        session = self.get_session()
+        try:
+            return session.query(Draft).filter(_shown_draft()).order_by(desc(Draft.created_at)).all()
+        finally:
+            session.close()
+    
+    def get_drafts_page(self, draft_type: str = None, tone: str = None, status: str = None,
+                        page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+        """
+        Get one page of drafts joined with the headers of the emails they answer.
+        
+        Filtering, paging and counting run in SQL, so the cost depends on the
+        page size rather than the number of drafts.
+        
+        Args:
+            draft_type: Only drafts of this type (reply, new, forward)
+            tone: Only drafts with this tone
+            status: Only drafts with this review status
+            page: 1-based page number
+            page_size: Drafts per page
+        
+        Returns:
+            Dictionary with 'items', 'total' (matching drafts) and 'counts'
+            (all drafts by 'type', 'tone' and 'status')
+        """
+        session = self.get_session()
+        try:
+            filters = [_shown_draft()]
+            if draft_type:
+                filters.append(func.coalesce(Draft.draft_type, 'reply') == draft_type)
+            if tone:
+                filters.append(Draft.tone == tone)
+            if status:
+                filters.append(func.coalesce(Draft.status, 'pending') == status)
+            
+            total = session.query(func.count(Draft.id)).filter(*filters).scalar()
+            rows = session.query(
+                Draft, Email.sender, Email.sender_name, Email.subject, Email.timestamp
+            ).outerjoin(Email, Email.id == Draft.email_id).filter(*filters).order_by(
+                desc(Draft.created_at), desc(Draft.id)
+            ).offset((max(page, 1) - 1) * page_size).limit(page_size).all()
+            
+            counts = {}
+            for name, column in (('type', func.coalesce(Draft.draft_type, 'reply')),
+                                 ('tone', Draft.tone),
+                                 ('status', func.coalesce(Draft.status, 'pending'))):
+                counts[name] = dict(
+                    session.query(column, func.count(Draft.id)).filter(_shown_draft()).group_by(column).all()
+                )
+            
+            return {
+                'items': [
+                    {
+                        'id': draft.id,
+                        'email_id': draft.email_id,
+                        'subject': draft.subject,
+                        'body': draft.body,
+                        'tone': draft.tone,
+                        'draft_type': draft.draft_type,
+                        'status': draft.status,
+                        'created_at': draft.created_at,
+                        'email_sender': sender,
+                        'email_sender_name': sender_name,
+                        'email_subject': email_subject,
+                        'email_timestamp': email_timestamp
+                    }
+                    for draft, sender, sender_name, email_subject, email_timestamp in rows
+                ],
+                'total': total,
+                'counts': counts
+            }
+        finally:
+            session.close()
+    
+    def get_draft(self, draft_id: int) -> Optional[Draft]:
+        """Get a draft by ID."""
+        session = self.get_session()
+        try:
+            return session.get(Draft, draft_id)
+        finally:
+            session.close()
+    
+    def get_draft_variants(self, email_id: str) -> List[Draft]:
+        """Get the pre-generated alternative drafts of an email, in rotation order."""
+        session = self.get_session()
+        try:
+            return session.query(Draft).filter(
+                Draft.email_id == email_id, Draft.draft_type == DRAFT_VARIANT
+            ).order_by(Draft.updated_at, Draft.id).all()
+        finally:
+            session.close()
+    
+    def get_reviewed_drafts(self, dim: int, exclude_email_id: str = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Get approved or edited reply drafts with the embedding of the email they answer.
+        
+        Args:
+            dim: Embedding dimension to match
+            exclude_email_id: Email whose own drafts are skipped
+            limit: Maximum drafts, most recently updated first
+        
+        Returns:
+            List of dictionaries with the original email, the reply and its 'vector'
+        """
+        session = self.get_session()
+        try:
+            query = session.query(Draft, Email, EmailEmbedding.vector).join(
+                Email, Email.id == Draft.email_id
+            ).join(
+                EmailEmbedding, EmailEmbedding.email_id == Email.id
+            ).filter(
+                Draft.status.in_(['approved', 'edited']), _shown_draft(), EmailEmbedding.dim == dim
+            )
+            if exclude_email_id:
+                query = query.filter(Draft.email_id != exclude_email_id)
+            rows = query.order_by(desc(Draft.updated_at)).limit(limit).all()
+            return [
+                {
+                    'draft_id': draft.id,
+                    'email_id': email.id,
+                    'sender_name': email.sender_name or '',
+                    'email_subject': email.subject,
+                    'email_body': strip_quoted_text(email.body) or email.body,
+                    'subject': draft.subject,
+                    'body': draft.body,
+                    'tone': draft.tone,
+                    'vector': np.frombuffer(vector, dtype=np.float32)
+                }
+                for draft, email, vector in rows
+            ]
+        finally:
+            session.close()
+    
+    def swap_draft_variant(self, draft_id: int, variant_id: int) -> Optional[Draft]:
+        """
+        Exchange the content of a draft with one of its pre-generated variants.
+        
+        The variant receives the replaced content and moves to the end of the
+        rotation, so repeated swaps cycle through all versions.
+        
+        Args:
+            draft_id: Shown draft ID
+            variant_id: Variant draft ID
+        
+        Returns:
+            The updated draft, or None if either draft is missing
+        """
         session = self.get_session()
         try:
-            return session.query(Draft).order_by(desc(Draft.created_at)).all()
+            draft = session.get(Draft, draft_id)
+            variant = session.get(Draft, variant_id)
+            if draft is None or variant is None:
+                return None
+            for field in ('subject', 'body', 'tone'):
+                current = getattr(draft, field)
+                setattr(draft, field, getattr(variant, field))
+                setattr(variant, field, current)
+            now = datetime.utcnow()
+            draft.status = 'pending'
+            draft.updated_at = now
+            variant.updated_at = now
+            session.commit()
+            session.refresh(draft)
+            return draft
         finally:
             session.close()
     
-    def update_draft(self, draft_id: int, subject: str = None, body: str = None):
-        """Update a draft."""
+    def update_draft(self, draft_id: int, subject: str = None, body: str = None, status: str = 'edited'):
+        """Update a draft; user edits mark it 'edited', regenerations reset it to 'pending'."""
         session = self.get_session()
         try:
             draft = session.query(Draft).filter(Draft.id == draft_id).first()
@@ -290,11 +1280,23 @@ class StorageService:
                     draft.subject = subject
                 if body:
                     draft.body = body
+                draft.status = status
                 draft.updated_at = datetime.utcnow()
                 session.commit()
         finally:
             session.close()
     
+    def set_draft_status(self, draft_id: int, status: str):
+        """Set a draft's review status (pending, edited, approved)."""
+        session = self.get_session()
+        try:
+            draft = session.get(Draft, draft_id)
+            if draft:
+                draft.status = status
+                session.commit()
+        finally:
+            session.close()
+    
     def delete_draft(self, draft_id: int):
         """Delete a draft."""
         session = self.get_session()
@@ -306,15 +1308,423 @@ class StorageService:
         finally:
             session.close()
     
+    def delete_all_drafts(self) -> int:
+        """Delete every draft, including pre-generated variants."""
+        session = self.get_session()
+        try:
+            count = session.query(Draft).delete()
+            session.commit()
+            return count
+        finally:
+            session.close()
+    
+    # Job Operations
+    def add_job(self, job_id: str, job_type: str, params: Dict[str, Any] = None) -> Job:
+        """Create a queued job."""
+        session = self.get_session()
+        try:
+            job = Job(id=job_id, job_type=job_type, status='queued', params=json.dumps(params or {}))
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+        finally:
+            session.close()
+    
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        session = self.get_session()
+        try:
+            return session.get(Job, job_id)
+        finally:
+            session.close()
+    
+    def get_jobs(self, job_type: str = None, statuses: List[str] = None, limit: int = 20) -> List[Job]:
+        """Get jobs, newest first, optionally filtered by type and status."""
+        session = self.get_session()
+        try:
+            query = session.query(Job)
+            if job_type:
+                query = query.filter(Job.job_type == job_type)
+            if statuses:
+                query = query.filter(Job.status.in_(statuses))
+            return query.order_by(desc(Job.created_at)).limit(limit).all()
+        finally:
+            session.close()
+    
+    def update_job(self, job_id: str, expected_status: List[str] = None, **fields: Any) -> bool:
+        """
+        Update job fields, optionally only if the job is in one of the expected states.
+        
+        Args:
+            job_id: Job ID
+            expected_status: Statuses the job must have for the update to apply
+            **fields: Column values to set
+        
+        Returns:
+            True if the job was updated
+        """
+        session = self.get_session()
+        try:
+            query = session.query(Job).filter(Job.id == job_id)
+            if expected_status:
+                query = query.filter(Job.status.in_(expected_status))
+            updated = query.update(fields, synchronize_session=False)
+            session.commit()
+            return updated > 0
+        finally:
+            session.close()
+    
+    # Work Queue Operations
+    def enqueue_work(self, units: List[Dict[str, Any]]) -> int:
+        """
+        Add processing units to the work queue.
+        
+        Units already queued or leased are left alone. Done and failed units
+        are queued again with fresh attempts: they are only in the backlog
+        because they still have unprocessed emails (new replies, or emails
+        that failed before), which would otherwise never be processed.
+        
+        Args:
+            units: Dictionaries with unit_key, is_thread and priority
+        
+        Returns:
+            Number of units newly queued
+        """
+        if not units:
+            return 0
+        statement = sqlite_insert(WorkItem).values([
+            {**unit, 'status': 'pending', 'attempts': 0} for unit in units
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[WorkItem.unit_key],
+            set_={'status': 'pending', 'attempts': 0, 'error': None, 'worker_id': None,
+                  'priority': statement.excluded.priority, 'updated_at': datetime.utcnow()},
+            where=WorkItem.status.in_(['done', 'failed'])
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(statement).rowcount
+    
+    def claim_work(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int) -> List[Dict[str, Any]]:
+        """
+        Atomically lease the highest-priority available units to a worker.
+        
+        Available units are pending ones and those whose lease has expired
+        (their worker crashed or stalled). Expired units that already used
+        max_attempts leases are marked failed instead of being handed out again.
+        The claim is a single UPDATE, so concurrent workers, including other
+        processes sharing the database file, never receive the same unit.
+        
+        Args:
+            worker_id: ID of the claiming worker
+            limit: Maximum number of units
+            lease_seconds: Lease duration
+            max_attempts: Leases a unit may get before it is marked failed
+        
+        Returns:
+            Claimed units (unit_key, is_thread, attempts), highest priority first
+        """
+        now = time.time()
+        expired = and_(WorkItem.status == 'leased', WorkItem.lease_expires < now)
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(WorkItem).where(expired, WorkItem.attempts >= max_attempts).values(
+                    status='failed', worker_id=None, error=f"Lease expired {max_attempts} times"
+                )
+            )
+            available = select(WorkItem.unit_key).where(
+                or_(WorkItem.status == 'pending', expired)
+            ).order_by(desc(WorkItem.priority), WorkItem.created_at).limit(limit).scalar_subquery()
+            rows = conn.execute(
+                update(WorkItem).where(WorkItem.unit_key.in_(available)).values(
+                    status='leased',
+                    worker_id=worker_id,
+                    lease_expires=now + lease_seconds,
+                    attempts=WorkItem.attempts + 1,
+                    updated_at=datetime.utcnow()
+                ).returning(WorkItem.unit_key, WorkItem.is_thread, WorkItem.attempts, WorkItem.priority)
+            ).all()
+        rows.sort(key=lambda row: -(row.priority or 0))
+        return [{'unit_key': row.unit_key, 'is_thread': row.is_thread, 'attempts': row.attempts} for row in rows]
+    
+    def renew_work_leases(self, worker_id: str, unit_keys: List[str], lease_seconds: float) -> int:
+        """Extend the leases a worker still holds; returns how many were extended."""
+        if not unit_keys:
+            return 0
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(WorkItem).where(
+                    WorkItem.unit_key.in_(unit_keys),
+                    WorkItem.worker_id == worker_id,
+                    WorkItem.status == 'leased'
+                ).values(lease_expires=time.time() + lease_seconds)
+            ).rowcount
+    
+    def finish_work(self, worker_id: str, unit_key: str, status: str, error: str = None) -> bool:
+        """
+        Set the outcome of a leased unit (done, failed, or pending to retry it).
+        
+        Returns:
+            False if the worker no longer held the lease (it expired and was reclaimed)
+        """
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(WorkItem).where(
+                    WorkItem.unit_key == unit_key,
+                    WorkItem.worker_id == worker_id,
+                    WorkItem.status == 'leased'
+                ).values(
+                    status=status,
+                    worker_id=None if status == 'pending' else worker_id,
+                    lease_expires=None,
+                    error=error,
+                    updated_at=datetime.utcnow()
+                )
+            ).rowcount > 0
+    
+    def get_work_counts(self) -> Dict[str, int]:
+        """Count work queue units by status, including live and expired leases."""
+        session = self.get_session()
+        try:
+            counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'failed': 0}
+            for status, count in session.query(WorkItem.status, func.count()).group_by(WorkItem.status):
+                counts[status] = count
+            counts['expired'] = session.query(func.count()).select_from(WorkItem).filter(
+                WorkItem.status == 'leased', WorkItem.lease_expires < time.time()
+            ).scalar()
+            return counts
+        finally:
+            session.close()
+    
+    # Evaluation Operations
+    def get_processed_email_ids(self, limit: Optional[int] = 20) -> List[str]:
+        """Get the IDs of the most recent processed emails (all of them if limit is None)."""
+        session = self.get_session()
+        try:
+            rows = session.query(Email.id).filter(Email.processed == True).order_by(
+                desc(Email.timestamp), desc(Email.id)
+            ).limit(limit).all()
+            return [row.id for row in rows]
+        finally:
+            session.close()
+    
+    def get_eval_results(self, variant_hash: str, email_ids: List[str]) -> Dict[str, EvalResult]:
+        """Get cached evaluation results of a prompt variant, keyed by email ID."""
+        if not email_ids:
+            return {}
+        session = self.get_session()
+        try:
+            rows = session.query(EvalResult).filter(
+                EvalResult.variant_hash == variant_hash,
+                EvalResult.email_id.in_(email_ids)
+            ).all()
+            return {row.email_id: row for row in rows}
+        finally:
+            session.close()
+    
+    def add_eval_results(self, results: List[Dict[str, Any]]):
+        """Store evaluation results, skipping (variant, email) pairs that already exist."""
+        session = self.get_session()
+        try:
+            for result in results:
+                exists = session.query(EvalResult.id).filter(
+                    EvalResult.variant_hash == result['variant_hash'],
+                    EvalResult.email_id == result['email_id']
+                ).first()
+                if exists is None:
+                    session.add(EvalResult(**result))
+            session.commit()
+        finally:
+            session.close()
+    
+    # Daily Digest Operations
+    def build_day_digest(self, start: datetime, end: datetime, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Compute the digest of emails received in a time window with indexed queries.
+        
+        Args:
+            start: Window start (inclusive)
+            end: Window end (exclusive)
+            top_n: Maximum important emails listed
+        
+        Returns:
+            Digest dictionary with counts, top important emails, new tasks and drafts awaiting review
+        """
+        session = self.get_session()
+        try:
+            in_window = [Email.timestamp >= start, Email.timestamp < end]
+            email_count = session.query(Email).filter(*in_window).count()
+            unread_count = session.query(Email).filter(*in_window, Email.is_read == False).count()
+            categories = dict(
+                session.query(EmailCategory.category, func.count(EmailCategory.id)).join(
+                    Email, Email.id == EmailCategory.email_id
+                ).filter(*in_window).group_by(EmailCategory.category).all()
+            )
+            
+            important = session.query(Email).join(
+                EmailCategory, EmailCategory.email_id == Email.id
+            ).filter(*in_window, EmailCategory.category == 'Important').order_by(
+                desc(Email.urgency_score), desc(Email.timestamp)
+            ).limit(top_n).all()
+            
+            tasks = session.query(ActionItem, Email.subject).join(
+                Email, Email.id == ActionItem.email_id
+            ).filter(*in_window, ActionItem.completed == False).order_by(
+                ActionItem.due_date.is_(None), ActionItem.due_date
+            ).all()
+            
+            drafts = session.query(Draft, Email.subject).join(
+                Email, Email.id == Draft.email_id
+            ).filter(*in_window, _shown_draft(), or_(Draft.status == 'pending', Draft.status.is_(None))).order_by(
+                desc(Draft.created_at)
+            ).all()
+            
+            return {
+                'email_count': email_count,
+                'unread_count': unread_count,
+                'categories': categories,
+                'important': [
+                    {
+                        'id': email.id,
+                        'subject': email.subject,
+                        'sender': email.sender_name or email.sender,
+                        'urgency': email.urgency_score,
+                        'summary': email.summary
+                    }
+                    for email in important
+                ],
+                'tasks': [
+                    {
+                        'id': action.id,
+                        'task': action.task,
+                        'deadline': action.deadline,
+                        'due_date': action.due_date.strftime('%Y-%m-%d') if action.due_date else None,
+                        'priority': action.priority,
+                        'email_subject': subject
+                    }
+                    for action, subject in tasks
+                ],
+                'drafts': [
+                    {'id': draft.id, 'subject': draft.subject, 'email_subject': subject, 'tone': draft.tone}
+                    for draft, subject in drafts
+                ]
+            }
+        finally:
+            session.close()
+    
+    def save_digest(self, day: str, content: Dict[str, Any], fingerprint: str):
+        """Store the materialized digest of a day."""
+        for attempt in range(3):
+            session = self.get_session()
+            try:
+                digest = session.get(DailyDigest, day)
+                if digest is None:
+                    digest = DailyDigest(day=day)
+                    session.add(digest)
+                digest.content = json.dumps(content)
+                digest.email_count = content.get('email_count', 0)
+                digest.fingerprint = fingerprint
+                session.commit()
+                return
+            except IntegrityError:
+                # Another worker process saved the same day first; retry as an update
+                session.rollback()
+                if attempt == 2:
+                    raise
+            finally:
+                session.close()
+    
+    def get_digest(self, day: str) -> Optional[DailyDigest]:
+        """Get the materialized digest of a day."""
+        session = self.get_session()
+        try:
+            return session.get(DailyDigest, day)
+        finally:
+            session.close()
+    
+    def get_latest_email_time(self) -> Optional[datetime]:
+        """Get the timestamp of the newest email."""
+        session = self.get_session()
+        try:
+            return session.query(func.max(Email.timestamp)).scalar()
+        finally:
+            session.close()
+    
+    # Chat Answer Cache Operations
+    def get_data_fingerprint(self, scopes: List[str] = None) -> str:
+        """
+        Get a fingerprint of the current data versions.
+        
+        Args:
+            scopes: Scopes to include (defaults to all)
+        
+        Returns:
+            String such as 'actions:3|categories:12|emails:40' that changes whenever the data does
+        """
+        session = self.get_session()
+        try:
+            query = session.query(DataVersion).order_by(DataVersion.scope)
+            if scopes:
+                query = query.filter(DataVersion.scope.in_(scopes))
+            return '|'.join(f"{row.scope}:{row.version}" for row in query.all())
+        finally:
+            session.close()
+    
+    def get_cached_answers(self, fingerprint: str, email_id: str = None) -> List[ChatAnswerCache]:
+        """Get cached answers built from the given data versions."""
+        session = self.get_session()
+        try:
+            query = session.query(ChatAnswerCache).filter(ChatAnswerCache.fingerprint == fingerprint)
+            if email_id:
+                query = query.filter(ChatAnswerCache.email_id == email_id)
+            else:
+                query = query.filter(ChatAnswerCache.email_id.is_(None))
+            return query.all()
+        finally:
+            session.close()
+    
+    def add_cached_answer(self, query_key: str, fingerprint: str, answer: str,
+                          email_id: str = None) -> ChatAnswerCache:
+        """Cache a chat answer and drop answers built from older data versions."""
+        session = self.get_session()
+        try:
+            session.query(ChatAnswerCache).filter(ChatAnswerCache.fingerprint != fingerprint).delete()
+            entry = ChatAnswerCache(
+                query_key=query_key,
+                email_id=email_id,
+                fingerprint=fingerprint,
+                answer=answer
+            )
+            session.add(entry)
+            session.commit()
+            session.refresh(entry)
+            return entry
+        finally:
+            session.close()
+    
+    def record_cache_hit(self, entry_id: int):
+        """Update usage statistics of a cached answer."""
+        session = self.get_session()
+        try:
+            entry = session.get(ChatAnswerCache, entry_id)
+            if entry:
+                entry.hits = (entry.hits or 0) + 1
+                entry.last_used = datetime.utcnow()
+                session.commit()
+        finally:
+            session.close()
+    
     # Chat History Operations
-    def add_chat_message(self, user_message: str, agent_response: str, context: str = None) -> ChatHistory:
+    def add_chat_message(self, user_message: str, agent_response: str, context: str = None,
+                         session_id: str = None) -> ChatHistory:
         """Add a chat message to history."""
         session = self.get_session()
         try:
             chat = ChatHistory(
                 user_message=user_message,
                 agent_response=agent_response,
-                context=context
+                context=context,
+                session_id=session_id
             )
             session.add(chat)
             session.commit()
@@ -323,6 +1733,39 @@ class StorageService:
         finally:
             session.close()
     
+    def get_session_messages(self, session_id: str, after_id: int = 0) -> List[ChatHistory]:
+        """Get a conversation's turns after a chat_history ID, oldest first."""
+        session = self.get_session()
+        try:
+            return session.query(ChatHistory).filter(
+                ChatHistory.session_id == session_id,
+                ChatHistory.id > after_id
+            ).order_by(ChatHistory.id).all()
+        finally:
+            session.close()
+    
+    def get_chat_session(self, session_id: str) -> Optional[ChatSession]:
+        """Get a conversation's rolling summary state."""
+        session = self.get_session()
+        try:
+            return session.get(ChatSession, session_id)
+        finally:
+            session.close()
+    
+    def save_chat_session(self, session_id: str, summary: str, summarized_through: int):
+        """Store a conversation's rolling summary and the last turn it covers."""
+        session = self.get_session()
+        try:
+            chat_session = session.get(ChatSession, session_id)
+            if chat_session is None:
+                chat_session = ChatSession(id=session_id)
+                session.add(chat_session)
+            chat_session.summary = summary
+            chat_session.summarized_through = summarized_through
+            session.commit()
+        finally:
+            session.close()
+    
     def get_chat_history(self, limit: int = 50) -> List[ChatHistory]:
         """Get recent chat history."""
         session = self.get_session()
@@ -336,6 +1779,7 @@ class StorageService:
         session = self.get_session()
         try:
             session.query(ChatHistory).delete()
+            session.query(ChatSession).delete()
             session.commit()
         finally:
             session.close()
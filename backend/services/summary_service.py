@@ -0,0 +1,190 @@
+"""
+Summary service for hierarchical (map-reduce) summaries of the whole inbox.
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable
+from backend.services.storage_service import StorageService
+from backend.services.llm_service import LLMService
+from backend.utils.helpers import strip_quoted_text, truncate_text
+
+# Emails shorter than this are their own summary; no LLM call is made
+SUMMARY_MIN_CHARS = int(os.getenv('SUMMARY_MIN_CHARS', '280'))
+# Summaries combined per reduce call
+SUMMARY_FANIN = int(os.getenv('SUMMARY_FANIN', '10'))
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))
+# Days of per-day rollups included in whole-inbox answers
+SUMMARY_CONTEXT_DAYS = int(os.getenv('SUMMARY_CONTEXT_DAYS', '7'))
+
+
+class SummaryService:
+    """
+    Builds the summary hierarchy: email -> thread -> category / day.
+    
+    Email summaries are cached when emails are processed. A thread is
+    represented by the summary of its latest message, which is written with
+    the earlier messages as context. Category and day rollups combine thread
+    summaries in parallel batches and are rebuilt only when their inputs change.
+    """
+    
+    def __init__(self, storage_service: StorageService, llm_service: LLMService, workers: int = None):
+        """
+        Initialize summary service.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            llm_service: LLM service instance
+            workers: Concurrent LLM calls when summarizing
+        """
+        self.storage = storage_service
+        self.llm = llm_service
+        self.workers = workers or SUMMARY_WORKERS
+    
+    def summarize_email(self, sender: str, subject: str, body: str, template: str) -> str:
+        """
+        Summarize one email, using the text itself when it is already short.
+        
+        Args:
+            sender: Email sender
+            subject: Email subject
+            body: Body as sent to the LLM (may include thread context)
+            template: The 'summary' prompt template
+        
+        Returns:
+            Summary text
+        """
+        text = ' '.join((strip_quoted_text(body) or body).split())
+        if len(text) < SUMMARY_MIN_CHARS:
+            return f"{subject}: {text}" if text else subject
+        return self.llm.summarize_email(sender, subject, body, template).strip()
+    
+    def backfill(self, template: str, limit: int = 100) -> int:
+        """
+        Summarize processed emails that have no summary yet, in parallel.
+        
+        Args:
+            template: The 'summary' prompt template
+            limit: Maximum emails to summarize
+        
+        Returns:
+            Number of emails summarized
+        """
+        emails = self.storage.get_emails_missing_summary(limit)
+        if not emails:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            summaries = list(executor.map(
+                lambda email: self.summarize_email(email.sender, email.subject, email.body, template),
+                emails
+            ))
+        for email, summary in zip(emails, summaries):
+            self.storage.update_email_summary(email.id, summary)
+        return len(emails)
+    
+    def refresh_rollups(self) -> Dict[str, int]:
+        """
+        Rebuild category and day rollups whose thread summaries changed.
+        
+        Returns:
+            Number of rollups rebuilt per level
+        """
+        threads = self.storage.get_thread_summaries()
+        groupings = {
+            'category': lambda thread: thread['category'],
+            'day': lambda thread: thread['timestamp'].strftime('%Y-%m-%d'),
+        }
+        
+        pending = {}
+        rebuilt = {}
+        results = {}
+        for level, key_of in groupings.items():
+            groups = self._group(threads, key_of)
+            cached = self.storage.get_rollups(level)
+            results[level] = {}
+            rebuilt[level] = 0
+            for key, items in groups.items():
+                fingerprint = hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest()
+                row = cached.get(key)
+                if row is not None and row.fingerprint == fingerprint:
+                    results[level][key] = {'summary': row.summary, 'fingerprint': fingerprint, 'item_count': len(items)}
+                else:
+                    pending[(level, key)] = items
+                    results[level][key] = {'summary': None, 'fingerprint': fingerprint, 'item_count': len(items)}
+                    rebuilt[level] += 1
+        
+        for (level, key), summary in self._reduce(pending).items():
+            results[level][key]['summary'] = summary
+        for level, rollups in results.items():
+            self.storage.save_rollups(level, rollups)
+        return rebuilt
+    
+    @staticmethod
+    def _group(threads: List[Dict[str, Any]], key_of: Callable[[Dict[str, Any]], str]) -> Dict[str, List[str]]:
+        """Group thread summaries, newest first within each group."""
+        groups = {}
+        for thread in sorted(threads, key=lambda t: t['timestamp'], reverse=True):
+            groups.setdefault(key_of(thread), []).append(
+                f"{thread['subject']} ({thread['email_count']} msg): {truncate_text(thread['summary'], 400)}"
+            )
+        return groups
+    
+    def _reduce(self, groups: Dict[Any, List[str]]) -> Dict[Any, str]:
+        """
+        Map-reduce each group to one summary.
+        
+        Every round summarizes batches of SUMMARY_FANIN items from all groups
+        concurrently, until each group is down to a single summary.
+        """
+        done = {key: items[0] for key, items in groups.items() if len(items) == 1}
+        remaining = {key: items for key, items in groups.items() if len(items) > 1}
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while remaining:
+                batches = [
+                    (key, items[start:start + SUMMARY_FANIN])
+                    for key, items in remaining.items()
+                    for start in range(0, len(items), SUMMARY_FANIN)
+                ]
+                summaries = executor.map(
+                    lambda batch: self.llm.summarize_summaries(self._label(batch[0]), batch[1]).strip(),
+                    batches
+                )
+                reduced = {}
+                for (key, _), summary in zip(batches, summaries):
+                    reduced.setdefault(key, []).append(summary)
+                for key, items in reduced.items():
+                    if len(items) == 1:
+                        done[key] = items[0]
+                remaining = {key: items for key, items in reduced.items() if len(items) > 1}
+        return done
+    
+    @staticmethod
+    def _label(key: Any) -> str:
+        level, value = key
+        return f"{level} {value}"
+    
+    def inbox_context(self) -> str:
+        """
+        Whole-inbox context for chat: category rollups plus recent day rollups.
+        
+        Returns:
+            Context text built only from cached rollups
+        """
+        self.refresh_rollups()
+        categories = self.storage.get_rollups('category')
+        days = self.storage.get_rollups('day')
+        if not categories:
+            return ""
+        
+        lines = ["By category:"]
+        for key in sorted(categories):
+            row = categories[key]
+            lines.append(f"[{key}] ({row.item_count} conversations) {row.summary}")
+        recent_days = sorted(days, reverse=True)[:SUMMARY_CONTEXT_DAYS]
+        if recent_days:
+            lines.append("\nBy day (most recent first):")
+            for key in recent_days:
+                row = days[key]
+                lines.append(f"{key} ({row.item_count} conversations): {row.summary}")
+        return "\n".join(lines)
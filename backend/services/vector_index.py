@@ -0,0 +1,365 @@
+"""
+Persistent memory-mapped vector index for email embeddings.
+"""
+import json
+import os
+import threading
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+ID_BYTES = 64
+SEARCH_BLOCK_ROWS = 65536
+
+
+class VectorIndex:
+    """
+    Append-only float32 matrix stored as memory-mapped files, with an ID map,
+    tombstone deletes, compaction and optional IVF coarse partitioning.
+    
+    Files written next to the prefix:
+        .f32       vectors, capacity x dim float32
+        .ids       row -> email ID, fixed-width bytes (empty = deleted)
+        .ivf.npy   IVF centroids (when trained)
+        .assign    row -> IVF list, int32 (when trained)
+        .json      metadata (dim, count, capacity, watermark)
+    """
+    
+    def __init__(self, prefix: str, dim: int):
+        """
+        Open or create an index.
+        
+        Args:
+            prefix: Path prefix for the index files (e.g. data/email_agent.vectors)
+            dim: Vector dimension
+        """
+        self.prefix = prefix
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._row_of = None
+        self._lists = None
+        self._meta_mtime = None
+        if os.path.dirname(prefix):
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        self._load()
+    
+    # File handling
+    def _path(self, suffix: str) -> str:
+        return f"{self.prefix}{suffix}"
+    
+    def _load(self):
+        """Map the files described by the metadata, creating an empty index if needed."""
+        meta_path = self._path('.json')
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('dim') != self.dim:
+                meta = None
+        if meta is None:
+            meta = {'dim': self.dim, 'count': 0, 'capacity': 0, 'live': 0, 'watermark': 0}
+            self._resize_files(1024)
+            meta['capacity'] = 1024
+            self._write_meta(meta)
+        self.meta = meta
+        self._meta_mtime = os.path.getmtime(meta_path)
+        self._map()
+    
+    def _map(self):
+        """(Re)create the memory maps for the current capacity."""
+        capacity = self.meta['capacity']
+        self._vectors = np.memmap(self._path('.f32'), dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._ids = np.memmap(self._path('.ids'), dtype=f'S{ID_BYTES}', mode='r+', shape=(capacity,))
+        self._centroids = None
+        self._assign = None
+        if self.meta.get('nlist') and os.path.exists(self._path('.ivf.npy')):
+            self._centroids = np.load(self._path('.ivf.npy'))
+            self._assign = np.memmap(self._path('.assign'), dtype=np.int32, mode='r+', shape=(capacity,))
+        self._row_of = None
+        self._lists = None
+    
+    def _resize_files(self, capacity: int):
+        """Grow (or create) the backing files to hold capacity rows."""
+        for suffix, row_bytes in (('.f32', self.dim * 4), ('.ids', ID_BYTES), ('.assign', 4)):
+            path = self._path(suffix)
+            if suffix == '.assign' and not os.path.exists(path):
+                continue
+            with open(path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+    
+    def _write_meta(self, meta: dict):
+        """Atomically replace the metadata file."""
+        tmp_path = self._path('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path('.json'))
+    
+    def _file_lock(self):
+        """Open the inter-process lock file (POSIX only)."""
+        handle = open(self._path('.lock'), 'a+')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+    
+    def reload_if_changed(self):
+        """Pick up appends made by other processes."""
+        meta_path = self._path('.json')
+        with self._lock:
+            mtime = os.path.getmtime(meta_path)
+            if mtime != self._meta_mtime:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    self.meta = json.load(f)
+                self._meta_mtime = mtime
+                self._map()
+    
+    # Properties
+    @property
+    def count(self) -> int:
+        """Number of rows written, including deleted ones."""
+        return self.meta['count']
+    
+    @property
+    def live_count(self) -> int:
+        """Number of rows not deleted."""
+        return self.meta['live']
+    
+    @property
+    def watermark(self) -> int:
+        """Source row ID up to which vectors have been loaded."""
+        return self.meta.get('watermark', 0)
+    
+    # Writes
+    def append(self, ids: List[str], vectors: np.ndarray, watermark: int = None):
+        """
+        Append vectors, growing the files by doubling when full.
+        
+        Args:
+            ids: Email IDs, one per row
+            vectors: float32 matrix of shape (len(ids), dim)
+            watermark: Source row ID of the last vector, for incremental loads
+        """
+        if not ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self.reload_if_changed()
+                start = self.meta['count']
+                end = start + len(ids)
+                if end > self.meta['capacity']:
+                    capacity = self.meta['capacity']
+                    while capacity < end:
+                        capacity *= 2
+                    self._flush()
+                    self._resize_files(capacity)
+                    self.meta['capacity'] = capacity
+                    self._map()
+                
+                self._vectors[start:end] = vectors
+                self._ids[start:end] = [email_id.encode('utf-8')[:ID_BYTES] for email_id in ids]
+                if self._centroids is not None:
+                    self._assign[start:end] = self._nearest_centroid(vectors)
+                self._flush()
+                
+                self.meta['count'] = end
+                self.meta['live'] = self.meta.get('live', 0) + len(ids)
+                if watermark is not None:
+                    self.meta['watermark'] = watermark
+                self._write_meta(self.meta)
+                self._meta_mtime = os.path.getmtime(self._path('.json'))
+                if self._row_of is not None:
+                    for offset, email_id in enumerate(ids):
+                        self._row_of[email_id] = start + offset
+                self._lists = None
+            finally:
+                handle.close()
+    
+    def delete(self, email_ids: List[str]) -> int:
+        """
+        Tombstone rows; space is reclaimed by compact().
+        
+        Args:
+            email_ids: Email IDs to delete
+        
+        Returns:
+            Number of rows deleted
+        """
+        with self._lock:
+            row_of = self._row_map()
+            deleted = 0
+            for email_id in email_ids:
+                row = row_of.pop(email_id, None)
+                if row is not None:
+                    self._ids[row] = b''
+                    deleted += 1
+            if deleted:
+                self._flush()
+                self.meta['live'] -= deleted
+                self._write_meta(self.meta)
+                self._meta_mtime = os.path.getmtime(self._path('.json'))
+            return deleted
+    
+    def compact(self):
+        """Rewrite the files without deleted rows."""
+        with self._lock:
+            live = np.nonzero(self._ids[:self.count] != b'')[0]
+            vectors = np.array(self._vectors[live])
+            ids = [email_id.decode('utf-8') for email_id in self._ids[live]]
+            watermark = self.watermark
+            nlist = self.meta.get('nlist')
+            self.reset()
+            self.append(ids, vectors, watermark)
+            if nlist:
+                self.train_ivf(nlist)
+    
+    def reset(self):
+        """Delete all rows."""
+        with self._lock:
+            for suffix in ('.f32', '.ids', '.assign', '.ivf.npy'):
+                if os.path.exists(self._path(suffix)):
+                    os.remove(self._path(suffix))
+            os.remove(self._path('.json'))
+            self._load()
+    
+    def _flush(self):
+        self._vectors.flush()
+        self._ids.flush()
+        if self._assign is not None:
+            self._assign.flush()
+    
+    def _row_map(self) -> dict:
+        """Email ID -> row, built lazily on first use."""
+        if self._row_of is None:
+            self._row_of = {
+                email_id.decode('utf-8'): row
+                for row, email_id in enumerate(self._ids[:self.count]) if email_id
+            }
+        return self._row_of
+    
+    # IVF partitioning
+    def train_ivf(self, nlist: int, iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        """
+        Partition rows into nlist clusters with spherical k-means so searches
+        only scan the closest lists.
+        
+        Args:
+            nlist: Number of clusters
+            iterations: k-means iterations
+            sample_size: Rows sampled for training
+            seed: Random seed
+        """
+        with self._lock:
+            live = np.nonzero(self._ids[:self.count] != b'')[0]
+            if len(live) < nlist:
+                return
+            rng = np.random.default_rng(seed)
+            sample = np.array(self._vectors[rng.choice(live, min(sample_size, len(live)), replace=False)])
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for cluster in range(nlist):
+                    members = sample[labels == cluster]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+            
+            np.save(self._path('.ivf.npy'), centroids.astype(np.float32))
+            with open(self._path('.assign'), 'ab') as f:
+                f.truncate(self.meta['capacity'] * 4)
+            self.meta['nlist'] = nlist
+            self._map()
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, self.count)
+                self._assign[start:end] = self._nearest_centroid(self._vectors[start:end])
+            self._flush()
+            self._write_meta(self.meta)
+            self._meta_mtime = os.path.getmtime(self._path('.json'))
+    
+    def _nearest_centroid(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(np.asarray(vectors) @ self._centroids.T, axis=1).astype(np.int32)
+    
+    def _inverted_lists(self) -> List[np.ndarray]:
+        """IVF list -> rows, built lazily from the assignment array."""
+        if self._lists is None:
+            assign = np.asarray(self._assign[:self.count])
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._lists
+    
+    # Search
+    def search(self, queries: np.ndarray, k: int, nprobe: int = None) -> List[List[Tuple[str, float]]]:
+        """
+        Batched top-k inner-product search.
+        
+        Args:
+            queries: float32 matrix (n_queries, dim) or a single vector
+            k: Results per query
+            nprobe: IVF lists to scan per query (ignored when untrained;
+                None scans all rows)
+        
+        Returns:
+            For each query, a list of (email_id, score), best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            count = self.count
+            if count == 0 or k <= 0:
+                return [[] for _ in queries]
+            
+            if self._centroids is not None and nprobe:
+                return [self._search_ivf(query, k, nprobe) for query in queries]
+            
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, count)
+                scores = queries @ np.asarray(self._vectors[start:end]).T
+                scores[:, self._ids[start:end] == b''] = -np.inf
+                best_scores, best_rows = self._merge_top_k(
+                    best_scores, best_rows, scores, np.arange(start, end), k
+                )
+            return [self._format(rows, scores) for rows, scores in zip(best_rows, best_scores)]
+    
+    def _search_ivf(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[str, float]]:
+        lists = self._inverted_lists()
+        probe = np.argsort(-(self._centroids @ query))[:nprobe]
+        rows = np.concatenate([lists[i] for i in probe]) if len(probe) else np.zeros(0, dtype=np.int64)
+        if len(rows) == 0:
+            return []
+        rows.sort()
+        scores = np.asarray(self._vectors[rows]) @ query
+        scores[self._ids[rows] == b''] = -np.inf
+        best_scores, best_rows = self._merge_top_k(
+            np.full((1, 0), -np.inf, dtype=np.float32), np.zeros((1, 0), dtype=np.int64),
+            scores[None, :], rows, k
+        )
+        return self._format(best_rows[0], best_scores[0])
+    
+    @staticmethod
+    def _merge_top_k(best_scores, best_rows, scores, rows, k):
+        """Merge a block of scores into the running top-k per query."""
+        all_scores = np.concatenate([best_scores, scores], axis=1)
+        all_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+        if all_scores.shape[1] > k:
+            top = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+            all_scores = np.take_along_axis(all_scores, top, axis=1)
+            all_rows = np.take_along_axis(all_rows, top, axis=1)
+        return all_scores, all_rows
+    
+    def _format(self, rows: np.ndarray, scores: np.ndarray) -> List[Tuple[str, float]]:
+        order = np.argsort(-scores)
+        return [
+            (self._ids[rows[i]].decode('utf-8'), float(scores[i]))
+            for i in order if np.isfinite(scores[i])
+        ]
+    
+    def get_row_ids(self) -> Optional[List[str]]:
+        """All live email IDs (mainly for diagnostics)."""
+        return list(self._row_map().keys())
@@ -0,0 +1,117 @@
+"""
+Work queue letting several worker processes share the processing backlog through the database.
+"""
+import os
+import socket
+import threading
+import uuid
+from typing import Dict, Any, List, Tuple
+from backend.services.storage_service import StorageService
+from backend.services.scheduler import PriorityScheduler
+
+# A unit whose worker stops renewing its lease for this long goes back to the pool
+WORK_LEASE_SECONDS = float(os.getenv('WORK_LEASE_SECONDS', '120'))
+# Units claimed per round trip (defaults to the worker's concurrency)
+WORK_BATCH_SIZE = int(os.getenv('WORK_BATCH_SIZE', '0'))
+# Leases a unit may get (failures and expired leases) before it is marked failed
+WORK_MAX_ATTEMPTS = int(os.getenv('WORK_MAX_ATTEMPTS', '3'))
+# How often an idle worker checks for leases of other workers that expired
+WORK_POLL_SECONDS = float(os.getenv('WORK_POLL_SECONDS', '2'))
+
+
+class WorkQueue:
+    """
+    Leases processing units (threads or single emails) to one worker at a time.
+    
+    Every worker enqueues the backlog (idempotently), then claims batches of
+    units. While a unit is held, a heartbeat thread keeps renewing its lease;
+    if the worker dies, the lease expires and another worker claims the unit.
+    Processing a unit only touches its unprocessed emails, so a unit that is
+    picked up again after a crash resumes where the dead worker stopped.
+    """
+    
+    def __init__(self, storage_service: StorageService, worker_id: str = None,
+                 lease_seconds: float = None, max_attempts: int = None):
+        """
+        Initialize the work queue.
+        
+        Args:
+            storage_service: Storage service instance for database operations
+            worker_id: Unique worker ID (defaults to host:pid:random)
+            lease_seconds: Lease duration
+            max_attempts: Leases a unit may get before it is marked failed
+        """
+        self.storage = storage_service
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds or WORK_LEASE_SECONDS
+        self.max_attempts = max_attempts or WORK_MAX_ATTEMPTS
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+    
+    def enqueue(self, plan: List[Tuple[str, List[Any]]]) -> int:
+        """
+        Add planned units to the queue, keeping their scheduling priority.
+        
+        Args:
+            plan: (unit key, emails) pairs as returned by AgentService.plan_processing
+        
+        Returns:
+            Number of units newly queued
+        """
+        scheduler = PriorityScheduler()
+        return self.storage.enqueue_work([
+            {'unit_key': unit_key, 'is_thread': bool(emails[0].thread_id), 'priority': scheduler.priority(emails)}
+            for unit_key, emails in plan
+        ])
+    
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to `limit` units to this worker, highest priority first."""
+        units = self.storage.claim_work(self.worker_id, limit, self.lease_seconds, self.max_attempts)
+        with self._lock:
+            self._held.update(unit['unit_key'] for unit in units)
+        return units
+    
+    def finish(self, unit: Dict[str, Any], failed: bool = False, error: str = None) -> bool:
+        """
+        Release a unit, marking it done, or failed (retried until it used up its attempts).
+        
+        Returns:
+            False if the lease had expired and the unit was reclaimed by another worker
+        """
+        with self._lock:
+            self._held.discard(unit['unit_key'])
+        if not failed:
+            status = 'done'
+        else:
+            status = 'failed' if unit['attempts'] >= self.max_attempts else 'pending'
+        return self.storage.finish_work(self.worker_id, unit['unit_key'], status, error)
+    
+    def counts(self) -> Dict[str, int]:
+        """Units by status, across all workers."""
+        return self.storage.get_work_counts()
+    
+    def start(self):
+        """Start renewing the leases this worker holds."""
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name='work-queue-heartbeat', daemon=True)
+        self._heartbeat.start()
+    
+    def stop(self):
+        """Stop the heartbeat; leases still held expire on their own."""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+    
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            try:
+                # Leases that expired anyway (e.g. the process was suspended) are not renewed;
+                # finish() then reports the unit as lost
+                self.storage.renew_work_leases(self.worker_id, held, self.lease_seconds)
+            except Exception as e:
+                print(f"Work queue heartbeat failed: {str(e)}")
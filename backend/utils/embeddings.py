@@ -0,0 +1,75 @@
+"""
+Local hashed n-gram embeddings for offline semantic retrieval.
+"""
+import hashlib
+import os
+import re
+from typing import List
+
+import numpy as np
+
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '512'))
+_WORD = re.compile(r'\w+')
+
+
+def _bucket(token: str, dim: int) -> tuple:
+    """Hash a token to a (bucket, sign) pair."""
+    digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed text as an L2-normalized hashed bag of words and character trigrams.
+    
+    Words carry most of the weight; trigrams let inflections and typos
+    ("meetings", "meeting") land close together.
+    
+    Args:
+        text: Input text
+        dim: Vector dimension
+    
+    Returns:
+        float32 vector of length dim
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in _WORD.findall((text or '').lower()):
+        index, sign = _bucket('w:' + word, dim)
+        vector[index] += sign * 2.0
+        padded = f' {word} '
+        for start in range(len(padded) - 2):
+            index, sign = _bucket('c:' + padded[start:start + 3], dim)
+            vector[index] += sign * 0.5
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def embed_texts(texts: List[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed several texts.
+    
+    Args:
+        texts: Input texts
+        dim: Vector dimension
+    
+    Returns:
+        float32 matrix of shape (len(texts), dim)
+    """
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.vstack([embed_text(text, dim) for text in texts])
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the LLM token count of text (about 4 characters per token).
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Estimated token count
+    """
+    return len(text or '') // 4 + 1
@@ -1,8 +1,22 @@
 """
 Utility functions for the Email Productivity Agent
 """
-from datetime import datetime
-from typing import Dict, Any
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple, Union
+from dateutil import parser as date_parser
+
+_REPLY_PREFIX = re.compile(r'^\s*((re|fw|fwd|aw|wg)(\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_QUOTE_HEADER = re.compile(
+    r'^\s*(On .+ wrote:|-+\s*Original Message\s*-+|From: .+)\s*$',
+    re.IGNORECASE
+)
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_NO_DEADLINE = {'', 'null', 'none', 'n/a', 'na', 'no deadline', 'not specified', 'unknown', 'asap'}
+_DEADLINE_PREFIX = re.compile(r'^(?:due\s+)?(?:by|before|on|until|no later than)\s+|^due\s+')
+# Two defaults differing in every date field reveal which fields a date string actually gave
+_PROBE_DEFAULTS = (datetime(2000, 1, 1), datetime(2004, 2, 2))
 
 
 def format_timestamp(timestamp: datetime) -> str:
@@ -18,6 +32,59 @@ def format_timestamp(timestamp: datetime) -> str:
     return timestamp.strftime("%Y-%m-%d %H:%M:%S")
 
 
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp into a naive UTC datetime.
+    
+    Args:
+        value: ISO timestamp, optionally ending in 'Z' or an offset
+    
+    Returns:
+        Naive datetime in UTC, as stored in the database
+    """
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def decayed_weight(weight: float, last_updated: datetime, now: datetime,
+                   half_life_days: float) -> float:
+    """
+    Apply exponential time decay to a weight.
+    
+    Args:
+        weight: Weight at last_updated
+        last_updated: When the weight was last updated
+        now: Current time
+        half_life_days: Days for the weight to halve
+    
+    Returns:
+        Decayed weight at now
+    """
+    if not weight or last_updated is None or half_life_days <= 0:
+        return weight or 0.0
+    elapsed_days = max((now - last_updated).total_seconds(), 0) / 86400
+    return weight * 0.5 ** (elapsed_days / half_life_days)
+
+
+def sender_keys(sender: str) -> List[str]:
+    """
+    Get the memoization keys for a sender: the address and its @domain.
+    
+    Args:
+        sender: Sender email address
+    
+    Returns:
+        List of keys, most specific first
+    """
+    address = (sender or '').strip().lower()
+    keys = [address] if address else []
+    if '@' in address:
+        keys.append('@' + address.split('@', 1)[1])
+    return keys
+
+
 def truncate_text(text: str, max_length: int = 100) -> str:
     """
     Truncate text to a maximum length.
@@ -97,3 +164,171 @@ def sanitize_email_body(body: str) -> str:
     """
     # Basic sanitization - in production, use proper HTML sanitization
     return body.replace('<script>', '').replace('</script>', '')
+
+
+def is_reply_subject(subject: str) -> bool:
+    """
+    Check whether a subject carries a reply or forward prefix.
+    
+    Args:
+        subject: Email subject
+    
+    Returns:
+        True if the subject starts with Re:, Fwd: or similar
+    """
+    return bool(_REPLY_PREFIX.match(subject or ''))
+
+
+def normalize_subject(subject: str) -> str:
+    """
+    Normalize a subject for thread matching.
+    
+    Strips reply/forward prefixes, collapses whitespace and lowercases.
+    
+    Args:
+        subject: Email subject
+    
+    Returns:
+        Normalized subject key
+    """
+    stripped = _REPLY_PREFIX.sub('', subject or '')
+    return ' '.join(stripped.split()).lower()
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """
+    Map a key (thread or email ID) to a shard, the same way in every process.
+    
+    Args:
+        key: Key to place
+        shard_count: Number of shards
+    
+    Returns:
+        Shard index between 0 and shard_count - 1
+    """
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification of the form 'i/n' (0-based index i of n shards).
+    
+    Args:
+        value: Shard specification, e.g. '0/4'
+    
+    Returns:
+        Tuple of (index, count)
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', value or '')
+    if not match or int(match.group(2)) < 1 or int(match.group(1)) >= int(match.group(2)):
+        raise ValueError(f"Invalid shard '{value}': expected i/n with 0 <= i < n")
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_message_ids(value: Union[str, List[str], None]) -> List[str]:
+    """
+    Parse a Message-ID header value (In-Reply-To, References) into a list.
+    
+    Args:
+        value: Header string or list of IDs
+    
+    Returns:
+        List of Message-IDs in header order
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(value)
+    ids = re.findall(r'<[^<>\s]+>', value)
+    return ids if ids else value.split()
+
+
+def strip_quoted_text(body: str) -> str:
+    """
+    Remove quoted history from a reply body.
+    
+    Drops '>' quoted lines and everything after an attribution line
+    such as "On ... wrote:" or "-----Original Message-----".
+    
+    Args:
+        body: Raw email body
+    
+    Returns:
+        Body containing only the newly written text
+    """
+    kept = []
+    for line in (body or '').splitlines():
+        if _QUOTE_HEADER.match(line) and kept:
+            break
+        if line.lstrip().startswith('>'):
+            continue
+        kept.append(line)
+    return '\n'.join(kept).strip()
+
+
+def parse_deadline(deadline: Optional[str], reference: datetime) -> Optional[datetime]:
+    """
+    Resolve a free-text deadline extracted by the LLM into a due date.
+    
+    Relative phrases ("tomorrow", "Friday", "end of week", "in 3 days") are
+    resolved against the reference time, usually the email's timestamp.
+    Other text must name a month and a day ("Dec 1st", "2025-11-20"); a
+    month-day without a year that falls before the reference is taken to
+    be next year's. Vague text ("Q4", "by 5", "March") gives None rather
+    than a guessed date.
+    
+    Args:
+        deadline: Deadline text such as "2025-11-20", "Friday" or "EOD"
+        reference: Time the deadline is relative to
+    
+    Returns:
+        Due date at midnight, or None if the text has no recognizable date
+    """
+    text = (deadline or '').strip().lower()
+    if text in _NO_DEADLINE:
+        return None
+    day = reference.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    if re.search(r'\b(today|tonight|eod|end of (the )?day)\b', text):
+        return day
+    if 'tomorrow' in text:
+        return day + timedelta(days=1)
+    if re.search(r'\b(end of (the )?week|eow|this week)\b', text):
+        return day + timedelta(days=max(4 - day.weekday(), 0))
+    if 'next week' in text:
+        return day + timedelta(days=7 - day.weekday())
+    relative = re.search(r'\b(\d+) (day|week)s?\b', text)
+    if relative:
+        amount = int(relative.group(1)) * (7 if relative.group(2) == 'week' else 1)
+        return day + timedelta(days=amount)
+    
+    words = re.findall(r'[a-z]+', text)
+    if len(words) <= 3:
+        for index, name in enumerate(_WEEKDAYS):
+            if name in words or name[:3] in words:
+                ahead = (index - day.weekday()) % 7
+                if 'next' in words and ahead == 0:
+                    ahead = 7
+                return day + timedelta(days=ahead)
+    
+    text = _DEADLINE_PREFIX.sub('', text)
+    try:
+        first, second = (date_parser.parse(text, default=default) for default in _PROBE_DEFAULTS)
+    except (ValueError, OverflowError):
+        return None
+    if first.month != second.month or first.day != second.day:
+        return None
+    if first.year == second.year:
+        if first.tzinfo is not None:
+            first = first.astimezone(timezone.utc).replace(tzinfo=None)
+        return first.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    for year in (day.year, day.year + 1):
+        try:
+            due = datetime(year, first.month, first.day)
+        except ValueError:  # Feb 29 outside a leap year
+            continue
+        if due >= day:
+            return due
+    return None
@@ -0,0 +1,98 @@
+"""
+Text similarity signatures for near-duplicate detection.
+"""
+import hashlib
+import re
+from collections import Counter
+from typing import List
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+
+def _shingles(text: str, size: int = 3) -> List[str]:
+    """
+    Split text into overlapping word shingles.
+    
+    Digits are collapsed so ticket numbers, dates and amounts don't make
+    otherwise identical template emails look different.
+    
+    Args:
+        text: Input text
+        size: Number of words per shingle
+    
+    Returns:
+        List of shingles
+    """
+    normalized = re.sub(r'\d+', '0', (text or '').lower())
+    words = re.findall(r'\w+', normalized)
+    if len(words) < size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER range."""
+    return value - (1 << SIMHASH_BITS) if value >= (1 << (SIMHASH_BITS - 1)) else value
+
+
+def _to_unsigned(value: int) -> int:
+    """Inverse of _to_signed."""
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+def simhash(text: str) -> int:
+    """
+    Compute a 64-bit SimHash signature of text.
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Signature as a signed 64-bit integer (storable in SQLite)
+    """
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in Counter(_shingles(text)).items():
+        digest = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if digest >> bit & 1 else -count
+    
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return _to_signed(value)
+
+
+def simhash_bands(signature: int) -> List[int]:
+    """
+    Split a signature into LSH bands.
+    
+    Two signatures within SIMHASH_BANDS - 1 differing bits always share
+    at least one band, so bands can be used as indexed lookup keys.
+    
+    Args:
+        signature: Signed SimHash value
+    
+    Returns:
+        List of SIMHASH_BANDS band values
+    """
+    value = _to_unsigned(signature)
+    mask = (1 << _BAND_BITS) - 1
+    return [(value >> (band * _BAND_BITS)) & mask for band in range(SIMHASH_BANDS)]
+
+
+def simhash_similarity(first: int, second: int) -> float:
+    """
+    Similarity of two signatures as the fraction of matching bits.
+    
+    Args:
+        first: Signed SimHash value
+        second: Signed SimHash value
+    
+    Returns:
+        Similarity between 0.0 and 1.0
+    """
+    distance = bin(_to_unsigned(first) ^ _to_unsigned(second)).count('1')
+    return 1.0 - distance / SIMHASH_BITS
@@ -0,0 +1,139 @@
+"""
+Startup helpers: lazy environment loading and a startup-time profiler.
+
+Run `python -m backend.utils.startup` to print the slowest imports and the
+time taken by each startup phase of the app or a CLI worker.
+"""
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, List
+
+ENV_FILE = Path(__file__).resolve().parents[2] / '.env'
+
+# Most phases kept per process
+MAX_STARTUP_PHASES = 50
+
+_env_lock = threading.Lock()
+_env_checked = False
+_env_loaded = False
+_phases_lock = threading.Lock()
+_phases: List[Dict[str, Any]] = []
+_IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def load_env() -> bool:
+    """
+    Load the project's .env file into the environment, once.
+    
+    python-dotenv is only imported when a .env file exists, so workers
+    configured through real environment variables don't pay for it.
+    Existing environment variables take precedence over the file.
+    
+    Returns:
+        True if a .env file was loaded by this or an earlier call
+    """
+    global _env_checked, _env_loaded
+    with _env_lock:
+        if not _env_checked:
+            _env_checked = True
+            if ENV_FILE.exists():
+                from dotenv import load_dotenv
+                _env_loaded = load_dotenv(ENV_FILE)
+        return _env_loaded
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Record how long a startup phase takes, for startup_report().
+    
+    Only the first run of a phase is recorded: Streamlit re-executes the app
+    script on every rerun, and later runs (e.g. cached imports) are not startup.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        with _phases_lock:
+            if len(_phases) < MAX_STARTUP_PHASES and all(entry['phase'] != phase for entry in _phases):
+                _phases.append({'phase': phase, 'ms': elapsed})
+
+
+def startup_report() -> List[Dict[str, Any]]:
+    """Get the startup phases recorded so far in this process, in order."""
+    return list(_phases)
+
+
+def import_times(modules: List[str], top: int = 15, max_depth: int = 2) -> List[Dict[str, Any]]:
+    """
+    Measure import times of modules in a fresh interpreter (python -X importtime).
+    
+    Args:
+        modules: Modules to import, in order
+        top: Number of slowest imports returned
+        max_depth: Deepest nesting level reported (1 = only the modules themselves)
+    
+    Returns:
+        Import dictionaries (module, depth, self_ms, cumulative_ms), slowest cumulative first
+    """
+    code = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=str(ENV_FILE.parent)
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3)) // 2
+        if depth < max_depth:
+            imports.append({
+                'module': match.group(4),
+                'depth': depth + 1,
+                'self_ms': int(match.group(1)) / 1000,
+                'cumulative_ms': int(match.group(2)) / 1000
+            })
+    imports.sort(key=lambda entry: -entry['cumulative_ms'])
+    return imports[:top]
+
+
+def main():
+    """Print the slowest imports and startup phases of the agent."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Profile startup of the Email Productivity Agent")
+    parser.add_argument('--modules', nargs='+', default=['backend.services.agent_service'],
+                        help="Modules whose import time is measured")
+    parser.add_argument('--top', type=int, default=15, help="Number of imports listed")
+    parser.add_argument('--db', default=None, help="Database path used to time service construction")
+    args = parser.parse_args()
+    
+    print(f"{'Import':<50} {'self ms':>9} {'total ms':>9}")
+    for entry in import_times(args.modules, top=args.top):
+        name = '  ' * (entry['depth'] - 1) + entry['module']
+        print(f"{name:<50} {entry['self_ms']:>9.1f} {entry['cumulative_ms']:>9.1f}")
+    
+    with timed('load_env'):
+        load_env()
+    with timed('import services'):
+        from backend.services.storage_service import StorageService
+        from backend.services.agent_service import AgentService
+    with timed('storage'):
+        storage = StorageService(db_path=args.db) if args.db else StorageService()
+    with timed('agent'):
+        AgentService(storage_service=storage)
+    
+    print(f"\n{'Startup phase':<50} {'ms':>9}")
+    for phase in startup_report():
+        print(f"{phase['phase']:<50} {phase['ms']:>9.1f}")
+    print(f"{'total':<50} {sum(phase['ms'] for phase in startup_report()):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
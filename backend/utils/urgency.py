@@ -0,0 +1,66 @@
+"""
+Cheap local urgency estimation used to rank the processing backlog.
+"""
+import re
+from typing import List
+
+URGENT_TERMS = [
+    'urgent', 'asap', 'critical', 'immediately', 'immediate', 'action required', 'eod',
+    'end of day', 'deadline', 'security', 'suspended', 'overdue', 'payment due',
+    'mandatory', 'outage', 'incident', 'escalat'
+]
+LOW_PRIORITY_SENDERS = [
+    'newsletter', 'noreply', 'no-reply', 'marketing', 'promotion', 'events', 'feedback',
+    'survey', 'digest', 'notifications'
+]
+HIGH_PRIORITY_SENDERS = ['security', 'it', 'admin', 'ops', 'oncall', 'alerts']
+
+_DEADLINE = re.compile(
+    r'\b(by|due|before|until)\s+(today|tonight|tomorrow|eod|end of (the )?(day|week)|'
+    r'(mon|tues|wednes|thurs|fri|satur|sun)day|'
+    r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}|\d{1,2}[/.-]\d{1,2})',
+    re.IGNORECASE
+)
+_SOON = re.compile(r'\b(today|tonight|tomorrow|eod|this morning|this afternoon)\b', re.IGNORECASE)
+
+
+def estimate_urgency(sender: str, subject: str, body: str, labels: List[str] = None) -> float:
+    """
+    Estimate email urgency on the 1-5 scale of the urgency_analysis prompt, without the LLM.
+    
+    Args:
+        sender: Sender email address
+        subject: Email subject
+        body: Email body
+        labels: Optional labels
+    
+    Returns:
+        Urgency score between 1.0 and 5.0
+    """
+    subject_lower = (subject or '').lower()
+    body_lower = (body or '').lower()
+    local_part = (sender or '').lower().split('@')[0]
+    score = 2.0
+    
+    subject_hits = sum(1 for term in URGENT_TERMS if term in subject_lower)
+    body_hits = sum(1 for term in URGENT_TERMS if term in body_lower)
+    score += min(subject_hits, 2) * 1.0
+    score += min(body_hits, 4) * 0.25
+    
+    if _DEADLINE.search(subject or '') or _DEADLINE.search(body or ''):
+        score += 0.75
+    if _SOON.search(subject or '') or _SOON.search(body or ''):
+        score += 0.5
+    
+    if any(term in local_part for term in LOW_PRIORITY_SENDERS):
+        score -= 1.0
+    elif local_part in HIGH_PRIORITY_SENDERS:
+        score += 0.5
+    elif '.' in local_part:
+        # Looks like a person (first.last) rather than a system mailbox
+        score += 0.25
+    
+    if labels and any(label.lower() in ('urgent', 'important') for label in labels):
+        score += 0.5
+    
+    return round(max(1.0, min(5.0, score)), 2)
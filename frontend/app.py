@@ -4,14 +4,21 @@ Email Productivity Agent - Main Streamlit Application
 import streamlit as st
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add backend to path
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from backend.services.storage_service import StorageService
-from backend.services.agent_service import AgentService
+from backend.utils.startup import load_env, startup_report, timed
+
+# Load .env before the services read their settings at import
+load_env()
+
+with timed('import services'):
+    from backend.services.storage_service import StorageService
+    from backend.services.agent_service import AgentService
 
 # Page configuration
 st.set_page_config(
@@ -54,15 +61,55 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Cached page data is also refreshed after this many seconds, as a safety net
+DATA_CACHE_TTL = int(os.getenv('DATA_CACHE_TTL', '300'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1.5'))
+
+
+@st.cache_resource
+def get_agent() -> AgentService:
+    """One agent (database engine, LLM client, worker pools) shared by all sessions of this process."""
+    with timed('agent'):
+        return AgentService()
+
+
+# Data loaders are keyed on the database change token, so reruns that
+# don't change data are served from memory without any query
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def load_inbox_summary(_agent: AgentService, version: tuple) -> dict:
+    return _agent.get_inbox_summary()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def load_digest(_agent: AgentService, version: tuple) -> dict:
+    return _agent.digest.get()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def load_inbox_page(_agent: AgentService, version: tuple, category: str, order_by: str,
+                    page_size: int, cursor: str) -> dict:
+    return _agent.storage.get_email_headers_page(page_size, cursor, category=category, order_by=order_by)
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def load_email_detail(_agent: AgentService, version: tuple, email_id: str) -> dict:
+    return _agent.email_service.format_email_for_display(_agent.storage.get_email_by_id(email_id))
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def load_latest_job(_agent: AgentService, version: tuple) -> dict:
+    return _agent.jobs.latest('process_all')
+
+
 # Initialize session state
-if 'agent' not in st.session_state:
-    try:
-        st.session_state.agent = AgentService()
-        st.session_state.storage = st.session_state.agent.storage
-    except Exception as e:
-        st.error(f"Failed to initialize agent: {str(e)}")
-        st.info("Please ensure your .env file is configured correctly with API keys.")
-        st.stop()
+try:
+    st.session_state.agent = get_agent()
+    st.session_state.storage = st.session_state.agent.storage
+except Exception as e:
+    st.error(f"Failed to initialize agent: {str(e)}")
+    st.info("Please ensure your .env file is configured correctly with API keys.")
+    st.stop()
+data_version = st.session_state.storage.get_change_token()
 
 # Sidebar
 with st.sidebar:
@@ -83,7 +130,7 @@ with st.sidebar:
     # Quick stats
     st.subheader("Quick Stats")
     try:
-        summary = st.session_state.agent.get_inbox_summary()
+        summary = load_inbox_summary(st.session_state.agent, data_version)
         stats = summary['statistics']
         
         st.metric("Total Emails", stats['total_emails'])
@@ -93,6 +140,11 @@ with st.sidebar:
     except Exception as e:
         st.info("Load inbox to see stats")
     
+    if os.getenv('DEBUG_MODE', 'False').lower() == 'true':
+        with st.expander("⏱️ Startup Profile"):
+            for phase in startup_report():
+                st.caption(f"{phase['phase']}: {phase['ms']:.0f} ms")
+    
     st.markdown("---")
     st.caption("Built with ❤️ using Streamlit & LLMs")
 
@@ -120,17 +172,9 @@ if page == "🏠 Home":
     
     with col2:
         if st.button("🔄 Process All Emails", use_container_width=True):
-            with st.spinner("Processing emails with AI..."):
-                try:
-                    result = st.session_state.agent.process_all_emails()
-                    st.success(f"✅ Processed {result['successful']} emails successfully!")
-                    if result['errors']:
-                        with st.expander("⚠️ View Errors"):
-                            for error in result['errors']:
-                                st.warning(error)
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Processing failed: {str(e)}")
+            # Runs in a background worker; progress is shown below and survives reruns
+            st.session_state.agent.jobs.submit('process_all')
+            st.rerun()
     
     with col3:
         if st.button("🗑️ Clear Inbox", use_container_width=True):
@@ -143,11 +187,35 @@ if page == "🏠 Home":
                 st.session_state.confirm_clear = True
                 st.warning("Click again to confirm deletion")
     
+    # Progress of the latest "Process All Emails" job
+    job = load_latest_job(st.session_state.agent, data_version)
+    if job:
+        if job['active']:
+            eta = f" · about {int(job['eta_seconds'])}s left" if job['eta_seconds'] is not None else ""
+            st.progress(job['progress'], text=f"Processing emails: {job['done']}/{job['total']}{eta}")
+            if job['status'] == 'cancelling':
+                st.caption("Stopping after the current thread...")
+            elif st.button("⏹️ Cancel Processing"):
+                st.session_state.agent.jobs.cancel(job['id'])
+                st.rerun()
+        elif job['status'] == 'completed' and job['result']:
+            st.success(f"✅ Processed {job['result']['successful']} emails successfully!")
+            if job['result']['errors']:
+                with st.expander("⚠️ View Errors"):
+                    for error in job['result']['errors']:
+                        st.warning(error)
+        elif job['resumable']:
+            message = f"Processing {job['status']} after {job['done']}/{job['total']} emails."
+            st.warning(f"{message} {job['error'] or ''}")
+            if st.button("▶️ Resume Processing"):
+                st.session_state.agent.jobs.resume(job['id'])
+                st.rerun()
+    
     st.markdown("---")
     
     # Display inbox statistics
     try:
-        summary = st.session_state.agent.get_inbox_summary()
+        summary = load_inbox_summary(st.session_state.agent, data_version)
         stats = summary['statistics']
         
         # Display statistics cards
@@ -195,9 +263,7 @@ if page == "🏠 Home":
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                import pandas as pd
-                df = pd.DataFrame(list(stats['categories'].items()), columns=['Category', 'Count'])
-                st.bar_chart(df.set_index('Category'))
+                st.bar_chart({'Count': stats['categories']})
             
             with col2:
                 for category, count in stats['categories'].items():
@@ -205,69 +271,120 @@ if page == "🏠 Home":
         
         st.markdown("---")
         
-        # Email list
+        # Daily digest (materialized when emails are processed)
+        digest = load_digest(st.session_state.agent, data_version)
+        if digest:
+            st.subheader("📅 Daily Digest")
+            st.markdown(st.session_state.agent.digest.format(digest))
+            st.markdown("---")
+        
+        # Email list: one page of header rows; details load only for the opened email
         st.subheader("📬 Inbox")
         
         # Filter options
-        filter_col1, filter_col2 = st.columns([1, 3])
+        filter_col1, filter_col2, filter_col3 = st.columns([1, 1, 2])
         with filter_col1:
             category_filter = st.selectbox(
                 "Filter by Category",
                 ["All"] + list(stats['categories'].keys())
             )
+        with filter_col2:
+            sort_option = st.selectbox("Sort by", ["Newest", "Urgency"])
+        with filter_col3:
+            page_size = st.select_slider("Emails per page", options=[10, 20, 50], value=20)
+        order_by = 'urgency' if sort_option == "Urgency" else 'timestamp'
         
-        # Get emails
-        if category_filter == "All":
-            emails = st.session_state.storage.get_all_emails(limit=50)
-        else:
-            emails = st.session_state.agent.email_service.get_emails_by_category(category_filter)
+        # Cursors of the pages visited so far; reset when the view changes
+        view = (category_filter, order_by, page_size)
+        if st.session_state.get('inbox_view') != view:
+            st.session_state.inbox_view = view
+            st.session_state.inbox_cursors = [None]
+        cursor = st.session_state.inbox_cursors[-1]
         
-        # Display emails
-        for email in emails:
-            formatted = st.session_state.agent.email_service.format_email_for_display(email)
+        page_data = load_inbox_page(
+            st.session_state.agent, data_version,
+            None if category_filter == "All" else category_filter, order_by, page_size, cursor
+        )
+        
+        category_colors = {
+            'Important': '🔴',
+            'To-Do': '🟡',
+            'Newsletter': '🔵',
+            'Spam': '⚫'
+        }
+        for header in page_data['items']:
+            is_open = st.session_state.get('open_email_id') == header['id']
+            row_col1, row_col2, row_col3 = st.columns([6, 2, 1])
+            with row_col1:
+                status = '✅' if header['processed'] else '📧'
+                subject = header['subject'] if header['is_read'] else f"**{header['subject']}**"
+                st.markdown(f"{status} {subject} — {header['sender_name'] or header['sender']}")
+            with row_col2:
+                category = header['category']
+                st.caption(f"{category_colors.get(category, '⚪')} {category}" if category else header['timestamp'][:10])
+            with row_col3:
+                if st.button("Close" if is_open else "Open", key=f"open_{header['id']}", use_container_width=True):
+                    if is_open:
+                        st.session_state.open_email_id = None
+                    else:
+                        st.session_state.open_email_id = header['id']
+                        if not header['is_read']:
+                            st.session_state.storage.mark_email_read(header['id'])
+                    st.rerun()
             
-            with st.expander(f"{'📧' if not email.processed else '✅'} **{formatted['subject']}** - From: {formatted['sender_name']}"):
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    st.markdown(f"**From:** {formatted['sender_name']} ({formatted['sender']})")
-                    st.markdown(f"**Subject:** {formatted['subject']}")
-                    st.markdown(f"**Date:** {formatted['timestamp']}")
-                    
-                    if formatted['category']:
-                        category_colors = {
-                            'Important': '🔴',
-                            'To-Do': '🟡',
-                            'Newsletter': '🔵',
-                            'Spam': '⚫'
-                        }
-                        st.markdown(f"**Category:** {category_colors.get(formatted['category'], '⚪')} {formatted['category']}")
-                    
-                    st.markdown("**Body:**")
-                    st.text_area("Email Body", formatted['body'], height=200, key=f"body_{email.id}", label_visibility="collapsed")
-                
-                with col2:
-                    if formatted['action_items']:
-                        st.markdown("**📋 Action Items:**")
-                        for item in formatted['action_items']:
-                            st.markdown(f"- {item['task']}")
-                            if item['deadline']:
-                                st.caption(f"⏰ Due: {item['deadline']}")
-                            st.caption(f"Priority: {item['priority']}")
+            if is_open:
+                formatted = load_email_detail(st.session_state.agent, data_version, header['id'])
+                with st.container(border=True):
+                    col1, col2 = st.columns([3, 1])
                     
-                    if formatted['drafts']:
-                        st.markdown("**📝 Drafts:**")
-                        st.info(f"{len(formatted['drafts'])} draft(s) available")
+                    with col1:
+                        st.markdown(f"**From:** {formatted['sender_name']} ({formatted['sender']})")
+                        st.markdown(f"**Subject:** {formatted['subject']}")
+                        st.markdown(f"**Date:** {formatted['timestamp']}")
+                        if formatted['urgency_score'] is not None:
+                            st.markdown(f"**Urgency:** {formatted['urgency_score']:.1f}/5")
+                        
+                        if formatted['category']:
+                            st.markdown(f"**Category:** {category_colors.get(formatted['category'], '⚪')} {formatted['category']}")
+                        
+                        st.markdown("**Body:**")
+                        st.text_area("Email Body", formatted['body'], height=200, key=f"body_{formatted['id']}", label_visibility="collapsed")
                     
-                    if not email.processed:
-                        if st.button("Process Email", key=f"process_{email.id}", use_container_width=True):
-                            with st.spinner("Processing..."):
-                                try:
-                                    st.session_state.agent.process_email(email.id)
-                                    st.success("✅ Processed!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error: {str(e)}")
+                    with col2:
+                        if formatted['action_items']:
+                            st.markdown("**📋 Action Items:**")
+                            for item in formatted['action_items']:
+                                st.markdown(f"- {item['task']}")
+                                if item['deadline']:
+                                    st.caption(f"⏰ Due: {item['deadline']}")
+                                st.caption(f"Priority: {item['priority']}")
+                        
+                        if formatted['drafts']:
+                            st.markdown("**📝 Drafts:**")
+                            st.info(f"{len(formatted['drafts'])} draft(s) available")
+                        
+                        if not formatted['processed']:
+                            if st.button("Process Email", key=f"process_{formatted['id']}", use_container_width=True):
+                                with st.spinner("Processing..."):
+                                    try:
+                                        st.session_state.agent.process_email(formatted['id'])
+                                        st.success("✅ Processed!")
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"Error: {str(e)}")
+        
+        # Page navigation
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+        with nav_col1:
+            if st.button("← Newer", disabled=len(st.session_state.inbox_cursors) == 1, use_container_width=True):
+                st.session_state.inbox_cursors.pop()
+                st.rerun()
+        with nav_col2:
+            st.caption(f"Page {len(st.session_state.inbox_cursors)}")
+        with nav_col3:
+            if st.button("Older →", disabled=page_data['next_cursor'] is None, use_container_width=True):
+                st.session_state.inbox_cursors.append(page_data['next_cursor'])
+                st.rerun()
     
     except Exception as e:
         st.info("👆 Click 'Load Mock Inbox' to get started!")
@@ -282,6 +399,11 @@ if page == "🏠 Home":
            - Manage email drafts
         """)
 
+    # Poll while a job is running; each rerun only reads the job's progress row
+    if job and job['active']:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 elif page == "⚙️ Prompt Configuration":
     from frontend.pages_backup import prompt_config
     prompt_config.show()
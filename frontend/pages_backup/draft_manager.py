@@ -12,10 +12,38 @@ def show():
     
     agent = st.session_state.agent
     
-    # Get all drafts
-    drafts = agent.storage.get_all_drafts()
+    # Filter options
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        filter_type = st.selectbox(
+            "Filter by Type",
+            ["All", "Reply", "New", "Forward"]
+        )
+    with col2:
+        filter_tone = st.selectbox("Filter by Tone", ["All", "Professional", "Friendly", "Concise", "Formal"])
+    with col3:
+        filter_status = st.selectbox("Filter by Status", ["All", "Pending", "Edited", "Approved"])
+    with col4:
+        page_size = st.selectbox("Drafts per page", [10, 25, 50])
+    
+    # Reset to the first page when the filters change
+    view = (filter_type, filter_tone, filter_status, page_size)
+    if st.session_state.get('draft_view') != view:
+        st.session_state.draft_view = view
+        st.session_state.draft_page = 1
+    
+    # One page of drafts with their source email headers, filtered and counted in SQL
+    page_data = agent.storage.get_drafts_page(
+        draft_type=None if filter_type == "All" else filter_type.lower(),
+        tone=None if filter_tone == "All" else filter_tone.lower(),
+        status=None if filter_status == "All" else filter_status.lower(),
+        page=st.session_state.draft_page,
+        page_size=page_size
+    )
+    drafts = page_data['items']
+    counts = page_data['counts']
     
-    if not drafts:
+    if not sum(counts['type'].values()):
         st.info("No drafts yet. Process some emails or use the Email Agent to generate drafts!")
         st.markdown("""
         ### How to Create Drafts
@@ -26,83 +54,63 @@ def show():
         """)
         return
     
-    st.subheader(f"📬 {len(drafts)} Draft(s) Found")
-    
-    # Filter options
-    col1, col2 = st.columns([1, 3])
-    with col1:
-        filter_type = st.selectbox(
-            "Filter by Type",
-            ["All", "Reply", "New", "Forward"]
-        )
+    st.subheader(f"📬 {page_data['total']} Draft(s) Found")
     
     # Display drafts
     for idx, draft in enumerate(drafts):
-        # Get related email if it exists
-        related_email = None
-        if draft.email_id:
-            related_email = agent.storage.get_email_by_id(draft.email_id)
+        has_email = draft['email_subject'] is not None
         
         # Draft card
-        with st.expander(f"📧 {draft.subject}", expanded=(idx == 0)):
+        with st.expander(f"📧 {draft['subject']}", expanded=(idx == 0)):
             # Draft metadata
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.caption(f"**Type:** {draft.draft_type or 'reply'}")
+                st.caption(f"**Type:** {draft['draft_type'] or 'reply'}")
             with col2:
-                st.caption(f"**Tone:** {draft.tone or 'professional'}")
+                st.caption(f"**Tone:** {draft['tone'] or 'professional'}")
             with col3:
-                st.caption(f"**Created:** {draft.created_at.strftime('%Y-%m-%d %H:%M')}")
+                st.caption(f"**Created:** {draft['created_at'].strftime('%Y-%m-%d %H:%M')}")
             
             # Related email context
-            if related_email:
+            if has_email:
                 with st.container():
                     st.markdown("**📩 In Reply To:**")
-                    st.caption(f"From: {related_email.sender_name or related_email.sender}")
-                    st.caption(f"Subject: {related_email.subject}")
+                    st.caption(f"From: {draft['email_sender_name'] or draft['email_sender']}")
+                    st.caption(f"Subject: {draft['email_subject']}")
                     
-                    with st.expander("View Original Email"):
-                        st.text_area("Original Email", related_email.body, height=150, key=f"original_{draft.id}", label_visibility="collapsed")
+                    # The original body is only loaded when asked for
+                    if st.checkbox("View Original Email", key=f"show_original_{draft['id']}"):
+                        related_email = agent.storage.get_email_by_id(draft['email_id'])
+                        st.text_area("Original Email", related_email.body, height=150, key=f"original_{draft['id']}", label_visibility="collapsed")
             
             st.markdown("---")
             
             # Edit mode toggle
-            edit_key = f"edit_mode_{draft.id}"
+            edit_key = f"edit_mode_{draft['id']}"
             if edit_key not in st.session_state:
                 st.session_state[edit_key] = False
             
-            col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+            col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 1, 1])
             
             with col1:
                 if st.button("✏️ Edit" if not st.session_state[edit_key] else "👁️ View", 
-                           key=f"toggle_edit_{draft.id}", use_container_width=True):
+                           key=f"toggle_edit_{draft['id']}", use_container_width=True):
                     st.session_state[edit_key] = not st.session_state[edit_key]
                     st.rerun()
             
             with col2:
-                if st.button("📋 Copy", key=f"copy_{draft.id}", use_container_width=True):
+                if st.button("📋 Copy", key=f"copy_{draft['id']}", use_container_width=True):
                     # In a real app, this would copy to clipboard
                     st.success("✅ Draft copied to clipboard!")
             
             with col3:
-                if st.button("🔄 Regenerate", key=f"regen_{draft.id}", use_container_width=True):
-                    if related_email:
+                if st.button("🔄 Regenerate", key=f"regen_{draft['id']}", use_container_width=True):
+                    if has_email:
                         with st.spinner("Regenerating draft..."):
                             try:
-                                reply_prompt = agent.prompt_service.get_prompt_template('auto_reply')
-                                new_draft = agent.llm.generate_reply_draft(
-                                    related_email.sender,
-                                    related_email.subject,
-                                    related_email.body,
-                                    reply_prompt
-                                )
-                                
-                                agent.storage.update_draft(
-                                    draft.id,
-                                    new_draft.get('subject'),
-                                    new_draft.get('body')
-                                )
+                                # Swaps in a pre-generated variant when one is ready
+                                agent.regenerate_draft(draft['id'])
                                 st.success("✅ Draft regenerated!")
                                 st.rerun()
                             except Exception as e:
@@ -111,8 +119,16 @@ def show():
                         st.warning("Cannot regenerate - no original email context")
             
             with col4:
-                if st.button("🗑️ Delete", key=f"delete_{draft.id}", use_container_width=True):
-                    agent.storage.delete_draft(draft.id)
+                approved = (draft['status'] == 'approved')
+                if st.button("✅ Approved" if approved else "✅ Approve", key=f"approve_{draft['id']}",
+                           use_container_width=True, disabled=approved):
+                    agent.storage.set_draft_status(draft['id'], 'approved')
+                    st.success("✅ Draft approved!")
+                    st.rerun()
+            
+            with col5:
+                if st.button("🗑️ Delete", key=f"delete_{draft['id']}", use_container_width=True):
+                    agent.storage.delete_draft(draft['id'])
                     st.success("✅ Draft deleted!")
                     st.rerun()
             
@@ -125,22 +141,22 @@ def show():
                 
                 new_subject = st.text_input(
                     "Subject",
-                    value=draft.subject,
-                    key=f"subject_{draft.id}"
+                    value=draft['subject'],
+                    key=f"subject_{draft['id']}"
                 )
                 
                 new_body = st.text_area(
                     "Body",
-                    value=draft.body,
+                    value=draft['body'],
                     height=400,
-                    key=f"body_{draft.id}"
+                    key=f"body_{draft['id']}"
                 )
                 
                 col1, col2 = st.columns([1, 3])
                 with col1:
-                    if st.button("💾 Save Changes", key=f"save_{draft.id}", type="primary"):
+                    if st.button("💾 Save Changes", key=f"save_{draft['id']}", type="primary"):
                         try:
-                            agent.storage.update_draft(draft.id, new_subject, new_body)
+                            agent.storage.update_draft(draft['id'], new_subject, new_body)
                             st.success("✅ Draft saved!")
                             st.session_state[edit_key] = False
                             st.rerun()
@@ -149,9 +165,9 @@ def show():
             else:
                 # View mode
                 st.markdown("### Draft Preview")
-                st.markdown(f"**Subject:** {draft.subject}")
+                st.markdown(f"**Subject:** {draft['subject']}")
                 st.markdown("**Body:**")
-                st.text_area("Draft Body", draft.body, height=400, key=f"view_{draft.id}", label_visibility="collapsed", disabled=True)
+                st.text_area("Draft Body", draft['body'], height=400, key=f"view_{draft['id']}", label_visibility="collapsed", disabled=True)
             
             st.markdown("---")
             
@@ -166,13 +182,27 @@ def show():
             
             with col2:
                 st.markdown("**💡 Suggestions**")
-                if draft.tone:
-                    st.caption(f"Tone: {draft.tone.title()}")
+                if draft['tone']:
+                    st.caption(f"Tone: {draft['tone'].title()}")
                 st.caption("Consider reviewing for:")
                 st.caption("• Spelling and grammar")
                 st.caption("• Appropriate tone")
                 st.caption("• Clear call-to-action")
     
+    # Page navigation
+    page_count = max(1, -(-page_data['total'] // page_size))
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+    with nav_col1:
+        if st.button("← Previous", disabled=st.session_state.draft_page <= 1, use_container_width=True):
+            st.session_state.draft_page -= 1
+            st.rerun()
+    with nav_col2:
+        st.caption(f"Page {st.session_state.draft_page} of {page_count}")
+    with nav_col3:
+        if st.button("Next →", disabled=st.session_state.draft_page >= page_count, use_container_width=True):
+            st.session_state.draft_page += 1
+            st.rerun()
+    
     # Bulk actions
     st.markdown("---")
     st.subheader("🔧 Bulk Actions")
@@ -184,7 +214,7 @@ def show():
             # Export drafts as JSON
             import json
             export_data = []
-            for draft in drafts:
+            for draft in agent.storage.get_all_drafts():
                 export_data.append({
                     'subject': draft.subject,
                     'body': draft.body,
@@ -203,8 +233,7 @@ def show():
     with col2:
         if st.button("🗑️ Delete All Drafts", use_container_width=True):
             if st.session_state.get('confirm_delete_all', False):
-                for draft in drafts:
-                    agent.storage.delete_draft(draft.id)
+                agent.storage.delete_all_drafts()
                 st.success("✅ All drafts deleted!")
                 st.session_state.confirm_delete_all = False
                 st.rerun()
@@ -225,21 +254,16 @@ def show():
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.metric("Total Drafts", len(drafts))
+                st.metric("Total Drafts", sum(counts['type'].values()))
             
             with col2:
-                reply_count = sum(1 for d in drafts if d.draft_type == 'reply')
-                st.metric("Reply Drafts", reply_count)
+                st.metric("Reply Drafts", counts['type'].get('reply', 0))
             
             with col3:
-                new_count = sum(1 for d in drafts if d.draft_type == 'new')
-                st.metric("New Drafts", new_count)
+                st.metric("New Drafts", counts['type'].get('new', 0))
             
             # Tone distribution
-            tones = {}
-            for draft in drafts:
-                tone = draft.tone or 'unknown'
-                tones[tone] = tones.get(tone, 0) + 1
+            tones = {tone or 'unknown': count for tone, count in counts['tone'].items()}
             
             st.markdown("**Tone Distribution:**")
             for tone, count in tones.items():
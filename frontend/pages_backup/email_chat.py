@@ -1,6 +1,7 @@
 """
 Email Agent Chat Page
 """
+import uuid
 import streamlit as st
 
 
@@ -15,6 +16,8 @@ def show():
     # Initialize chat history in session state
     if 'chat_messages' not in st.session_state:
         st.session_state.chat_messages = []
+    if 'chat_session_id' not in st.session_state:
+        st.session_state.chat_session_id = uuid.uuid4().hex
     
     # Quick action buttons
     st.subheader("Quick Actions")
@@ -80,7 +83,7 @@ def show():
         # Generate response
         with st.spinner("🤔 Thinking..."):
             try:
-                response = agent.chat_query(user_input)
+                response = agent.chat_query(user_input, session_id=st.session_state.chat_session_id)
                 
                 # Add assistant response to chat
                 st.session_state.chat_messages.append({
@@ -110,6 +113,7 @@ def show():
         
         if st.button("🗑️ Clear Chat History", use_container_width=True):
             st.session_state.chat_messages = []
+            st.session_state.chat_session_id = uuid.uuid4().hex
             agent.storage.clear_chat_history()
             st.rerun()
         
@@ -153,9 +153,64 @@ def show():
                                 
                             except Exception as e:
                                 st.error(f"Test failed: {str(e)}")
+                
+                # A/B evaluation against stored emails
+                with st.expander("🧪 A/B Evaluation"):
+                    st.markdown("Compare the saved template with the edited one on recently processed emails. "
+                                "Results are cached per template, so re-runs only call the LLM for new emails.")
+                    
+                    variant_b = st.text_area("Extra Variant (optional)", value="", height=150,
+                                             key=f"eval_variant_{prompt_type}")
+                    sample_size = st.slider("Emails", min_value=5, max_value=100, value=20, step=5,
+                                            key=f"eval_sample_{prompt_type}")
+                    
+                    if st.button("▶️ Run Evaluation", key=f"eval_{prompt_type}"):
+                        variants = {'Saved': prompt_data['template']}
+                        if new_template != prompt_data['template']:
+                            variants['Edited'] = new_template
+                        if variant_b.strip():
+                            variants['Extra'] = variant_b
+                        
+                        with st.spinner(f"Evaluating {len(variants)} variant(s)..."):
+                            try:
+                                results = agent.evaluation.evaluate(prompt_type, variants, sample_size=sample_size)
+                                rows = []
+                                for name, metrics in results.items():
+                                    agreement = metrics.get('agreement')
+                                    rows.append({
+                                        'Variant': name,
+                                        'Emails': metrics['emails'],
+                                        'Cached': metrics['cached'],
+                                        'p50 (ms)': round(metrics.get('latency_p50_ms', 0)),
+                                        'p90 (ms)': round(metrics.get('latency_p90_ms', 0)),
+                                        'p99 (ms)': round(metrics.get('latency_p99_ms', 0)),
+                                        'Input Tokens': round(metrics.get('avg_input_tokens', 0)),
+                                        'Output Tokens': round(metrics.get('avg_output_tokens', 0)),
+                                        'Parse Failures': f"{metrics.get('parse_failure_rate', 0):.0%}",
+                                        'Agreement': f"{agreement:.0%}" if agreement is not None else 'N/A',
+                                        'Call Errors': metrics.get('call_errors', 0)
+                                    })
+                                st.dataframe(rows, use_container_width=True, hide_index=True)
+                                st.caption("Agreement compares outputs with the current labels: category, "
+                                           "number of pending tasks, or urgency within one point. "
+                                           "Failed LLM calls are not cached and are retried on the next run.")
+                            except Exception as e:
+                                st.error(f"Evaluation failed: {str(e)}")
             else:
                 st.warning(f"Prompt type '{prompt_type}' not found in database")
     
+    # Prompt cache usage
+    st.markdown("---")
+    with st.expander("📈 LLM Usage & Prompt Cache"):
+        usage = agent.llm.get_usage_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("LLM Calls", usage['calls'])
+        col2.metric("Input Tokens", usage['input_tokens'])
+        col3.metric("Cached Tokens", usage['cached_tokens'])
+        col4.metric("Cached Ratio", f"{usage['cached_ratio']:.0%}")
+        st.caption("The instructions before a template's first placeholder are cached by the provider, "
+                   "so keep variable content ({sender}, {subject}, {body}) near the end of the prompt.")
+    
     # Help section
     st.markdown("---")
     with st.expander("ℹ️ How to Use Prompts"):
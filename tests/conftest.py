@@ -0,0 +1,59 @@
+"""
+Shared fixtures for the Email Productivity Agent tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from backend.services.llm_service import LLMService
+
+
+class FakeLLM(LLMService):
+    """Offline LLM stand-in that answers from the prompt type and records every call."""
+    
+    def __init__(self, category: str = 'To-Do'):
+        self.provider = 'fake'
+        self.client = None
+        self.model = 'fake'
+        self.category = category
+        self.calls = []
+    
+    def generate_completion(self, prompt: str, temperature: float = 0.7,
+                            max_tokens: int = 1000, cache_prefix: str = None) -> str:
+        self.calls.append(prompt)
+        if 'categorize it into ONE' in prompt:
+            return self.category
+        if 'Extract all action items' in prompt:
+            return '{"tasks": [{"task": "Reply to sender", "deadline": null, "priority": "high"}]}'
+        if 'Generate a professional reply' in prompt:
+            return '{"subject": "Re: Follow up", "body": "Thanks, on it.", "tone": "professional"}'
+        return "OK"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage service backed by a temporary database."""
+    from backend.services.storage_service import StorageService
+    return StorageService(db_path=str(tmp_path / 'email_agent.db'))
+
+
+@pytest.fixture
+def fake_llm():
+    """Fake LLM service."""
+    return FakeLLM()
+
+
+@pytest.fixture
+def agent(storage, fake_llm, monkeypatch):
+    """Agent service wired to the temporary database and fake LLM."""
+    from backend.services import draft_worker
+    from backend.services.agent_service import AgentService
+    monkeypatch.chdir(backend_path)
+    # Background draft variants would add LLM calls at unpredictable times; tests enable them explicitly
+    monkeypatch.setattr(draft_worker, 'DRAFT_VARIANTS_ENABLED', False)
+    return AgentService(storage_service=storage, llm_service=fake_llm)
@@ -0,0 +1,83 @@
+"""
+Tests for the chat answer cache
+"""
+from backend.services.email_service import EmailService
+
+
+def _chat_calls(agent):
+    return sum('User Query:' in prompt for prompt in agent.llm.calls)
+
+
+def test_repeated_and_reworded_questions_hit_cache(agent, storage):
+    """Identical and near-identical questions reuse the stored answer."""
+    EmailService(storage).load_mock_inbox()
+    
+    first = agent.chat_query("Summarize urgent emails")
+    assert agent.chat_query("Summarize urgent emails") == first
+    assert agent.chat_query("Please summarize all the urgent emails!") == first
+    assert _chat_calls(agent) == 1
+    
+    agent.chat_query("Summarize newsletter emails")
+    assert _chat_calls(agent) == 2
+
+
+def test_questions_differing_in_one_word_do_not_share_answers(agent, storage):
+    """Near-identical wording that asks for different data never reuses the other question's answer."""
+    EmailService(storage).load_mock_inbox()
+    cache = agent.answer_cache
+    pairs = [
+        ("Did the client approve the budget?", "Did the client reject the budget?"),
+        ("Which tasks are due Monday?", "Which tasks are due Friday?"),
+        ("What emails arrived last week?", "What emails arrived this week?"),
+    ]
+    for first, second in pairs:
+        cache.put(first, f"answer to {first}", cache.fingerprint())
+        assert cache.get(second) is None
+        assert cache.get(first) == f"answer to {first}"
+    
+    assert cache.get("did THE client approve budget") == "answer to Did the client approve the budget?"
+
+
+def test_reordered_questions_do_not_share_answers(agent, storage):
+    """Questions using the same words in another order or direction are cache misses."""
+    cache = agent.answer_cache
+    pairs = [
+        ("Did Alice forward the contract to Bob?", "Did Bob forward the contract to Alice?"),
+        ("Is the budget meeting before the review?", "Is the review meeting before the budget?"),
+        ("What did I promise to send Priya", "What did Priya promise to send me"),
+    ]
+    for first, second in pairs:
+        cache.put(first, f"answer to {first}", cache.fingerprint())
+        assert cache.get(second) is None
+        assert cache.get(first) == f"answer to {first}"
+
+
+def test_data_changes_invalidate_cache(agent, storage):
+    """Writes to emails, categories or actions, including bulk deletes, retire cached answers."""
+    EmailService(storage).load_mock_inbox()
+    agent.chat_query("Meeting requests")
+    
+    fingerprint = storage.get_data_fingerprint()
+    storage.add_category('email_001', 'Important')
+    assert storage.get_data_fingerprint() != fingerprint
+    agent.chat_query("Meeting requests")
+    assert _chat_calls(agent) == 2
+    
+    agent.chat_query("Meeting requests")
+    assert _chat_calls(agent) == 2
+    
+    storage.clear_all_emails()
+    agent.chat_query("Meeting requests")
+    assert _chat_calls(agent) == 3
+
+
+def test_change_token_tracks_writes_only(storage):
+    """The UI cache key ignores reads and moves on every committed write."""
+    EmailService(storage).load_mock_inbox()
+    token = storage.get_change_token()
+    storage.get_all_emails()
+    storage.get_data_fingerprint()
+    assert storage.get_change_token() == token
+    
+    storage.add_category('email_001', 'Important')
+    assert storage.get_change_token() != token
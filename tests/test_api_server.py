@@ -0,0 +1,111 @@
+"""
+Tests for the HTTP API server
+"""
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backend.api_server import create_server
+
+
+@pytest.fixture
+def serve(agent):
+    """Start an API server on a free port and return a request helper."""
+    servers = []
+    
+    def serve(**options):
+        server = create_server(agent, host='127.0.0.1', port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        
+        def request(method, path, body=None):
+            data = json.dumps(body).encode() if body is not None else None
+            req = urllib.request.Request(base + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(req, timeout=10) as response:
+                    return response.status, response.read().decode()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read().decode()
+        return server, request
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.api.close()
+
+
+def test_process_search_and_drafts(agent, serve):
+    """One shared agent serves processing, structured search and the drafts list."""
+    agent.load_mock_inbox()
+    _, request = serve()
+    email_id = agent.storage.get_all_emails()[0].id
+    
+    status, body = request('POST', '/process', {'email_id': email_id})
+    assert status == 200 and json.loads(body)['category'] == 'To-Do'
+    
+    status, body = request('GET', '/search?category=To-Do')
+    results = json.loads(body)['results']
+    assert status == 200 and [result['id'] for result in results] == [email_id]
+    
+    status, body = request('GET', '/drafts?status=pending')
+    assert status == 200 and json.loads(body)['items'][0]['email_id'] == email_id
+    
+    assert request('GET', '/nowhere')[0] == 404
+    assert request('POST', '/stats', {})[0] == 405
+    assert request('POST', '/chat', {})[0] == 400
+
+
+def test_chat_streams_chunks(agent, fake_llm, serve):
+    """With stream=true the answer arrives as NDJSON deltas followed by the full response."""
+    def stream_completion(prompt, on_chunk, temperature=0.7, max_tokens=1000):
+        for chunk in ('Two ', 'emails ', 'need replies.'):
+            on_chunk(chunk)
+        return 'Two emails need replies.'
+    fake_llm.stream_completion = stream_completion
+    _, request = serve()
+    
+    status, body = request('POST', '/chat', {'query': 'What should I answer first?', 'stream': True})
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert status == 200
+    assert [line['delta'] for line in lines[:-1]] == ['Two ', 'emails ', 'need replies.']
+    assert lines[-1] == {'response': 'Two emails need replies.', 'done': True}
+
+
+def test_overload_and_timeout(agent, serve, monkeypatch):
+    """Requests beyond the pool and queue get 503; slow requests get 504."""
+    server, request = serve(workers=1, queue_size=0, timeout=0.2)
+    release = threading.Event()
+    blocker = server.api.submit(lambda: release.wait(5))
+    try:
+        status, _ = request('GET', '/health')
+        assert status == 503
+    finally:
+        release.set()
+    blocker.result()
+    time.sleep(0.1)
+    
+    monkeypatch.setattr(agent, 'get_inbox_summary', lambda: threading.Event().wait(1))
+    status, body = request('GET', '/stats')
+    assert status == 504 and 'timed out' in json.loads(body)['error']
+
+
+def test_errors_keep_the_connection_usable(serve):
+    """Requests failing before their body is used don't corrupt the next request on a keep-alive connection."""
+    server, _ = serve()
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    for method, path, expected in [('POST', '/nope', 404), ('POST', '/stats', 405), ('GET', '/health', 200),
+                                   ('GET', '/search?limit=ten', 400), ('GET', '/drafts?page=0', 400),
+                                   ('GET', '/health', 200)]:
+        conn.request(method, path, body=json.dumps({'query': 'x'}) if method == 'POST' else None,
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        assert response.status == expected, path
+        assert 'error' in json.loads(response.read()) or expected == 200
+    conn.close()
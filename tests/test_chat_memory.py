@@ -0,0 +1,37 @@
+"""
+Tests for multi-turn chat memory
+"""
+from backend.services.chat_memory_service import CHAT_MEMORY_RECENT_TURNS, CHAT_MEMORY_FOLD_TURNS
+
+
+def _chat_prompts(agent):
+    return [prompt for prompt in agent.llm.calls if 'User Query:' in prompt]
+
+
+def test_follow_ups_see_earlier_turns(agent):
+    """The previous exchange is included in the next prompt of the same session only."""
+    agent.chat_query("Tell me about the budget review email", session_id='s1')
+    agent.chat_query("Who sent it?", session_id='s1')
+    assert "User: Tell me about the budget review email" in _chat_prompts(agent)[-1]
+    
+    agent.chat_query("Who sent it?", session_id='s2')
+    assert "Recent messages" not in _chat_prompts(agent)[-1]
+
+
+def test_prompt_size_stays_bounded(agent, storage):
+    """Older turns are folded into a stored summary, keeping prompts flat."""
+    turns = 30
+    for i in range(turns):
+        agent.chat_query(f"Question number {i} about the quarterly planning thread", session_id='long')
+    
+    summary_calls = [prompt for prompt in agent.llm.calls if 'Update the summary' in prompt]
+    assert 0 < len(summary_calls) <= turns // CHAT_MEMORY_FOLD_TURNS
+    
+    prompts = _chat_prompts(agent)
+    assert "Earlier in this conversation" in prompts[-1]
+    assert "Question number 0 " not in prompts[-1]
+    window = CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_FOLD_TURNS
+    assert max(len(p) for p in prompts[window:]) < 1.5 * min(len(p) for p in prompts[window:])
+    
+    memory = agent.chat_memory.load('long')
+    assert memory['summary'] and len(memory['turns']) < window
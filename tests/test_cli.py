@@ -0,0 +1,87 @@
+"""
+Tests for the batch processing CLI
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from backend import cli
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """Run the CLI against a temporary database with the offline LLM provider."""
+    monkeypatch.chdir(Path(__file__).parent.parent)
+    monkeypatch.setenv('LLM_PROVIDER', 'fake')
+    db = str(tmp_path / 'cli.db')
+    
+    def run(*args):
+        output = tmp_path / 'out.jsonl'
+        code = cli.main([*args, '--db', db, '--quiet', '--output', str(output)])
+        return code, [json.loads(line) for line in output.read_text().splitlines()]
+    return run
+
+
+def test_process_streams_one_line_per_thread(run):
+    """Concurrent processing handles every email once and ends with a summary line."""
+    code, lines = run('ingest')
+    assert code == 0 and lines[0]['inserted'] == 18
+    
+    code, lines = run('process', '--concurrency', '4')
+    results, summary = lines[:-1], lines[-1]
+    assert code == 0 and summary['event'] == 'summary'
+    assert summary['processed'] == 18 and summary['failed'] == 0
+    email_ids = [email_id for result in results for email_id in result['email_ids']]
+    assert sorted(email_ids) == sorted(set(email_ids)) and len(email_ids) == 18
+    assert all(result['status'] == 'ok' and result['category'] for result in results)
+    
+    code, lines = run('stats')
+    assert lines[0]['processed_emails'] == 18 and lines[0]['unprocessed_emails'] == 0
+
+
+def test_shards_partition_the_backlog(run):
+    """Dry runs of every shard list disjoint units that together cover the backlog."""
+    run('ingest')
+    _, everything = run('process', '--dry-run')
+    units = []
+    for index in range(3):
+        _, lines = run('process', '--dry-run', '--shard', f'{index}/3')
+        units += [line['unit'] for line in lines[:-1]]
+    assert sorted(units) == sorted(line['unit'] for line in everything[:-1])
+    
+    _, lines = run('stats')
+    assert lines[0]['processed_emails'] == 0
+
+
+def test_stats_show_progress_per_shard(run):
+    """Each shard's backlog and latest run are reported; together the shards cover the inbox."""
+    run('ingest')
+    code, lines = run('process', '--shard', '1/2')
+    assert code == 0 and lines[-1]['shard'] == '1/2'
+    
+    _, lines = run('stats', '--shards', '2')
+    idle, done = lines[0]['shards']
+    assert idle['total'] + done['total'] == 18
+    assert done['remaining'] == 0 and done['processed'] == lines[0]['processed_emails']
+    assert done['last_run']['status'] == 'completed' and done['last_run']['done'] == done['total']
+    assert idle['processed'] == 0 and idle['last_run'] is None
+
+
+def test_reprocess_and_export(run):
+    """Reprocessing re-runs one step on processed emails; export lists them with their results."""
+    run('ingest')
+    run('process', '--limit', '5')
+    
+    code, lines = run('reprocess', '--prompt-type', 'summary', '--concurrency', '2')
+    assert code == 0 and lines[-1] == {'event': 'summary', 'total': 5, 'failed': 0}
+    assert all(line['summary'] for line in lines[:-1])
+    
+    _, lines = run('export', '--limit', '3')
+    assert len(lines) == 3 and {'category', 'summary', 'pending_tasks'} <= set(lines[0])
+
+
+def test_invalid_shard_is_rejected(run):
+    """Shard indexes are 0-based and must be below the shard count."""
+    with pytest.raises(SystemExit):
+        run('process', '--shard', '3/3')
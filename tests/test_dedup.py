@@ -0,0 +1,55 @@
+"""
+Tests for near-duplicate detection and result inheritance
+"""
+from backend.utils.similarity import simhash, simhash_similarity
+
+ALERT_BODY = (
+    "Your support ticket #{ticket} has been resolved by our team. "
+    "If the issue persists, reply to this email within 7 days to reopen the ticket. "
+    "Thank you for choosing Cloud Service. This is an automated notification."
+)
+
+
+def _alert(email_id, ticket):
+    return {
+        'id': email_id,
+        'sender': 'support@cloudservice.com',
+        'subject': f'Your Support Ticket #{ticket} Has Been Resolved',
+        'body': ALERT_BODY.format(ticket=ticket),
+        'timestamp': '2025-11-19T09:30:00Z'
+    }
+
+
+def test_simhash_similarity():
+    """Template emails differing only in numbers share a signature; unrelated text does not."""
+    first = simhash(ALERT_BODY.format(ticket=78234))
+    second = simhash(ALERT_BODY.format(ticket=91822))
+    other = simhash("Can we schedule a quick sync tomorrow at 2 PM to discuss the Q4 deadline?")
+    
+    assert simhash_similarity(first, second) == 1.0
+    assert simhash_similarity(first, other) < 0.9
+
+
+def test_near_duplicate_inherits_category(agent, storage, fake_llm):
+    """A near-duplicate of a processed email skips the LLM and records provenance."""
+    fake_llm.category = 'Newsletter'
+    storage.add_email(_alert('a1', 78234))
+    agent.process_email('a1')
+    llm_calls = len(fake_llm.calls)
+    
+    storage.add_email(_alert('a2', 91822))
+    result = agent.process_email('a2')
+    
+    assert result['category'] == 'Newsletter'
+    assert result['inherited_from'] == 'a1'
+    # Only action extraction went to the LLM
+    assert len(fake_llm.calls) == llm_calls + 1
+    
+    category = storage.get_category_by_email('a2')
+    assert category.source == 'near_duplicate'
+    assert category.source_email_id == 'a1'
+    assert [item['email_id'] for item in agent.dedup_service.get_inherited_emails()] == ['a2']
+    
+    assert agent.dedup_service.revert('a2')
+    assert storage.get_category_by_email('a2') is None
+    assert not storage.get_email_by_id('a2').processed
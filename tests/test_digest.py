@@ -0,0 +1,56 @@
+"""
+Tests for the materialized daily digest
+"""
+from backend.services.email_service import EmailService
+
+
+def test_digest_is_materialized_on_processing(agent, storage, fake_llm):
+    """Processing writes the digest for the current data version."""
+    fake_llm.category = 'Important'
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    
+    digest = agent.digest.get()
+    assert digest['email_count'] > 0
+    assert digest['important'] and digest['tasks'] and digest['drafts']
+    assert storage.get_digest(digest['day']).fingerprint == storage.get_data_fingerprint(
+        ['actions', 'categories', 'drafts', 'emails']
+    )
+
+
+def test_digest_question_skips_llm(agent, storage, fake_llm):
+    """'What happened today?' is answered from the digest without an LLM call."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    calls = len(fake_llm.calls)
+    
+    answer = agent.chat_query("What happened today?")
+    assert "Digest for" in answer
+    assert len(fake_llm.calls) == calls
+
+
+def test_topic_questions_are_not_digest_questions(agent, storage, fake_llm):
+    """'What happened with X?' asks about X, so it is answered from retrieval, not the day digest."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    
+    for query in ("What happened with the server outage ticket?", "what's new in the roadmap email"):
+        calls = len(fake_llm.calls)
+        answer = agent.chat_query(query)
+        assert "Digest for" not in answer
+        assert len(fake_llm.calls) == calls + 1
+        assert 'Relevant emails:' in fake_llm.calls[-1]
+    
+    assert "Digest for" in agent.chat_query("What's new?")
+    assert "Digest for" in agent.chat_query("Show me my daily digest")
+
+
+def test_approving_a_draft_updates_digest(agent, storage):
+    """Approved drafts drop out of the 'awaiting review' list."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    digest = agent.digest.get()
+    draft_id = digest['drafts'][0]['id']
+    
+    storage.set_draft_status(draft_id, 'approved')
+    assert draft_id not in [draft['id'] for draft in agent.digest.get()['drafts']]
@@ -0,0 +1,52 @@
+"""
+Tests for reusing reviewed drafts on similar emails
+"""
+
+
+def _meeting(email_id, sender_name, day, when):
+    return {
+        'id': email_id,
+        'sender': f'{sender_name.lower()}@example.com',
+        'sender_name': sender_name,
+        'subject': 'Meeting request: project sync',
+        'body': f"Hi, could we schedule a 30 minute project sync {when}? Let me know what time works for you.",
+        'timestamp': f'2025-11-{day}T09:00:00Z'
+    }
+
+
+def _approve_first_reply(agent, storage, email_id):
+    agent.process_email(email_id)
+    draft = storage.get_drafts_by_email(email_id)[0]
+    storage.update_draft(draft.id, body="Hi Alice, Thursday at 2pm works for me. I'll send an invite.")
+    return draft
+
+
+def test_similar_email_gets_few_shot_examples(agent, storage, fake_llm):
+    """Reviewed replies to similar emails are added to the reply prompt."""
+    storage.add_email(_meeting('m1', 'Alice', '10', 'this week'))
+    _approve_first_reply(agent, storage, 'm1')
+    storage.add_email({
+        'id': 'm2', 'sender': 'bob@example.com', 'sender_name': 'Bob',
+        'subject': 'Project sync meeting', 'timestamp': '2025-11-12T09:00:00Z',
+        'body': "Can we schedule a project sync meeting next week? What time works for you?"
+    })
+    
+    agent.process_email('m2')
+    prompt = [call for call in fake_llm.calls if 'Generate a professional reply' in call][-1]
+    assert "Replies the user approved" in prompt and "Thursday at 2pm" in prompt
+    
+    unrelated = [call for call in fake_llm.calls if 'Generate a professional reply' in call][0]
+    assert "Replies the user approved" not in unrelated
+
+
+def test_near_identical_email_reuses_template(agent, storage, fake_llm):
+    """A near-identical request gets the reviewed reply directly, addressed to the new sender."""
+    storage.add_email(_meeting('m1', 'Alice', '10', 'this week'))
+    _approve_first_reply(agent, storage, 'm1')
+    storage.add_email(_meeting('m3', 'Alice', '17', 'this week'))
+    
+    calls = len([call for call in fake_llm.calls if 'Generate a professional reply' in call])
+    result = agent.process_email('m3')
+    assert result['draft']['source'] == 'template'
+    assert "Thursday at 2pm" in result['draft']['body']
+    assert len([call for call in fake_llm.calls if 'Generate a professional reply' in call]) == calls
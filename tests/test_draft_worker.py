@@ -0,0 +1,41 @@
+"""
+Tests for background draft variant generation
+"""
+from backend.services import draft_worker
+from backend.services.email_service import EmailService
+
+
+def test_variants_are_pregenerated_and_swapped(agent, storage, fake_llm, monkeypatch):
+    """Drafts get hidden tone variants in the background; Regenerate swaps them in without an LLM call."""
+    monkeypatch.setattr(draft_worker, 'DRAFT_VARIANTS_ENABLED', True)
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    assert agent.draft_worker.wait(timeout=10)
+    
+    draft = storage.get_all_drafts()[0]
+    variants = storage.get_draft_variants(draft.email_id)
+    assert {variant.tone for variant in variants} == set(draft_worker.DRAFT_VARIANT_TONES)
+    assert all(variant.id not in [d.id for d in storage.get_all_drafts()] for variant in variants)
+    
+    calls = len(fake_llm.calls)
+    tones = [agent.regenerate_draft(draft.id).tone for _ in range(len(variants) + 1)]
+    assert len(fake_llm.calls) == calls
+    assert tones == [variant.tone for variant in variants] + [draft.tone]
+    assert agent.draft_worker.pending_count() == 0
+
+
+def test_reprocessing_replaces_the_pending_draft(agent, storage):
+    """Regenerating replies after a prompt change keeps one pending draft per email, and reviewed drafts."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    draft = storage.get_all_drafts()[0]
+    
+    for _ in range(2):
+        assert not agent.reprocess_email(draft.email_id, 'auto_reply')['errors']
+    drafts = storage.get_drafts_by_email(draft.email_id)
+    assert len(drafts) == 1
+    
+    storage.set_draft_status(drafts[0].id, 'approved')
+    agent.reprocess_email(draft.email_id, 'auto_reply')
+    statuses = sorted(d.status for d in storage.get_drafts_by_email(draft.email_id))
+    assert statuses == ['approved', 'pending']
@@ -0,0 +1,40 @@
+"""
+Tests for the paginated draft listing
+"""
+from backend.services.storage_service import DRAFT_VARIANT
+
+
+def _seed(storage):
+    storage.add_email({'id': 'e1', 'sender': 'alice@example.com', 'sender_name': 'Alice',
+                       'subject': 'Budget', 'body': 'Numbers attached', 'timestamp': '2025-11-10T09:00:00Z'})
+    for i in range(7):
+        storage.add_draft('e1', f'Re: Budget {i}', 'Thanks', 'friendly' if i % 2 else 'professional')
+    storage.add_draft(None, 'Team update', 'Hello all', 'professional', draft_type='new')
+    storage.add_draft('e1', 'Re: Budget (variant)', 'Hi', 'concise', draft_type=DRAFT_VARIANT)
+
+
+def test_page_joins_email_headers(storage):
+    """Rows carry the source email's headers; drafts without an email still appear."""
+    _seed(storage)
+    page = storage.get_drafts_page(page_size=3)
+    assert page['total'] == 8 and len(page['items']) == 3
+    assert page['items'][0]['subject'] == 'Team update' and page['items'][0]['email_subject'] is None
+    assert page['items'][1]['email_sender_name'] == 'Alice'
+    
+    last = storage.get_drafts_page(page=3, page_size=3)
+    assert len(last['items']) == 2
+
+
+def test_filters_and_counts_run_in_sql(storage):
+    """Type, tone and status filters apply before paging; counts cover all shown drafts."""
+    _seed(storage)
+    page = storage.get_drafts_page(draft_type='reply', tone='friendly')
+    assert page['total'] == 3 and all(item['tone'] == 'friendly' for item in page['items'])
+    
+    storage.set_draft_status(page['items'][0]['id'], 'approved')
+    assert storage.get_drafts_page(status='approved')['total'] == 1
+    
+    counts = storage.get_drafts_page()['counts']
+    assert counts['type'] == {'reply': 7, 'new': 1}
+    assert counts['tone'] == {'friendly': 3, 'professional': 5}
+    assert counts['status'] == {'pending': 7, 'approved': 1}
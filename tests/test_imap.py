@@ -0,0 +1,85 @@
+"""
+Tests for the IMAP connector against the bundled fake server
+"""
+import pytest
+
+from backend.services.fake_imap_server import FakeIMAPServer, build_message
+from backend.services.imap_service import IMAPConnector
+
+
+@pytest.fixture
+def fake_server():
+    with FakeIMAPServer() as server:
+        yield server
+
+
+def _connector(storage, server, batch_size=2, shard=None):
+    host, port = server.address
+    return IMAPConnector(storage, host=host, port=port, username='user', password='password',
+                         use_ssl=False, batch_size=batch_size, shard=shard)
+
+
+def test_incremental_sync(storage, fake_server):
+    """Messages are fetched in batches, then only new UIDs on the next sync."""
+    for index in range(5):
+        fake_server.add_message(build_message(index), flags=('\\Seen',) if index == 0 else ())
+    connector = _connector(storage, fake_server)
+    
+    assert connector.sync() == 5
+    assert fake_server.fetch_count == 3
+    
+    fake_server.add_message(build_message(5, subject='Re: Message 0', in_reply_to='<msg0@example.com>'))
+    assert connector.sync() == 1
+    assert connector.sync() == 0
+    connector.close()
+    
+    emails = storage.get_all_emails()
+    assert len(emails) == 6
+    by_message_id = {email.message_id: email for email in emails}
+    assert by_message_id['<msg0@example.com>'].is_read
+    assert by_message_id['<msg5@example.com>'].thread_id == by_message_id['<msg0@example.com>'].thread_id
+
+
+def test_uidvalidity_change_does_not_duplicate(storage, fake_server):
+    """A UIDVALIDITY reset triggers a full resync that skips stored messages."""
+    fake_server.add_message(build_message(1))
+    connector = _connector(storage, fake_server)
+    assert connector.sync() == 1
+    connector.close()
+    
+    fake_server.reset_uidvalidity(2)
+    assert connector.sync() == 0
+    assert storage.get_imap_state(connector.account, 'INBOX').uidvalidity == 2
+    connector.close()
+
+
+def test_sharded_sync_splits_the_mailbox(storage, fake_server):
+    """Shards import disjoint messages that together cover the mailbox, each tracking its own position."""
+    for index in range(8):
+        fake_server.add_message(build_message(index))
+    connectors = [_connector(storage, fake_server, shard=(index, 3)) for index in range(3)]
+    
+    counts = [connector.sync() for connector in connectors]
+    assert sum(counts) == 8 and all(count < 8 for count in counts)
+    
+    fake_server.add_message(build_message(8))
+    assert sum(connector.sync() for connector in connectors) == 1
+    assert len(storage.get_all_emails()) == 9
+    for connector in connectors:
+        assert storage.get_imap_state(connector.account, connector.state_mailbox).last_uid == 9
+        connector.close()
+
+
+def test_idle_reports_new_mail(storage, fake_server):
+    """IDLE returns as soon as the server announces a new message."""
+    import threading
+    
+    connector = _connector(storage, fake_server)
+    connector.sync()
+    assert connector.idle(timeout=0.2) is False
+    
+    timer = threading.Timer(0.1, fake_server.add_message, args=(build_message(9),))
+    timer.start()
+    assert connector.idle(timeout=5) is True
+    assert connector.sync() == 1
+    connector.close()
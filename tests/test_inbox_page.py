@@ -0,0 +1,37 @@
+"""
+Tests for the keyset-paginated inbox list
+"""
+from backend.services.email_service import EmailService
+
+
+def _walk(storage, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = storage.get_email_headers_page(page_size=5, cursor=cursor, **filters)
+        ids += [item['id'] for item in page['items']]
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+def test_pages_cover_the_inbox_in_order(storage):
+    """Walking the cursors returns every email once, in the same order as the full list."""
+    EmailService(storage).load_mock_inbox()
+    for order_by in ('timestamp', 'urgency'):
+        ids, pages = _walk(storage, order_by=order_by)
+        assert ids == [email.id for email in storage.get_all_emails(order_by=order_by)]
+        assert pages == -(-len(ids) // 5)
+
+
+def test_page_rows_are_headers_only(storage):
+    """Rows carry list fields and category, not bodies; filters apply before paging."""
+    EmailService(storage).load_mock_inbox()
+    storage.add_category('email_001', 'Important')
+    storage.mark_email_read('email_001')
+    
+    page = storage.get_email_headers_page(page_size=5, category='Important')
+    assert [item['id'] for item in page['items']] == ['email_001']
+    assert page['next_cursor'] is None
+    item = page['items'][0]
+    assert item['category'] == 'Important' and item['is_read'] and 'body' not in item
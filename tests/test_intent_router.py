@@ -0,0 +1,65 @@
+"""
+Tests for SQL-answered chat intents
+"""
+from datetime import datetime
+
+from backend.services.intent_router import IntentRouter
+from backend.utils.helpers import parse_deadline
+
+NOW = datetime(2025, 11, 19, 12, 0)  # Wednesday
+
+
+def _seed(storage):
+    for i, (category, is_read) in enumerate([('To-Do', False), ('To-Do', False), ('To-Do', True), ('Spam', False)]):
+        storage.add_email({'id': f'e{i}', 'sender': f'alice{i}@example.com', 'subject': f'Subject {i}',
+                           'body': 'Body', 'timestamp': '2025-11-18T09:00:00Z', 'is_read': is_read})
+        storage.add_category(f'e{i}', category)
+    storage.add_action_item('e0', 'Send report', 'Friday', 'high')
+    storage.add_action_item('e1', 'Book room', '2025-12-15', 'high')
+    storage.add_action_item('e2', 'Reply to Bob', 'tomorrow', 'low')
+
+
+def test_parse_deadline_relative_to_email():
+    """Relative deadlines resolve against the email's timestamp."""
+    reference = datetime(2025, 11, 18, 9, 0)  # Tuesday
+    assert parse_deadline('Friday', reference) == datetime(2025, 11, 21)
+    assert parse_deadline('tomorrow', reference) == datetime(2025, 11, 19)
+    assert parse_deadline('end of week', reference) == datetime(2025, 11, 21)
+    assert parse_deadline('Dec 1st', reference) == datetime(2025, 12, 1)
+    assert parse_deadline('null', reference) is None
+    assert parse_deadline('2 weeks', reference) == datetime(2025, 12, 2)
+    assert parse_deadline('by Dec 1', reference) == datetime(2025, 12, 1)
+    assert parse_deadline('Jan 10', reference) == datetime(2026, 1, 10)
+    assert parse_deadline('2025-11-20', reference) == datetime(2025, 11, 20)
+
+
+def test_parse_deadline_does_not_invent_dates():
+    """Stray numbers and bare months give no due date instead of a guessed one."""
+    reference = datetime(2025, 11, 18, 9, 0)
+    for text in ('Q4', 'by 5', 'March', 'soon', 'next sprint'):
+        assert parse_deadline(text, reference) is None, text
+
+
+def test_count_and_list_intents(storage):
+    """Structured questions are answered from the database."""
+    _seed(storage)
+    router = IntentRouter(storage)
+    
+    assert router.answer("How many unread To-Do emails do I have?", NOW) == "You have 2 unread To-Do emails."
+    
+    answer = router.answer("List my high-priority tasks due this week", NOW)
+    assert answer.startswith("You have 1 pending high-priority task due this week:")
+    assert "Send report" in answer and "Book room" not in answer
+    
+    assert router.answer("how many tasks are overdue", NOW) == "You have 0 pending tasks overdue."
+
+
+def test_open_ended_questions_fall_through(agent, storage):
+    """Questions the router cannot answer still reach the LLM."""
+    _seed(storage)
+    assert agent.intent_router.parse("Why is the budget email important?") is None
+    assert agent.intent_router.parse("What should I focus on today?") is None
+    
+    calls = len(agent.llm.calls)
+    assert agent.chat_query("how many spam emails") == "You have 1 Spam email."
+    assert len(agent.llm.calls) == calls
@@ -0,0 +1,55 @@
+"""
+Tests for background jobs
+"""
+import threading
+
+from backend.services import job_service
+from backend.services.email_service import EmailService
+
+
+def test_process_all_job_reports_progress(agent, storage):
+    """The job runs in the background and records progress and the processing summary."""
+    EmailService(storage).load_mock_inbox()
+    job_id = agent.jobs.submit('process_all')
+    
+    status = agent.jobs.wait(job_id)
+    assert status['status'] == 'completed'
+    assert status['done'] == status['total'] == 18 and status['progress'] == 1.0
+    assert status['result']['successful'] == 18
+    assert not EmailService(storage).get_unprocessed_emails()
+
+
+def test_cancel_and_resume(agent, storage, fake_llm):
+    """A cancelled job stops between threads and resumes where it left off."""
+    EmailService(storage).load_mock_inbox()
+    release = threading.Event()
+    generate = fake_llm.generate_completion
+    
+    def slow_generate(prompt, *args, **kwargs):
+        release.wait(5)
+        return generate(prompt, *args, **kwargs)
+    
+    fake_llm.generate_completion = slow_generate
+    job_id = agent.jobs.submit('process_all')
+    assert agent.jobs.submit('process_all') == job_id
+    assert agent.jobs.cancel(job_id)
+    release.set()
+    
+    status = agent.jobs.wait(job_id)
+    assert status['status'] == 'cancelled' and status['resumable']
+    assert status['done'] < 18 and EmailService(storage).get_unprocessed_emails()
+    
+    assert agent.jobs.resume(job_id)
+    status = agent.jobs.wait(job_id)
+    assert status['status'] == 'completed' and status['done'] == 18
+    assert not EmailService(storage).get_unprocessed_emails()
+
+
+def test_stale_jobs_are_interrupted(storage, monkeypatch):
+    """Jobs left running by a stopped process are marked interrupted on startup."""
+    storage.add_job('old', 'process_all')
+    storage.update_job('old', status='running')
+    monkeypatch.setattr(job_service, 'JOB_STALE_SECONDS', -1)
+    
+    jobs = job_service.JobService(storage)
+    assert jobs.get_status('old')['status'] == 'interrupted'
@@ -0,0 +1,64 @@
+"""
+Tests for static prompt prefixes and prompt-cache accounting
+"""
+import json
+from pathlib import Path
+
+from backend.services.llm_service import LLMService, split_prompt
+
+TEMPLATES = json.loads((Path(__file__).parent.parent / 'data' / 'prompt_templates.json').read_text())['prompts']
+
+
+def test_prefix_is_the_static_instruction_block():
+    """The prefix ends at the first placeholder and is shared by every email."""
+    template = TEMPLATES['categorization']['template']
+    first, prefix = split_prompt(template, sender='a@x.com', subject='Hi', body='One')
+    second, other_prefix = split_prompt(template, sender='b@y.com', subject='Yo', body='Two')
+    
+    assert prefix == other_prefix and "Categorization Rules" in prefix
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert "{sender}" not in prefix and "a@x.com" not in prefix
+    
+    _, json_prefix = split_prompt('Return {{"a": 1}} for {body}', body='x')
+    assert json_prefix == 'Return {"a": 1} for '
+
+
+def test_fake_provider_reports_cached_tokens():
+    """Repeated template calls are served from the simulated prefix cache."""
+    llm = LLMService(provider='fake')
+    template = TEMPLATES['categorization']['template']
+    for i in range(4):
+        llm.categorize_email(f'user{i}@example.com', f'Subject {i}', f'Body {i}', template)
+    
+    stats = llm.get_usage_stats()
+    assert stats['calls'] == 4
+    assert stats['cache_write_tokens'] == stats['cached_tokens'] // 3 > 0
+    assert 0.5 < stats['cached_ratio'] < 1
+
+
+class _OpenAIStream:
+    """Chat completions endpoint of the pinned openai SDK: unknown keywords raise TypeError."""
+    
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+    
+    def create(self, *, model, messages, temperature, max_tokens, stream=False):
+        chunks = ['Two ', 'emails ', None, 'need replies.']
+        return [
+            type('Chunk', (), {'choices': [type('Choice', (), {'delta': type('Delta', (), {'content': text})})]})
+            for text in chunks
+        ]
+
+
+def test_openai_streaming_estimates_usage(monkeypatch):
+    """Streamed OpenAI chunks reach the callback in order and the call's tokens are estimated."""
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    llm = LLMService(provider='openai')
+    llm.client = _OpenAIStream()
+    chunks = []
+    
+    assert llm.stream_completion('What needs a reply?', chunks.append) == 'Two emails need replies.'
+    assert chunks == ['Two ', 'emails ', 'need replies.']
+    usage = llm.get_last_call_usage()
+    assert usage['input_tokens'] > 0 and usage['output_tokens'] > 0
@@ -0,0 +1,44 @@
+"""
+Tests for embedding-based chat retrieval
+"""
+from backend.services.email_service import EmailService
+from backend.services.retrieval_service import RetrievalService
+
+
+def test_search_finds_relevant_emails(storage):
+    """Queries retrieve topically related emails from the mock inbox."""
+    EmailService(storage).load_mock_inbox()
+    retrieval = RetrievalService(storage)
+    
+    top_ids = [email_id for email_id, _ in retrieval.search("security patch", k=3)]
+    assert 'email_009' in top_ids
+    
+    top_ids = [email_id for email_id, _ in retrieval.search("invoice payment", k=3)]
+    assert 'email_017' in top_ids
+
+
+def test_incremental_refresh(storage):
+    """New emails are added to the index without a full reload, deletions force one."""
+    retrieval = RetrievalService(storage)
+    storage.add_email({'id': 'a', 'sender': 'x@example.com', 'subject': 'Quarterly budget',
+                       'body': 'Budget numbers attached', 'timestamp': '2025-11-18T09:00:00Z'})
+    assert retrieval.refresh() == 1
+    assert retrieval.refresh() == 0
+    
+    storage.add_email({'id': 'b', 'sender': 'y@example.com', 'subject': 'Offsite agenda',
+                       'body': 'Agenda for the offsite', 'timestamp': '2025-11-18T10:00:00Z'})
+    assert retrieval.refresh() == 1
+    
+    storage.clear_all_emails()
+    retrieval.refresh()
+    assert retrieval.search("budget") == []
+
+
+def test_context_respects_token_budget(storage):
+    """Context stops adding emails once the token budget is spent."""
+    EmailService(storage).load_mock_inbox()
+    retrieval = RetrievalService(storage)
+    
+    small = retrieval.build_context("project deadline", k=8, token_budget=150)
+    large = retrieval.build_context("project deadline", k=8, token_budget=5000)
+    assert 0 < len(small) < len(large)
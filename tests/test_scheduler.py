@@ -0,0 +1,36 @@
+"""
+Tests for urgency estimation and priority scheduling
+"""
+from backend.utils.urgency import estimate_urgency
+
+
+def _email(email_id, subject, body, sender='alice@example.com'):
+    return {
+        'id': email_id,
+        'sender': sender,
+        'subject': subject,
+        'body': body,
+        'timestamp': '2025-11-18T09:00:00Z'
+    }
+
+
+def test_estimate_urgency():
+    """Keywords and deadlines raise urgency; bulk senders lower it."""
+    urgent = estimate_urgency('security@company.com', 'URGENT: Patch by EOD', 'Install immediately.')
+    newsletter = estimate_urgency('newsletter@techinsights.com', 'Top 10 AI Trends', 'Read more.')
+    assert urgent > 4
+    assert newsletter < 2
+
+
+def test_process_all_emails_most_urgent_first(agent, storage, fake_llm):
+    """The backlog is processed in urgency order, not query order."""
+    storage.add_email(_email('n1', 'Weekly digest', "Top stories this week"))
+    storage.add_email(_email('u1', 'URGENT: Security patch required by EOD', "Install the critical patch immediately."))
+    storage.add_email(_email('m1', 'Lunch on Friday?', "Anyone up for lunch?"))
+    
+    assert storage.get_all_emails(order_by='urgency')[0].id == 'u1'
+    
+    agent.process_all_emails()
+    
+    categorized = [call for call in fake_llm.calls if 'categorize it into ONE' in call]
+    assert 'Security patch' in categorized[0]
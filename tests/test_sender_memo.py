@@ -0,0 +1,77 @@
+"""
+Tests for per-sender category memoization
+"""
+import random
+from datetime import datetime, timedelta
+
+from backend.services.sender_memo_service import SenderMemoService
+
+
+def _newsletter(email_id, body):
+    return {
+        'id': email_id,
+        'sender': 'newsletter@techinsights.com',
+        'subject': f'Issue {email_id}',
+        'body': body,
+        'timestamp': '2025-11-20T06:30:00Z'
+    }
+
+
+def test_prediction_requires_consistent_history(storage):
+    """Predictions need enough weight and a dominant category, per address then domain."""
+    memo = SenderMemoService(storage, half_life_days=30, min_weight=3, min_share=0.9, verify_rate=0)
+    
+    for _ in range(3):
+        memo.record('newsletter@techinsights.com', 'Newsletter')
+    assert memo.predict('newsletter@techinsights.com')['category'] == 'Newsletter'
+    
+    # A new address on the same domain falls back to the domain history
+    assert memo.predict('digest@techinsights.com')['sender_key'] == '@techinsights.com'
+    
+    memo.record('newsletter@techinsights.com', 'Important')
+    assert memo.predict('newsletter@techinsights.com') is None
+
+
+def test_history_decays(storage):
+    """Old categorizations lose weight over time."""
+    memo = SenderMemoService(storage, half_life_days=10, min_weight=3, min_share=0.9, verify_rate=0)
+    old = datetime.utcnow() - timedelta(days=20)
+    for _ in range(4):
+        storage.record_sender_category('hr@company.com', 'To-Do', memo.half_life_days, now=old)
+    
+    # 4 * 0.5 ** 2 = 1, below the minimum weight
+    assert memo.predict('hr@company.com') is None
+
+
+def test_memoized_sender_skips_llm(agent, storage, fake_llm):
+    """Once a sender is predictable, categorization no longer calls the LLM."""
+    agent.sender_memo = SenderMemoService(storage, min_weight=2, min_share=0.9,
+                                          verify_rate=0.0, rng=random.Random(0))
+    fake_llm.category = 'Newsletter'
+    bodies = ["AI trends and multimodal systems", "Cloud cost tips for startups", "Rust versus Go in production"]
+    for index, body in enumerate(bodies):
+        storage.add_email(_newsletter(f'n{index}', body))
+    
+    agent.process_email('n0')
+    agent.process_email('n1')
+    calls_before = len(fake_llm.calls)
+    result = agent.process_email('n2')
+    
+    assert result['category'] == 'Newsletter'
+    assert storage.get_category_by_email('n2').source == 'sender_memo'
+    # Only action extraction reached the LLM
+    assert len(fake_llm.calls) == calls_before + 1
+
+
+def test_reprocessing_moves_the_sender_vote(agent, storage, fake_llm):
+    """Re-categorizing an email replaces its earlier vote instead of adding another one."""
+    storage.add_email(_newsletter('n0', "AI trends and multimodal systems"))
+    agent.process_email('n0')
+    
+    fake_llm.category = 'Newsletter'
+    for _ in range(2):
+        assert agent.reprocess_email('n0', 'categorization')['category'] == 'Newsletter'
+    
+    weights = {stat.category: stat.weight for stat in storage.get_sender_stats('newsletter@techinsights.com')}
+    assert round(weights['Newsletter'], 3) == 1.0
+    assert round(weights.get('To-Do', 0.0), 3) == 0.0
@@ -0,0 +1,49 @@
+"""
+Tests for hierarchical inbox summaries
+"""
+from backend.services import summary_service
+from backend.services.email_service import EmailService
+
+
+def test_rollups_are_built_once_and_reused(agent, storage, fake_llm, monkeypatch):
+    """Processing caches email summaries; rollups are map-reduced and rebuilt only on change."""
+    monkeypatch.setattr(summary_service, 'SUMMARY_FANIN', 3)
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    
+    assert not storage.get_emails_missing_summary()
+    categories = storage.get_rollups('category')
+    assert set(categories) == {'To-Do'}
+    assert categories['To-Do'].item_count == len(storage.get_thread_summaries())
+    reduce_calls = [call for call in fake_llm.calls if 'Combine these summaries' in call]
+    assert reduce_calls and all(call.count('\n- ') <= 3 for call in reduce_calls)
+    
+    assert agent.summaries.refresh_rollups() == {'category': 0, 'day': 0}
+
+
+def test_inbox_question_reads_rollups(agent, storage, fake_llm):
+    """Whole-inbox questions get the cached rollups instead of raw email text."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    
+    for query in ("Summarize my inbox", "Give me a recap of everything.", "Catch me up"):
+        calls = len(fake_llm.calls)
+        agent.chat_query(query)
+        assert len(fake_llm.calls) == calls + 1
+        prompt = fake_llm.calls[-1]
+        assert 'By category:' in prompt and 'Relevant emails:' not in prompt, query
+
+
+def test_targeted_summaries_use_retrieval(agent, storage, fake_llm):
+    """Summaries filtered by sender, topic, urgency or day need the matching emails, not the rollups."""
+    EmailService(storage).load_mock_inbox()
+    agent.process_all_emails()
+    
+    for query in ("Summarize the emails from Sarah about the Q4 launch",
+                  "Summarize all urgent and important emails in my inbox",
+                  "Summarize all emails from today"):
+        calls = len(fake_llm.calls)
+        agent.chat_query(query)
+        assert len(fake_llm.calls) == calls + 1
+        prompt = fake_llm.calls[-1]
+        assert 'Relevant emails:' in prompt and 'By category:' not in prompt, query
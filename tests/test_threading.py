@@ -0,0 +1,116 @@
+"""
+Tests for conversation threading and thread-level processing
+"""
+from backend.models.database import EmailReference, EmailThread
+from backend.services.storage_service import StorageService
+
+
+def _email(email_id, subject, timestamp, body="Hello", **headers):
+    data = {
+        'id': email_id,
+        'sender': 'alice@example.com',
+        'sender_name': 'Alice',
+        'subject': subject,
+        'body': body,
+        'timestamp': timestamp
+    }
+    data.update(headers)
+    return data
+
+
+def test_thread_assignment_from_headers(storage):
+    """Replies are threaded by In-Reply-To/References, even when they arrive first."""
+    storage.add_email(_email('e1', 'Budget', '2025-11-18T09:00:00Z', message_id='<m1@x>'))
+    storage.add_email(_email('e3', 'Re: Budget', '2025-11-18T11:00:00Z', message_id='<m3@x>',
+                             in_reply_to='<m2@x>', references='<m1@x> <m2@x>'))
+    storage.add_email(_email('e2', 'Re: Budget', '2025-11-18T10:00:00Z', message_id='<m2@x>',
+                             in_reply_to='<m1@x>'))
+    storage.add_email(_email('e4', 'Budget', '2025-11-19T09:00:00Z', message_id='<m4@x>'))
+    
+    thread_ids = {storage.get_email_by_id(i).thread_id for i in ('e1', 'e2', 'e3')}
+    assert len(thread_ids) == 1
+    assert storage.get_email_by_id('e4').thread_id not in thread_ids
+    
+    thread = storage.get_thread(thread_ids.pop())
+    assert thread.message_count == 3
+    assert thread.latest_email_id == 'e3'
+
+
+def test_late_parent_merges_threads(storage):
+    """A parent arriving after two replies that never saw each other joins their threads into one."""
+    storage.add_email(_email('e2', 'Re: Plan', '2025-11-18T10:00:00Z', message_id='<m2@x>',
+                             in_reply_to='<m1@x>'))
+    storage.add_email(_email('e3', 'Plan update', '2025-11-18T11:00:00Z', message_id='<m3@x>',
+                             references='<m1@x>'))
+    assert storage.get_email_by_id('e2').thread_id != storage.get_email_by_id('e3').thread_id
+    
+    storage.add_email(_email('e1', 'Plan', '2025-11-18T09:00:00Z', message_id='<m1@x>'))
+    
+    thread_ids = {storage.get_email_by_id(i).thread_id for i in ('e1', 'e2', 'e3')}
+    assert len(thread_ids) == 1
+    thread = storage.get_thread(thread_ids.pop())
+    assert thread.message_count == 3
+    assert thread.latest_email_id == 'e3'
+    session = storage.get_session()
+    try:
+        assert session.query(EmailThread).count() == 1
+    finally:
+        session.close()
+
+
+def test_reference_lookup_is_exact(storage):
+    """Message-IDs are matched exactly, so LIKE wildcards in them never join unrelated threads."""
+    storage.add_email(_email('e2', 'Re: Notes', '2025-11-18T10:00:00Z', message_id='<m2@x>',
+                             references='<a1b@x>'))
+    storage.add_email(_email('e1', 'Notes', '2025-11-18T09:00:00Z', message_id='<a_b@x>'))
+    
+    assert storage.get_email_by_id('e1').thread_id != storage.get_email_by_id('e2').thread_id
+
+
+def test_references_are_backfilled(storage):
+    """Databases created before the reference index still thread late parents after an upgrade."""
+    storage.add_email(_email('e2', 'Re: Plan', '2025-11-18T10:00:00Z', message_id='<m2@x>',
+                             in_reply_to='<m1@x>'))
+    session = storage.get_session()
+    try:
+        session.query(EmailReference).delete()
+        session.commit()
+    finally:
+        session.close()
+    
+    upgraded = StorageService(db_path=storage.db_path)
+    upgraded.add_email(_email('e1', 'Plan', '2025-11-18T09:00:00Z', message_id='<m1@x>'))
+    assert upgraded.get_email_by_id('e1').thread_id == upgraded.get_email_by_id('e2').thread_id
+
+
+def test_thread_assignment_subject_fallback(storage):
+    """Replies without headers fall back to the normalized subject."""
+    storage.add_email(_email('e1', 'Team Lunch', '2025-11-18T09:00:00Z'))
+    storage.add_email(_email('e2', 'RE: Fwd: team  lunch', '2025-11-18T10:00:00Z'))
+    
+    assert storage.get_email_by_id('e1').thread_id == storage.get_email_by_id('e2').thread_id
+
+
+def test_process_all_emails_by_thread(agent, storage, fake_llm):
+    """A chatty thread costs one categorization, one extraction and one draft."""
+    storage.add_email(_email('e1', 'Budget', '2025-11-18T09:00:00Z', message_id='<m1@x>',
+                             body="Can you approve the budget?"))
+    storage.add_email(_email('e2', 'Re: Budget', '2025-11-18T10:00:00Z', message_id='<m2@x>',
+                             in_reply_to='<m1@x>',
+                             body="Which version?\n\nOn Tue, Alice wrote:\n> Can you approve the budget?"))
+    storage.add_email(_email('e3', 'Re: Budget', '2025-11-18T11:00:00Z', message_id='<m3@x>',
+                             in_reply_to='<m2@x>', body="Version 2, please.\n> Which version?"))
+    
+    summary = agent.process_all_emails()
+    
+    assert summary['total_processed'] == 3
+    assert summary['threads_processed'] == 1
+    assert len(fake_llm.calls) == 3
+    assert '> ' not in fake_llm.calls[0]
+    assert 'Earlier in this thread' in fake_llm.calls[0]
+    
+    for email_id in ('e1', 'e2', 'e3'):
+        assert storage.get_email_by_id(email_id).processed
+        assert storage.get_category_by_email(email_id).category == 'To-Do'
+    assert len(storage.get_drafts_by_email('e3')) == 1
+    assert storage.get_drafts_by_email('e1') == []
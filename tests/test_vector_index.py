@@ -0,0 +1,56 @@
+"""
+Tests for the memory-mapped vector index
+"""
+import numpy as np
+
+from backend.services.vector_index import VectorIndex
+
+
+def _random_vectors(count, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_matches_brute_force_and_persists(tmp_path):
+    """Batched top-k equals a full sort, across growth and reopening."""
+    vectors = _random_vectors(3000, 32)
+    ids = [f'e{i}' for i in range(len(vectors))]
+    index = VectorIndex(str(tmp_path / 'idx'), 32)
+    index.append(ids[:1000], vectors[:1000], watermark=1000)
+    index.append(ids[1000:], vectors[1000:], watermark=3000)
+    
+    reopened = VectorIndex(str(tmp_path / 'idx'), 32)
+    assert reopened.count == 3000 and reopened.watermark == 3000
+    
+    queries = vectors[:5]
+    results = reopened.search(queries, k=10)
+    for query, hits in zip(queries, results):
+        expected = [ids[i] for i in np.argsort(-(vectors @ query))[:10]]
+        assert [email_id for email_id, _ in hits] == expected
+
+
+def test_delete_and_compact(tmp_path):
+    """Deleted rows never match and compaction drops them from disk."""
+    vectors = _random_vectors(100, 16)
+    index = VectorIndex(str(tmp_path / 'idx'), 16)
+    index.append([f'e{i}' for i in range(100)], vectors)
+    
+    assert index.delete(['e3', 'missing']) == 1
+    assert all(email_id != 'e3' for email_id, _ in index.search(vectors[3], k=5)[0])
+    
+    index.compact()
+    assert index.count == 99 and index.live_count == 99
+    assert index.search(vectors[4], k=1)[0][0][0] == 'e4'
+
+
+def test_ivf_search_finds_nearest(tmp_path):
+    """IVF probing returns the exact match while scanning a subset of lists."""
+    vectors = _random_vectors(2000, 32, seed=1)
+    index = VectorIndex(str(tmp_path / 'idx'), 32)
+    index.append([f'e{i}' for i in range(2000)], vectors)
+    index.train_ivf(nlist=16)
+    index.append(['new'], vectors[:1] * -1)
+    
+    for i in (0, 500, 1999):
+        assert index.search(vectors[i], k=1, nprobe=4)[0][0][0] == f'e{i}'
+    assert index.search(-vectors[0], k=1, nprobe=4)[0][0][0] == 'new'
@@ -0,0 +1,69 @@
+"""
+Tests for the leased work queue shared by processing workers
+"""
+import threading
+import time
+
+from backend.services import agent_service
+from backend.services.agent_service import AgentService
+from backend.services.storage_service import StorageService
+from backend.services.work_queue import WorkQueue
+
+
+def test_concurrent_workers_process_disjoint_units(agent, storage, monkeypatch):
+    """Workers with their own database connections never process the same thread twice."""
+    monkeypatch.setattr(agent_service, 'WORK_POLL_SECONDS', 0.05)
+    agent.load_mock_inbox()
+    others = [
+        AgentService(storage_service=StorageService(db_path=storage.db_path), llm_service=type(agent.llm)())
+        for _ in range(2)
+    ]
+    outcomes = []
+    summaries = []
+    
+    def work(worker):
+        summaries.append(worker.process_queue(workers=2, batch_size=2, result_callback=outcomes.append))
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in [agent] + others]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    email_ids = [email_id for outcome in outcomes for email_id in outcome['email_ids']]
+    assert len(email_ids) == len(set(email_ids)) == 18
+    assert sum(summary['total_processed'] for summary in summaries) == 18
+    assert len({summary['worker_id'] for summary in summaries}) == 3
+    assert storage.get_work_counts()['done'] == len(outcomes)
+    assert agent.email_service.get_unprocessed_emails() == []
+
+
+def test_expired_leases_return_to_the_pool(agent, storage):
+    """Units of a worker that stopped renewing its leases are taken over by another worker."""
+    agent.load_mock_inbox()
+    crashed = WorkQueue(storage, worker_id='crashed', lease_seconds=0.05)
+    crashed.enqueue(agent.plan_processing())
+    units = crashed.claim(100)
+    assert units and storage.get_work_counts()['pending'] == 0
+    time.sleep(0.1)
+    
+    summary = agent.process_queue(worker_id='survivor')
+    assert summary['total_processed'] == 18
+    assert crashed.finish(units[0]) is False
+
+
+def test_units_fail_after_max_attempts(agent, storage):
+    """A unit whose lease keeps expiring is marked failed, and queued again by the next run."""
+    agent.load_mock_inbox()
+    queue = WorkQueue(storage, worker_id='flaky', lease_seconds=0.01, max_attempts=2)
+    queue.enqueue(agent.plan_processing(limit=1))
+    for _ in range(2):
+        assert len(queue.claim(10)) == 1
+        time.sleep(0.02)
+    assert queue.claim(10) == []
+    counts = storage.get_work_counts()
+    assert counts['failed'] == 1 and counts['leased'] == 0
+    
+    # The failed unit's emails are still unprocessed, so the next run queues and processes it
+    summary = agent.process_queue(worker_id='retry')
+    assert summary['queued'] >= 1 and storage.get_work_counts()['failed'] == 0
+    assert agent.email_service.get_unprocessed_emails() == []